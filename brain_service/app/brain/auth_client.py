@@ -1,5 +1,9 @@
 import httpx
-AUTH_SERVICE_URL = "http://auth-srv:8000/api/v1/users/verify-token"
+from django.conf import settings
+
+from . import upstreams
+
+AUTH_SERVICE_URL = settings.UPSTREAMS["auth"]["base_url"] + "/users/verify-token"
 
 
 def verify_user(request):
@@ -25,12 +29,10 @@ def verify_user(request):
         return None
 
     try:
-        with httpx.Client() as client:
-            resp = client.get(
-                AUTH_SERVICE_URL,
-                headers={"Authorization": f"Bearer {jwt}"},
-                timeout=5.0,
-            )
+        resp = upstreams.client("auth").get(
+            AUTH_SERVICE_URL,
+            headers={"Authorization": f"Bearer {jwt}"},
+        )
     except httpx.RequestError:
         return None
 
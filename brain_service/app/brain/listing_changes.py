@@ -0,0 +1,74 @@
+"""
+Consumer of listing_service's change feed (GET /changes).
+
+Cached listing pages carry the generation they were fetched at: the
+transaction id of the last GENERATION_KINDS change seen, which every
+worker and host agrees on once one has happened. At most every
+LISTING_CHANGES_POLL_SECONDS a request polls the feed for those events;
+each one moves the generation, so every cached page built before the
+change is refetched before use.
+
+Favorite and review events are left out: they only change the counts on
+a page, which may lag by the listings policy's `fresh` seconds rather
+than have every favorite click refetch every cached page.
+"""
+import threading
+import time
+
+import httpx
+from asgiref.sync import async_to_sync
+from django.conf import settings
+
+from . import upstreams
+
+LISTING_URL = settings.UPSTREAMS["listing"]["base_url"]
+# change kinds (event prefixes) that make cached listing pages outdated
+GENERATION_KINDS = "listing,image"
+
+_lock = threading.Lock()
+# since: feed cursor; generation: txid of the last GENERATION_KINDS event
+# seen (the head at the first poll). The cursor also moves past skipped
+# events and idle stretches, so it cannot serve as the generation.
+_state = {"since": None, "generation": None, "checked_at": 0.0}
+
+
+async def _poll():
+    params = {"kinds": GENERATION_KINDS}
+    if _state["since"] is not None:
+        params.update(since=_state["since"], limit=1000)
+    try:
+        resp = await upstreams.arequest(
+            "listing", "GET", f"{LISTING_URL}/changes", params=params, timeout=2.0
+        )
+    except httpx.RequestError:
+        return
+    if resp.status_code != 200:
+        return
+    page = resp.json()
+    if _state["since"] is None:
+        _state["generation"] = page["next_since"]
+    elif page["changes"]:
+        _state["generation"] = page["changes"][-1]["txid"]
+    _state["since"] = page["next_since"]
+
+
+async def alistings_generation():
+    """
+    Current generation, polling the change feed first when it is due;
+    None until the feed has been reached once.
+    """
+    now = time.monotonic()
+    if now - _state["checked_at"] >= settings.LISTING_CHANGES_POLL_SECONDS:
+        # one poller per process; other requests keep the generation they see
+        if _lock.acquire(blocking=False):
+            try:
+                _state["checked_at"] = now
+                await _poll()
+            finally:
+                _lock.release()
+    return _state["generation"]
+
+
+def listings_generation():
+    """alistings_generation() for sync views."""
+    return async_to_sync(alistings_generation)()
@@ -0,0 +1,142 @@
+"""
+Single-flight upstream GETs.
+
+When a popular cached page expires, every concurrent request misses at
+once and sends the same query upstream. get() lets identical GETs (same
+upstream, URL, params and KEY_HEADERS) share one call:
+
+- In a worker, the first caller starts the request as a task and the
+  others await the same task. The task is shielded, so a caller that
+  disconnects does not cancel it for the rest.
+- Across workers, the task first takes a lock in the shared cache; the
+  lock's value is a fresh flight id. Workers that find the lock taken
+  read that id and poll for the result stored under it instead of
+  calling upstream. If the holder dies, they fall back to their own call
+  once the lock expires or SINGLE_FLIGHT["wait"] runs out.
+
+Only callers that arrive while a call is in flight share its result: it
+is stored under the flight id, which nobody learns once the lock is
+gone, and kept for SINGLE_FLIGHT["result_ttl"] seconds, just long enough
+for the waiters' next poll. A caller that comes later makes its own
+call, so this never acts as a response cache.
+
+Locks and results skip the cache's per-process tier (TieredCache.ashared):
+an L1 copy of a lock could still name a flight that has finished. If the
+shared tier is down, every caller makes its own call.
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+import uuid
+import weakref
+
+import httpx
+from django.conf import settings
+from django.core.cache import cache
+
+from . import upstreams
+
+# request headers that change the response, so they are part of the key
+KEY_HEADERS = ("authorization", "if-none-match", "if-modified-since", "accept")
+# hop-by-hop or encoding headers that no longer describe a stored body
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+_inflight = weakref.WeakKeyDictionary()  # loop -> {key: asyncio.Task}
+_stats_lock = threading.Lock()
+_stats = {}  # upstream -> counters
+
+
+def _count(name, counter):
+    with _stats_lock:
+        counters = _stats.setdefault(name, {"calls": 0, "joined": 0, "shared": 0})
+        counters[counter] += 1
+
+
+def stats(name) -> dict:
+    """calls made upstream, requests that joined an in-flight call, results taken from another worker."""
+    with _stats_lock:
+        return dict(_stats.get(name, {"calls": 0, "joined": 0, "shared": 0}))
+
+
+def _key(name, url, params, headers):
+    headers = {k.lower(): v for k, v in (headers or {}).items() if k.lower() in KEY_HEADERS}
+    raw = json.dumps([name, url, sorted((params or {}).items()), sorted(headers.items())], default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _dump(resp):
+    return {
+        "status": resp.status_code,
+        "headers": [(k, v) for k, v in resp.headers.multi_items() if k.lower() not in _DROP_HEADERS],
+        "content": resp.content,
+    }
+
+
+def _load(data, url):
+    return httpx.Response(
+        data["status"],
+        headers=data["headers"],
+        content=data["content"],
+        request=httpx.Request("GET", url),
+    )
+
+
+async def _call(name, url, key, kwargs):
+    lock_key = f"singleflight:lock:{key}"
+    config = settings.SINGLE_FLIGHT
+
+    flight = uuid.uuid4().hex
+    if await cache.ashared("add", lock_key, flight, config["lock_ttl"], failed=True):
+        try:
+            _count(name, "calls")
+            resp = await upstreams.arequest(name, "GET", url, **kwargs)
+            # errors are not shared: the waiters should retry
+            if resp.status_code < 500:
+                await cache.ashared(
+                    "set", f"singleflight:result:{key}:{flight}", _dump(resp), config["result_ttl"]
+                )
+            return resp
+        finally:
+            await cache.ashared("delete", lock_key)
+
+    # another worker is fetching it; join that flight if it is still running
+    flight = await cache.ashared("get", lock_key)
+    deadline = time.monotonic() + config["wait"]
+    while flight is not None and time.monotonic() < deadline:
+        await asyncio.sleep(config["poll_interval"])
+        # lock first: the result is stored before the lock goes
+        running = await cache.ashared("get", lock_key) == flight
+        shared = await cache.ashared("get", f"singleflight:result:{key}:{flight}")
+        if shared is not None:
+            _count(name, "shared")
+            return _load(shared, url)
+        if not running:
+            break
+    _count(name, "calls")
+    return await upstreams.arequest(name, "GET", url, **kwargs)
+
+
+def _forget(inflight, key):
+    def done(task):
+        inflight.pop(key, None)
+        # every awaiter may be gone; don't warn about an unretrieved error
+        if not task.cancelled():
+            task.exception()
+    return done
+
+
+async def get(name, url, params=None, headers=None, **kwargs) -> httpx.Response:
+    """GET `url` on upstream `name`, sharing the call with identical in-flight GETs."""
+    key = _key(name, url, params, headers)
+    loop = asyncio.get_running_loop()
+    inflight = _inflight.setdefault(loop, {})
+    task = inflight.get(key)
+    if task is None:
+        task = loop.create_task(_call(name, url, key, {"params": params, "headers": headers, **kwargs}))
+        inflight[key] = task
+        task.add_done_callback(_forget(inflight, key))
+    else:
+        _count(name, "joined")
+    return await asyncio.shield(task)
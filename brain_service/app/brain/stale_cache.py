@@ -0,0 +1,234 @@
+"""
+Cache entries with a soft and a hard expiry.
+
+Each entry is stored with the time it goes stale (`fresh` seconds after
+it was fetched) and kept in the cache until its hard expiry. A read then
+falls into one of three windows of its settings.CACHE_POLICIES entry:
+
+- fresh: the value is served as is.
+- stale, up to `stale_while_revalidate` seconds past fresh: the value is
+  served at once and one background refresh is started (one per key,
+  across workers, through a cache lock).
+- stale beyond that, up to `stale_if_error` seconds past fresh (the hard
+  expiry): the value is refreshed before answering, but if the upstream
+  errors or times out the stale value is served instead.
+
+An entry fetched for another `version` (e.g. an older listings change-feed
+position) is treated as past the revalidate window: it is refetched
+before answering, and only served if that fails.
+
+fetch() callables return the value to cache, or raise UpstreamError with
+the response to send when the upstream answered with an error. 4xx
+answers are passed on and drop the entry; 5xx answers and httpx errors
+fall back to the stale value. Errors are never cached.
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# sync views refresh in the background on these threads
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="stale-cache")
+_refreshing = set()  # keys with a refresh running in this process
+_tasks = set()  # background refresh tasks, kept referenced until done
+_lock = threading.Lock()
+_counters = {
+    "fresh": 0,
+    "stale": 0,
+    "misses": 0,
+    "refreshes": 0,
+    "refresh_errors": 0,
+    "stale_if_error": 0,
+}
+
+
+class UpstreamError(Exception):
+    """The upstream answered with an error; `response` is what to send back."""
+
+    def __init__(self, response):
+        super().__init__(response.status_code)
+        self.response = response
+        self.status_code = response.status_code
+
+
+def _count(counter):
+    with _lock:
+        _counters[counter] += 1
+
+
+def stats() -> dict:
+    """This process's counts of fresh/stale/missed reads and refresh outcomes."""
+    with _lock:
+        return dict(_counters)
+
+
+def _policy(name):
+    policy = settings.CACHE_POLICIES[name]
+    return policy, policy["fresh"] + max(policy["stale_while_revalidate"], policy["stale_if_error"])
+
+
+def _entry(value, policy, version):
+    return {"value": value, "fresh_until": time.time() + policy["fresh"], "version": version}
+
+
+def _state(entry, policy, version):
+    """"missing", "fresh", "stale" (serve, refresh in the background) or "expired"."""
+    if entry is None:
+        return "missing"
+    if version is not None and entry["version"] != version:
+        return "expired"
+    now = time.time()
+    if now < entry["fresh_until"]:
+        return "fresh"
+    if now < entry["fresh_until"] + policy["stale_while_revalidate"]:
+        return "stale"
+    return "expired"
+
+
+def _is_failure(exc):
+    """Upstream down or broken, as opposed to a definite 4xx answer."""
+    return not isinstance(exc, UpstreamError) or exc.status_code >= 500
+
+
+def _lock_key(key):
+    return f"stale:refresh:{key}"
+
+
+def _claim(key):
+    with _lock:
+        if key in _refreshing:
+            return False
+        _refreshing.add(key)
+        return True
+
+
+def _release(key):
+    with _lock:
+        _refreshing.discard(key)
+
+
+# -- async views ----------------------------------------------------------
+
+async def _arefresh(key, name, fetch, version):
+    policy, hard = _policy(name)
+    try:
+        value = await fetch()
+    except UpstreamError as exc:
+        if not _is_failure(exc):
+            await cache.adelete(key)
+        raise
+    await cache.aset(key, _entry(value, policy, version), timeout=hard)
+    return value
+
+
+async def _abackground(key, name, fetch, version):
+    try:
+        if not await cache.aadd(_lock_key(key), 1, timeout=settings.SINGLE_FLIGHT["lock_ttl"]):
+            return
+        try:
+            _count("refreshes")
+            await _arefresh(key, name, fetch, version)
+        finally:
+            await cache.adelete(_lock_key(key))
+    except (UpstreamError, httpx.HTTPError):
+        _count("refresh_errors")
+    except Exception:
+        _count("refresh_errors")
+        logger.exception("Background refresh of %s failed", key)
+    finally:
+        _release(key)
+
+
+async def aget(key, name, fetch, version=None):
+    """
+    The cached value for `key` under policy `name`, calling the async
+    `fetch()` when it is missing or expired and in the background when
+    it is stale.
+    """
+    policy, _ = _policy(name)
+    entry = await cache.aget(key)
+    state = _state(entry, policy, version)
+    if state == "fresh":
+        _count("fresh")
+        return entry["value"]
+    if state == "stale":
+        _count("stale")
+        if _claim(key):
+            task = asyncio.get_running_loop().create_task(_abackground(key, name, fetch, version))
+            _tasks.add(task)
+            task.add_done_callback(_tasks.discard)
+        return entry["value"]
+
+    if entry is None:
+        _count("misses")
+    try:
+        return await _arefresh(key, name, fetch, version)
+    except (UpstreamError, httpx.HTTPError) as exc:
+        if entry is None or not _is_failure(exc):
+            raise
+        _count("stale_if_error")
+        return entry["value"]
+
+
+# -- sync views -----------------------------------------------------------
+
+def _refresh(key, name, fetch, version):
+    policy, hard = _policy(name)
+    try:
+        value = fetch()
+    except UpstreamError as exc:
+        if not _is_failure(exc):
+            cache.delete(key)
+        raise
+    cache.set(key, _entry(value, policy, version), timeout=hard)
+    return value
+
+
+def _background(key, name, fetch, version):
+    try:
+        if not cache.add(_lock_key(key), 1, timeout=settings.SINGLE_FLIGHT["lock_ttl"]):
+            return
+        try:
+            _count("refreshes")
+            _refresh(key, name, fetch, version)
+        finally:
+            cache.delete(_lock_key(key))
+    except (UpstreamError, httpx.HTTPError):
+        _count("refresh_errors")
+    except Exception:
+        _count("refresh_errors")
+        logger.exception("Background refresh of %s failed", key)
+    finally:
+        _release(key)
+
+
+def get(key, name, fetch, version=None):
+    """Sync twin of aget(); stale entries are refreshed on a worker thread."""
+    policy, _ = _policy(name)
+    entry = cache.get(key)
+    state = _state(entry, policy, version)
+    if state == "fresh":
+        _count("fresh")
+        return entry["value"]
+    if state == "stale":
+        _count("stale")
+        if _claim(key):
+            _executor.submit(_background, key, name, fetch, version)
+        return entry["value"]
+
+    if entry is None:
+        _count("misses")
+    try:
+        return _refresh(key, name, fetch, version)
+    except (UpstreamError, httpx.HTTPError) as exc:
+        if entry is None or not _is_failure(exc):
+            raise
+        _count("stale_if_error")
+        return entry["value"]
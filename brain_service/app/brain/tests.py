@@ -1,3 +1,219 @@
-from django.test import TestCase
+import asyncio
+from unittest import mock
 
-# Create your tests here.
+import httpx
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.test import SimpleTestCase, override_settings
+
+from . import listing_changes, singleflight, stale_cache
+
+TEST_CACHES = {
+    "default": {
+        "BACKEND": "brain.tiered_cache.TieredCache",
+        "LOCATION": "brain-test-cache",
+        "OPTIONS": {"shared": "shared"},
+    },
+    "shared": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "brain-test-l2"},
+}
+
+
+class UpstreamErrorTests(SimpleTestCase):
+    url = "/api/v1/brain/user/7/listings"
+
+    def _get(self, error):
+        with mock.patch("brain.upstreams.arequest", side_effect=error):
+            return self.client.get(self.url)
+
+    def test_unreachable_upstream_is_503(self):
+        response = self._get(httpx.ConnectError("connection refused"))
+        self.assertEqual(response.status_code, 503)
+
+    def test_upstream_timeout_is_504(self):
+        response = self._get(httpx.ReadTimeout("timed out"))
+        self.assertEqual(response.status_code, 504)
+
+
+@override_settings(
+    CACHES=TEST_CACHES,
+    SINGLE_FLIGHT={"lock_ttl": 5, "result_ttl": 1, "wait": 2, "poll_interval": 0.01},
+)
+class SingleFlightTests(SimpleTestCase):
+    url = "http://listing/api/v1/listings"
+
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+        patcher = mock.patch("brain.upstreams.arequest", side_effect=self._upstream)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def _upstream(self, name, method, url, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"call": self.calls}, request=httpx.Request(method, url))
+
+    async def test_concurrent_callers_share_one_call(self):
+        responses = await asyncio.gather(*[singleflight.get("listing", self.url) for _ in range(5)])
+        self.assertEqual(self.calls, 1)
+        self.assertEqual({resp.json()["call"] for resp in responses}, {1})
+
+    async def test_a_later_caller_makes_its_own_call(self):
+        first = await singleflight.get("listing", self.url)
+        second = await singleflight.get("listing", self.url)
+        self.assertEqual((first.json()["call"], second.json()["call"]), (1, 2))
+
+    async def test_waiter_takes_the_result_of_another_workers_flight(self):
+        key = singleflight._key("listing", self.url, None, None)
+        lock_key = f"singleflight:lock:{key}"
+        await cache.ashared("add", lock_key, "other-worker", 5)
+
+        async def other_worker_finishes():
+            await asyncio.sleep(0.05)
+            resp = httpx.Response(200, json={"call": "other"}, request=httpx.Request("GET", self.url))
+            await cache.ashared("set", f"singleflight:result:{key}:other-worker", singleflight._dump(resp), 1)
+            await cache.ashared("delete", lock_key)
+
+        other = asyncio.create_task(other_worker_finishes())
+        resp = await singleflight.get("listing", self.url)
+        await other
+        self.assertEqual(resp.json(), {"call": "other"})
+        self.assertEqual(self.calls, 0)
+
+    async def test_a_finished_flights_result_is_not_reused(self):
+        key = singleflight._key("listing", self.url, None, None)
+        old = httpx.Response(200, json={"call": "old"}, request=httpx.Request("GET", self.url))
+        await cache.ashared("set", f"singleflight:result:{key}:finished", singleflight._dump(old), 1)
+        resp = await singleflight.get("listing", self.url)
+        self.assertEqual(resp.json(), {"call": 1})
+
+
+@override_settings(
+    CACHES=TEST_CACHES,
+    CACHE_POLICIES={"test": {"fresh": 10, "stale_while_revalidate": 20, "stale_if_error": 100}},
+)
+class StaleCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = 1_000_000.0
+        clock = mock.patch("brain.stale_cache.time.time", side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+        self.fetches = 0
+
+    def _fetch(self, value=None, error=None):
+        async def fetch():
+            self.fetches += 1
+            if error is not None:
+                raise error
+            return value
+        return fetch
+
+    async def _get(self, fetch, version=None):
+        value = await stale_cache.aget("key", "test", fetch, version=version)
+        # let a background refresh finish before looking at the cache
+        await asyncio.gather(*stale_cache._tasks)
+        return value
+
+    async def test_missing_then_fresh(self):
+        self.assertEqual(await self._get(self._fetch("v1")), "v1")
+        self.now += 5
+        self.assertEqual(await self._get(self._fetch("v2")), "v1")
+        self.assertEqual(self.fetches, 1)
+
+    async def test_stale_is_served_and_refreshed_in_the_background(self):
+        await self._get(self._fetch("v1"))
+        self.now += 15
+        self.assertEqual(await self._get(self._fetch("v2")), "v1")
+        self.assertEqual(self.fetches, 2)
+        self.assertEqual(await self._get(self._fetch("v3")), "v2")
+
+    async def test_expired_is_refetched_before_answering(self):
+        await self._get(self._fetch("v1"))
+        self.now += 40
+        self.assertEqual(await self._get(self._fetch("v2")), "v2")
+
+    async def test_expired_falls_back_to_stale_on_upstream_errors(self):
+        await self._get(self._fetch("v1"))
+        self.now += 40
+        self.assertEqual(await self._get(self._fetch(error=httpx.ConnectError("down"))), "v1")
+        error = stale_cache.UpstreamError(JsonResponse({}, status=503))
+        self.assertEqual(await self._get(self._fetch(error=error)), "v1")
+
+    async def test_a_4xx_answer_is_passed_on_and_drops_the_entry(self):
+        await self._get(self._fetch("v1"))
+        self.now += 40
+        with self.assertRaises(stale_cache.UpstreamError):
+            await self._get(self._fetch(error=stale_cache.UpstreamError(JsonResponse({}, status=404))))
+        self.assertIsNone(await cache.aget("key"))
+
+    async def test_a_new_version_is_refetched_but_the_old_one_covers_errors(self):
+        await self._get(self._fetch("v1"), version=1)
+        self.assertEqual(await self._get(self._fetch(error=httpx.ReadTimeout("slow")), version=2), "v1")
+        self.assertEqual(await self._get(self._fetch("v2"), version=2), "v2")
+        self.assertEqual(await self._get(self._fetch("v3"), version=2), "v2")
+
+    async def test_errors_without_a_stale_copy_are_raised(self):
+        with self.assertRaises(httpx.ConnectError):
+            await self._get(self._fetch(error=httpx.ConnectError("down")))
+
+
+PROXY_POLICY = {"fresh": 10, "stale_while_revalidate": 20, "stale_if_error": 100}
+
+
+@override_settings(CACHES=TEST_CACHES, CACHE_POLICIES={"listings": PROXY_POLICY, "facets": PROXY_POLICY})
+class StaleProxyTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = 1_000_000.0
+        for patcher in (
+            mock.patch("brain.stale_cache.time.time", side_effect=lambda: self.now),
+            # no change-feed polls: the generation stays put
+            mock.patch.dict(listing_changes._state, {"generation": 1, "checked_at": float("inf")}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _response(self, status, body):
+        return httpx.Response(status, json=body, request=httpx.Request("GET", "/"))
+
+    def test_all_listings_falls_back_to_stale_on_upstream_errors(self):
+        with mock.patch("brain.upstreams.client") as client:
+            client.return_value.get.return_value = self._response(200, [{"id": 1}])
+            self.assertEqual(self.client.get("/api/v1/brain/listings").json(), [{"id": 1}])
+            self.now += 40
+            client.return_value.get.return_value = self._response(503, {"detail": "down"})
+            response = self.client.get("/api/v1/brain/listings")
+        self.assertEqual((response.status_code, response.json()), (200, [{"id": 1}]))
+
+    def test_facets_fall_back_to_stale_on_upstream_errors(self):
+        url = "/api/v1/brain/listings/facets"
+        with mock.patch("brain.upstreams.arequest", return_value=self._response(200, {"categories": []})):
+            self.assertEqual(self.client.get(url).json(), {"categories": []})
+        self.now += 40
+        with mock.patch("brain.upstreams.arequest", side_effect=httpx.ConnectError("down")):
+            response = self.client.get(url)
+        self.assertEqual((response.status_code, response.json()), (200, {"categories": []}))
+
+
+class ListingGenerationTests(SimpleTestCase):
+    def _poll(self, state, page):
+        resp = httpx.Response(200, json=page, request=httpx.Request("GET", "/"))
+        with mock.patch.dict(listing_changes._state, {**state, "checked_at": 0.0}), \
+                mock.patch("brain.upstreams.arequest", return_value=resp) as arequest:
+            generation = async_to_sync(listing_changes.alistings_generation)()
+            return generation, dict(listing_changes._state), arequest.call_args.kwargs["params"]
+
+    def test_only_listing_and_image_events_are_polled(self):
+        _, _, params = self._poll({"since": 41, "generation": 30}, {"changes": [], "next_since": 41})
+        self.assertEqual((params["since"], params["kinds"]), (41, "listing,image"))
+
+    def test_the_cursor_moving_alone_keeps_the_generation(self):
+        generation, state, _ = self._poll({"since": 41, "generation": 30}, {"changes": [], "next_since": 50})
+        self.assertEqual((generation, state["since"]), (30, 50))
+
+    def test_an_event_moves_the_generation(self):
+        page = {"changes": [{"txid": 45}], "next_since": 50}
+        generation, _, _ = self._poll({"since": 41, "generation": 30}, page)
+        self.assertEqual(generation, 45)
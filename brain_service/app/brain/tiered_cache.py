@@ -0,0 +1,287 @@
+"""
+Two-tier Django cache backend.
+
+- L1 is an LRU dict inside each worker process, bounded by the pickled
+  size of its entries (OPTIONS["max_bytes"]) rather than by entry count.
+- L2 is another CACHES alias (OPTIONS["shared"]), normally Redis, shared
+  by every worker and host; a DatabaseCache table works for tests and
+  single-host setups.
+
+Writes go to both tiers. Reads try L1, then L2, and copy L2 hits into L1.
+L2 stores each value with its absolute expiry, so a copy in L1 never
+outlives the original.
+
+Another worker's delete or overwrite only reaches L2, so an L1 entry is
+kept at most OPTIONS["max_timeout"] seconds. Values that change in place
+should be keyed by a version instead (listing pages are, by change-feed
+generation). add() and has_key() are decided by L2 so they stay atomic
+across workers. Values no worker may read from a stale L1 copy, such as
+the single-flight locks, go through ashared() to L2 alone.
+
+When L2 is unreachable the cache keeps working on L1 alone: reads miss,
+writes are dropped and add() succeeds, so callers fetch upstream rather
+than wait on a lock nobody can see.
+
+stats() reports hits, misses and evictions per tier for this process.
+"""
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.redis import RedisCache
+
+logger = logging.getLogger(__name__)
+
+_stores = {}  # LOCATION -> _Store, shared by the backend's per-thread instances
+_stores_lock = threading.Lock()
+
+
+class _Store:
+    """One process's L1 entries, its handle on L2 and the counters."""
+
+    def __init__(self, max_bytes, shared_alias):
+        self.max_bytes = max_bytes
+        self.shared_alias = shared_alias
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (expires_at, pickled, size)
+        self.size = 0
+        self.counters = {
+            "l1": {"hits": 0, "misses": 0, "evictions": 0},
+            "l2": {"hits": 0, "misses": 0, "errors": 0},
+        }
+        self._shared = None
+
+    @property
+    def shared(self):
+        # one L2 backend for the process, not one per thread: the Redis
+        # client keeps its connection pool on the backend instance
+        if self._shared is None:
+            with self.lock:
+                if self._shared is None:
+                    self._shared = caches.create_connection(self.shared_alias)
+        return self._shared
+
+    def count(self, tier, counter):
+        with self.lock:
+            self.counters[tier][counter] += 1
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[0] > time.time():
+                    self.entries.move_to_end(key)
+                    self.counters["l1"]["hits"] += 1
+                    return entry[1]
+                self._remove(key)
+            self.counters["l1"]["misses"] += 1
+            return None
+
+    def contains(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            return entry is not None and entry[0] > time.time()
+
+    def set(self, key, pickled, expires_at):
+        size = len(key) + len(pickled)
+        with self.lock:
+            self._remove(key)
+            if expires_at <= time.time() or size > self.max_bytes:
+                return
+            self.entries[key] = (expires_at, pickled, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, _, evicted) = self.entries.popitem(last=False)
+                self.size -= evicted
+                self.counters["l1"]["evictions"] += 1
+
+    def delete(self, key):
+        with self.lock:
+            return self._remove(key)
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return False
+        self.size -= entry[2]
+        return True
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "l1": {
+                    **self.counters["l1"],
+                    "entries": len(self.entries),
+                    "bytes": self.size,
+                    "max_bytes": self.max_bytes,
+                },
+                "l2": {**self.counters["l2"], "backend": self.shared_alias},
+            }
+
+
+class TieredCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, name, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._max_timeout = options.get("max_timeout", 30)
+        with _stores_lock:
+            if name not in _stores:
+                _stores[name] = _Store(
+                    options.get("max_bytes", 64 * 1024 * 1024),
+                    options.get("shared", "shared"),
+                )
+            self._store = _stores[name]
+
+    # -- helpers ----------------------------------------------------------
+
+    def _l1_expiry(self, expires_at):
+        cap = time.time() + self._max_timeout
+        return cap if expires_at is None else min(expires_at, cap)
+
+    def _shared_timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _shared_call(self, method, *args, failed=None):
+        try:
+            return getattr(self._store.shared, method)(*args)
+        except Exception:
+            logger.warning("L2 cache %s failed", method, exc_info=True)
+            self._store.count("l2", "errors")
+            return failed
+
+    async def _ashared(self, func, *args, **kwargs):
+        # L2 clients are blocking; run them off the event loop, but not on
+        # the single thread Django keeps for thread-sensitive sync code
+        return await sync_to_async(func, thread_sensitive=False)(*args, **kwargs)
+
+    def _get_shared(self, key, default):
+        envelope = self._shared_call("get", key)
+        if envelope is None:
+            self._store.count("l2", "misses")
+            return default
+        self._store.count("l2", "hits")
+        expires_at, pickled = envelope
+        self._store.set(key, pickled, self._l1_expiry(expires_at))
+        return pickle.loads(pickled)
+
+    def _prepare(self, key, value, timeout, version):
+        key = self.make_and_validate_key(key, version)
+        expires_at = self.get_backend_timeout(timeout)
+        return key, (expires_at, pickle.dumps(value, self.pickle_protocol)), self._shared_timeout(timeout)
+
+    # -- cache API --------------------------------------------------------
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version)
+        pickled = self._store.get(key)
+        if pickled is not None:
+            return pickle.loads(pickled)
+        return self._get_shared(key, default)
+
+    async def aget(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version)
+        pickled = self._store.get(key)
+        if pickled is not None:
+            return pickle.loads(pickled)
+        return await self._ashared(self._get_shared, key, default)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key, envelope, shared_timeout = self._prepare(key, value, timeout, version)
+        self._store.set(key, envelope[1], self._l1_expiry(envelope[0]))
+        self._shared_call("set", key, envelope, shared_timeout)
+
+    async def aset(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key, envelope, shared_timeout = self._prepare(key, value, timeout, version)
+        self._store.set(key, envelope[1], self._l1_expiry(envelope[0]))
+        await self._ashared(self._shared_call, "set", key, envelope, shared_timeout)
+
+    def _add_shared(self, key, envelope, shared_timeout):
+        added = self._shared_call("add", key, envelope, shared_timeout, failed=True)
+        if added:
+            self._store.set(key, envelope[1], self._l1_expiry(envelope[0]))
+        return added
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._add_shared(*self._prepare(key, value, timeout, version))
+
+    async def aadd(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return await self._ashared(self._add_shared, *self._prepare(key, value, timeout, version))
+
+    def _has_key_shared(self, key):
+        return bool(self._shared_call("has_key", key, failed=False))
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version)
+        if self._store.contains(key):
+            return True
+        # not get(): a copy pulled into L1 would outlive another worker's delete
+        return self._has_key_shared(key)
+
+    async def ahas_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version)
+        if self._store.contains(key):
+            return True
+        return await self._ashared(self._has_key_shared, key)
+
+    def _delete_shared(self, key):
+        return bool(self._shared_call("delete", key, failed=False))
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version)
+        deleted = self._store.delete(key)
+        return self._delete_shared(key) or deleted
+
+    async def adelete(self, key, version=None):
+        key = self.make_and_validate_key(key, version)
+        deleted = self._store.delete(key)
+        return await self._ashared(self._delete_shared, key) or deleted
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        missing = object()
+        value = self.get(key, missing, version=version)
+        if value is missing:
+            return False
+        self.set(key, value, timeout, version=version)
+        return True
+
+    def clear(self):
+        self._store.clear()
+        self._shared_call("clear")
+
+    async def ashared(self, method, key, *args, failed=None):
+        """
+        Call `method` ("get", "add", "set", "delete") on L2 alone, with
+        `key` as is. Failures are logged and return `failed`, like every
+        other L2 call here.
+        """
+        return await self._ashared(self._shared_call, method, key, *args, failed=failed)
+
+    # -- stats ------------------------------------------------------------
+
+    def stats(self) -> dict:
+        """
+        This process's counters: L1 hits/misses/LRU evictions and size,
+        L2 hits/misses/errors, plus the L2 server's evictions when it
+        reports them (Redis `evicted_keys`, server-wide).
+        """
+        stats = self._store.snapshot()
+        shared = self._store.shared
+        if isinstance(shared, RedisCache):
+            try:
+                info = shared._cache.get_client(write=True).info("stats")
+                stats["l2"]["evictions"] = info.get("evicted_keys")
+            except Exception:
+                stats["l2"]["evictions"] = None
+        return stats
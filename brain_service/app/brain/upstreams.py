@@ -0,0 +1,269 @@
+"""
+Process-wide pooled HTTP clients, one per upstream service.
+
+Views used to open an httpx.Client per request, paying a TCP (and DNS)
+setup on every upstream call. Here each upstream in settings.UPSTREAMS
+gets one long-lived client whose keep-alive pool is shared by every
+request in the process:
+
+- client(name): the sync httpx.Client, safe to share between threads.
+- async_client(name): an httpx.AsyncClient for the running event loop
+  (async clients cannot cross loops, so there is one per loop).
+- arequest(name, ...): a request on that client, with at most
+  settings.UPSTREAM_CONCURRENCY in flight per upstream, so one page's
+  fan-out (or many pages at once) cannot flood an upstream.
+
+Pool sizes and HTTP/2 come from settings.UPSTREAM_POOL / UPSTREAM_HTTP2,
+timeouts from each upstream's entry. Clients are closed on ASGI lifespan
+shutdown (see LifespanMiddleware) and at interpreter exit.
+
+Every request is timed from the moment it asks the pool for a connection
+to the first network event on the connection it got, which is how long it
+waited for the pool; pool_stats() reports that alongside the pool's
+connections.
+"""
+import asyncio
+import atexit
+import threading
+import time
+import weakref
+
+import httpx
+from django.conf import settings
+
+_lock = threading.Lock()
+_clients = {}  # name -> httpx.Client
+_async_clients = weakref.WeakKeyDictionary()  # loop -> {name: httpx.AsyncClient}
+_semaphores = weakref.WeakKeyDictionary()  # loop -> {name: asyncio.Semaphore}
+_stats = {}  # name -> _PoolStats
+
+
+class _PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.waiting = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def started(self):
+        with self._lock:
+            self.requests += 1
+            self.waiting += 1
+
+    def acquired(self, waited):
+        with self._lock:
+            self.waiting -= 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "waiting": self.waiting,
+                "wait_avg_ms": round(self.wait_total / self.requests * 1000, 3) if self.requests else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+
+class _WaitTimer:
+    """
+    httpcore trace callback: the first event it sees is the first thing
+    done on the connection the pool handed out, so the time until then
+    is the pool wait.
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.start = time.perf_counter()
+        self.done = False
+
+    def _mark(self):
+        if not self.done:
+            self.done = True
+            self.stats.acquired(time.perf_counter() - self.start)
+
+    def __call__(self, event_name, info):
+        self._mark()
+
+    async def atrace(self, event_name, info):
+        self._mark()
+
+    def finish(self):
+        # failed before touching a connection (e.g. pool timeout)
+        self._mark()
+
+
+class _Transport(httpx.HTTPTransport):
+    def __init__(self, stats, **kwargs):
+        super().__init__(**kwargs)
+        self.stats = stats
+
+    def handle_request(self, request):
+        timer = _WaitTimer(self.stats)
+        self.stats.started()
+        request.extensions = {**request.extensions, "trace": timer}
+        try:
+            return super().handle_request(request)
+        finally:
+            timer.finish()
+
+
+class _AsyncTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, stats, **kwargs):
+        super().__init__(**kwargs)
+        self.stats = stats
+
+    async def handle_async_request(self, request):
+        timer = _WaitTimer(self.stats)
+        self.stats.started()
+        request.extensions = {**request.extensions, "trace": timer.atrace}
+        try:
+            return await super().handle_async_request(request)
+        finally:
+            timer.finish()
+
+
+def _config(name):
+    try:
+        return settings.UPSTREAMS[name]
+    except KeyError:
+        raise KeyError(f"Unknown upstream: {name}") from None
+
+
+def _client_kwargs(name):
+    upstream = _config(name)
+    pool = settings.UPSTREAM_POOL
+    return {
+        "base_url": upstream["base_url"],
+        "timeout": httpx.Timeout(
+            upstream["timeout"],
+            connect=upstream.get("connect_timeout", pool["connect_timeout"]),
+            pool=pool["pool_timeout"],
+        ),
+    }
+
+
+def _transport_kwargs():
+    pool = settings.UPSTREAM_POOL
+    return {
+        "limits": httpx.Limits(
+            max_connections=pool["max_connections"],
+            max_keepalive_connections=pool["max_keepalive_connections"],
+            keepalive_expiry=pool["keepalive_expiry"],
+        ),
+        # needs the h2 package (pip install "httpx[http2]")
+        "http2": settings.UPSTREAM_HTTP2,
+        "retries": pool["connect_retries"],
+    }
+
+
+def _stats_for(name):
+    with _lock:
+        return _stats.setdefault(name, _PoolStats())
+
+
+def client(name) -> httpx.Client:
+    """The shared sync client for upstream `name` ("auth", "listing", "region")."""
+    existing = _clients.get(name)
+    if existing is not None:
+        return existing
+    stats = _stats_for(name)
+    with _lock:
+        if name not in _clients:
+            _clients[name] = httpx.Client(
+                transport=_Transport(stats, **_transport_kwargs()),
+                **_client_kwargs(name),
+            )
+        return _clients[name]
+
+
+def async_client(name) -> httpx.AsyncClient:
+    """The AsyncClient for upstream `name` on the running event loop."""
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.setdefault(loop, {})
+    if name not in clients:
+        clients[name] = httpx.AsyncClient(
+            transport=_AsyncTransport(_stats_for(name), **_transport_kwargs()),
+            **_client_kwargs(name),
+        )
+    return clients[name]
+
+
+async def arequest(name, method, url, **kwargs) -> httpx.Response:
+    """`method` `url` on upstream `name`'s async client, behind its concurrency limit."""
+    loop = asyncio.get_running_loop()
+    semaphores = _semaphores.setdefault(loop, {})
+    if name not in semaphores:
+        semaphores[name] = asyncio.Semaphore(settings.UPSTREAM_CONCURRENCY)
+    async with semaphores[name]:
+        return await async_client(name).request(method, url, **kwargs)
+
+
+def _pool_connections(transport):
+    connections = transport._pool.connections
+    idle = sum(1 for conn in connections if conn.is_idle())
+    return {"connections": len(connections), "idle": idle, "in_use": len(connections) - idle}
+
+
+def pool_stats() -> dict:
+    """Per-upstream pool usage: open/idle/in-use connections and pool wait times."""
+    result = {}
+    for name in settings.UPSTREAMS:
+        pools = []
+        if name in _clients:
+            pools.append(_pool_connections(_clients[name]._transport))
+        for clients in list(_async_clients.values()):
+            if name in clients:
+                pools.append(_pool_connections(clients[name]._transport))
+        entry = {
+            key: sum(pool[key] for pool in pools)
+            for key in ("connections", "idle", "in_use")
+        }
+        entry.update(_stats_for(name).snapshot())
+        result[name] = entry
+    return result
+
+
+def close():
+    """Close the sync clients; the next client() call opens a fresh one."""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for c in clients:
+        c.close()
+
+
+async def aclose():
+    """Close the running loop's async clients and the sync clients."""
+    loop = asyncio.get_running_loop()
+    _semaphores.pop(loop, None)
+    for c in _async_clients.pop(loop, {}).values():
+        await c.aclose()
+    close()
+
+
+atexit.register(close)
+
+
+class LifespanMiddleware:
+    """
+    ASGI wrapper that answers lifespan events, which Django's handler does
+    not, and closes the upstream clients on shutdown.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "lifespan":
+            return await self.app(scope, receive, send)
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await aclose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
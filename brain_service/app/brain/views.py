@@ -1,7 +1,14 @@
 
 from django.shortcuts import render
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
 from django.conf import settings
 from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+import asyncio
+import functools
 import hashlib
 import json
 
@@ -13,11 +20,13 @@ from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.response import Response
 
 from .auth_client import verify_user
+from . import singleflight, stale_cache, upstreams
+from .listing_changes import alistings_generation, listings_generation
 
 
-AUTH_URL = "http://auth-srv:8000/api/v1"
-LISTING_URL = "http://listing-srv:8000/api/v1"
-REGION_URL = "http://region-srv:5000"
+AUTH_URL = settings.UPSTREAMS["auth"]["base_url"]
+LISTING_URL = settings.UPSTREAMS["listing"]["base_url"]
+REGION_URL = settings.UPSTREAMS["region"]["base_url"]
 
 
 def _forward_auth_header(request) -> dict:
@@ -25,150 +34,362 @@ def _forward_auth_header(request) -> dict:
     return {"Authorization": auth_header} if auth_header else {}
 
 
+VALIDATOR_HEADERS = ("ETag", "Last-Modified", "Cache-Control")
+
+
+def _forward_validators(request) -> dict:
+    """Conditional-GET headers from the caller, to send upstream unchanged."""
+    return {
+        name: request.headers[name]
+        for name in ("If-None-Match", "If-Modified-Since")
+        if name in request.headers
+    }
+
+
+def _validator_headers(resp) -> dict:
+    return {name: resp.headers[name] for name in VALIDATOR_HEADERS if name in resp.headers}
+
+
+def _not_modified(resp):
+    return Response(status=status.HTTP_304_NOT_MODIFIED, headers=_validator_headers(resp))
+
+
+def _conditional_response(resp):
+    """Pass an upstream body with its validators, or its 304, through to the caller."""
+    if resp.status_code == 304:
+        return _not_modified(resp)
+    if resp.status_code != 200:
+        return Response(
+            {"detail": resp.text},
+            status=resp.status_code,
+        )
+    return Response(resp.json(), status=status.HTTP_200_OK, headers=_validator_headers(resp))
+
+
+def _cached_proxy(policy, version=None):
+    """
+    Cache a GET proxy's 200 answer (body and validators) under
+    settings.CACHE_POLICIES[policy], keyed by path and query, serving it
+    stale while it is refreshed or while the upstream is failing (see
+    stale_cache). The wrapped view asks upstream unconditionally; the
+    caller's If-None-Match / If-Modified-Since is answered here from the
+    cached validators. `version`, a callable, gives the entry's version
+    (e.g. listings_generation).
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            def fetch():
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    raise stale_cache.UpstreamError(response)
+                return {
+                    "data": response.data,
+                    "headers": {name: response[name] for name in VALIDATOR_HEADERS if response.has_header(name)},
+                }
+
+            cache_key = "proxy:" + hashlib.sha256(request.get_full_path().encode()).hexdigest()
+            try:
+                entry = stale_cache.get(cache_key, policy, fetch, version=version and version())
+            except stale_cache.UpstreamError as exc:
+                return exc.response
+            headers = entry["headers"]
+            return get_conditional_response(
+                request,
+                etag=headers.get("ETag"),
+                last_modified=parse_http_date_safe(headers.get("Last-Modified")),
+                response=Response(entry["data"], status=status.HTTP_200_OK, headers=headers),
+            )
+        return wrapper
+    return decorator
+
+
 @api_view(["GET"])
+@_cached_proxy("categories")
 def get_categories(request):
-    with httpx.Client() as client:
-        resp = client.get(f"{LISTING_URL}/category")
-        if resp.status_code != 200:
-            return Response(
-                {"detail": resp.text},
-                status=resp.status_code,
-            )
-        return Response(resp.json(), status=status.HTTP_200_OK)
+    client = upstreams.client("listing")
+    resp = client.get(f"{LISTING_URL}/category")
+    return _conditional_response(resp)
+
+
+@api_view(["GET"])
+@_cached_proxy("categories")
+def get_category_tree(request):
+    client = upstreams.client("listing")
+    resp = client.get(f"{LISTING_URL}/category/tree")
+    return _conditional_response(resp)
 
 
 @api_view(["GET"])
+@_cached_proxy("listings", version=listings_generation)
 def get_all_listings(request):
     params = dict(request.GET.items())
-    with httpx.Client() as client:
-        resp = client.get(f"{LISTING_URL}/listings", params=params)
-        if resp.status_code != 200:
-            return Response(
-                {"detail": resp.text},
-                status=resp.status_code,
-            )
-        return Response(resp.json(), status=status.HTTP_200_OK)
+    client = upstreams.client("listing")
+    resp = client.get(f"{LISTING_URL}/listings", params=params)
+    if resp.status_code != 200:
+        return Response(
+            {"detail": resp.text},
+            status=resp.status_code,
+        )
+    return Response(resp.json(), status=status.HTTP_200_OK)
 
 
-@api_view(["GET"])
-def get_user_listings(request, user_id: int):
-    with httpx.Client() as client:
-        user_resp = client.get(f"{AUTH_URL}/users/{user_id}")
-        if user_resp.status_code != 200:
-            return Response(
-                {"detail": user_resp.text},
-                status=user_resp.status_code,
+def _upstream_errors(view):
+    """
+    Answer 504 when an upstream call of an async view times out and 503
+    when the upstream cannot be reached, instead of a 500.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            return await view(request, *args, **kwargs)
+        except httpx.TimeoutException:
+            return JsonResponse(
+                {"detail": "Upstream service timed out"}, status=status.HTTP_504_GATEWAY_TIMEOUT
             )
-        user = user_resp.json()
-
-        listings_resp = client.get(
-            f"{LISTING_URL}/listings",
-            params={"user_id": user_id},
-        )
-        if listings_resp.status_code != 200:
-            return Response(
-                {"detail": listings_resp.text},
-                status=listings_resp.status_code,
+        except httpx.RequestError:
+            return JsonResponse(
+                {"detail": "Upstream service unavailable"}, status=status.HTTP_503_SERVICE_UNAVAILABLE
             )
-        listings = listings_resp.json()
+    return wrapper
+
 
-    return Response(
-        {"user": user, "listings": listings},
-        status=status.HTTP_200_OK,
+@require_GET
+@_upstream_errors
+async def get_user_listings(request, user_id: int):
+    """A user's profile and a page of their listings, fetched side by side."""
+    params = {"user_id": user_id}
+    for key in ["sort", "cursor", "limit"]:
+        value = request.GET.get(key)
+        if value:
+            params[key] = value
+
+    user_resp, listings_resp = await asyncio.gather(
+        upstreams.arequest("auth", "GET", f"{AUTH_URL}/users/{user_id}"),
+        upstreams.arequest("listing", "GET", f"{LISTING_URL}/listings", params=params),
     )
+    if user_resp.status_code != 200:
+        return JsonResponse({"detail": user_resp.text}, status=user_resp.status_code)
+    if listings_resp.status_code != 200:
+        return JsonResponse({"detail": listings_resp.text}, status=listings_resp.status_code)
+
+    return JsonResponse({"user": user_resp.json(), "listings": listings_resp.json()})
+
+
+
+# filters understood by listing_service's /listings and /listings/facets
+LISTING_FILTER_PARAMS = [
+    "q",
+    "location",
+    "category",
+    "min_price",
+    "max_price",
+    "user_id",
+    "state_slug",
+    "district_slug",
+    "city_slug",
+    "locality_slug",
+    "category_slug",
+    "near_lat",
+    "near_lng",
+    "radius_km",
+]
+
+
+def _locality_query(location: str):
+    """
+    /localities params for `location`: a bare locality slug ("koramangala")
+    or a path ending in one ("karnataka/.../koramangala").
+    """
+    parts = [p for p in location.strip("/").split("/") if p]
+    if not parts:
+        return None
+    params = {"slug": parts[-1]}
+    # leading parts narrow it down: state, district, city
+    params.update(zip(("state", "district", "city"), parts[:-1]))
+    return params
 
 
+def _with_points(resp) -> list:
+    if resp.status_code != 200:
+        return []
+    return [p for p in resp.json() if p["latitude"] is not None]
 
-@api_view(["GET"])
-def get_listings_with_images(request):
+
+def _locality_points(location: str) -> list:
+    """Region localities matching `location` that have coordinates."""
+    params = _locality_query(location)
+    if params is None:
+        return []
+    return _with_points(upstreams.client("region").get(f"{REGION_URL}/localities", params=params))
+
+
+async def _near_params(request):
+    """
+    near_lat/near_lng for a `near=<locality>` query, or a 400 response when
+    the locality is unknown, has no coordinates or is ambiguous.
+    """
+    near = request.GET.get("near")
+    params = _locality_query(near or "")
+    if params is None:
+        return {}, None
+    async def fetch():
+        resp = await singleflight.get("region", f"{REGION_URL}/localities", params=params)
+        if resp.status_code != 200:
+            raise stale_cache.UpstreamError(
+                JsonResponse({"detail": "Failed to resolve locality"}, status=resp.status_code)
+            )
+        return _with_points(resp)
+
+    cache_key = "near:" + hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+    try:
+        points = await stale_cache.aget(cache_key, "near", fetch)
+    except stale_cache.UpstreamError as exc:
+        return None, exc.response
+    if not points:
+        return None, JsonResponse({"detail": f"Unknown locality: {near}"}, status=400)
+    if len(points) > 1:
+        return None, JsonResponse(
+            {
+                "detail": f"Ambiguous locality: {near}; pass the full path",
+                "candidates": [p["location"] for p in points],
+            },
+            status=400,
+        )
+    return {"near_lat": points[0]["latitude"], "near_lng": points[0]["longitude"]}, None
+
+
+@require_GET
+@_upstream_errors
+async def get_listings_with_images(request):
     """
         Proxy: list listings and attach their images.
         UI calls:
           GET `/api/v1/brain/listings-with-images?...`
         listing_service calls:
-          - GET `/listings` with filters
-          - GET `/listing/{id}/images/` per listing
+          - GET `/listings?include=images` with filters (one keyset page,
+            `cursor`/`limit`), images embedded in each item
+        `near=<locality>` (with optional `radius_km`) is resolved to a point
+        through region_service; results then default to nearest first.
+        Returns `{"items": [...], "next_cursor": ...}`.
     """
-    # build a cache key from query params
-    raw_key = json.dumps(sorted(request.GET.items()))
-    cache_key = "listings_with_images:" + hashlib.sha256(raw_key.encode()).hexdigest()
+    # the change-feed poll and the locality lookup don't depend on each other
+    generation, (params, error) = await asyncio.gather(
+        alistings_generation(),
+        _near_params(request),
+    )
+    if error:
+        return error
 
-    cached = cache.get(cache_key)
-    if cached is not None:
-        return Response(cached, status=status.HTTP_200_OK)
-    params = {}
-    for key in [
-        "location",
-        "category",
-        "min_price",
-        "max_price",
-        "user_id",
-        "state_slug",
-        "district_slug",
-        "city_slug",
-        "locality_slug",
-        "category_slug",
-        "slug",  # optional, if you later support slug filtering in listing_service
-    ]:
+    for key in LISTING_FILTER_PARAMS + ["sort", "cursor", "limit"]:
         value = request.GET.get(key)
         if value:
             params[key] = value
 
-    with httpx.Client() as client:
-        core_resp = client.get(f"{LISTING_URL}/listings", params=params, timeout=5.0)
+    # images are embedded by listing_service (`image` is already a URL)
+    params["include"] = "images"
+
+    async def fetch():
+        # an expired popular page sends many identical requests at once
+        core_resp = await singleflight.get("listing", f"{LISTING_URL}/listings", params=params, timeout=5.0)
         if core_resp.status_code != 200:
-            return Response(
-                {"detail": core_resp.text},
-                status=core_resp.status_code,
+            raise stale_cache.UpstreamError(
+                JsonResponse({"detail": core_resp.text}, status=core_resp.status_code)
             )
+        page = core_resp.json()
+        results = page.get("items", [])
+        for item in results:
+            item["images"] = item.get("images") or []
+        return {"items": results, "next_cursor": page.get("next_cursor")}
+
+    # a page fetched before the change feed's current position is refetched
+    # before use, and only served again if listing_service is failing
+    raw_key = json.dumps(sorted(request.GET.items()))
+    cache_key = "listings_with_images:" + hashlib.sha256(raw_key.encode()).hexdigest()
+    try:
+        payload = await stale_cache.aget(cache_key, "listings", fetch, version=generation)
+    except stale_cache.UpstreamError as exc:
+        return exc.response
+    return JsonResponse(payload)
 
-        listings = core_resp.json()
-        if not isinstance(listings, list):
-            listings = [listings]
-
-        results = []
-        for item in listings:
-            listing_id = item.get("id")
-            images = []
-
-            if listing_id:
-                img_resp = client.get(
-                    f"{LISTING_URL}/listing/{listing_id}/images/",
-                    timeout=5.0,
-                )
-                if img_resp.status_code == 200:
-                    # listing_service already returns `image` as a URL, keep as is
-                    images = img_resp.json()
-
-            item["images"] = images
-            results.append(item)
-    cache.set(cache_key, results, timeout=60)
-    return Response(results, status=status.HTTP_200_OK)
 
-@api_view(["GET"])
-def get_listing_details(request, listing_id: int):
+@require_GET
+@_upstream_errors
+async def get_listing_facets(request):
     """
-    Detail page: return a single listing with its images.
+    Proxy: facet counts (categories, next location level, price buckets)
+    for the same filters as listings-with-images. `cached=true` accepts
+    counts a few minutes old, for broad browse pages.
     """
-    with httpx.Client() as client:
-        # listing core data
-        core_resp = client.get(f"{LISTING_URL}/listing/{listing_id}", timeout=5.0)
-        if core_resp.status_code != 200:
-            return Response(
-                {"detail": core_resp.text},
-                status=core_resp.status_code,
-            )
+    generation, (params, error) = await asyncio.gather(
+        alistings_generation(),
+        _near_params(request),
+    )
+    if error:
+        return error
+    params.update({key: request.GET[key] for key in LISTING_FILTER_PARAMS + ["cached"] if request.GET.get(key)})
+
+    async def fetch():
+        resp = await singleflight.get("listing", f"{LISTING_URL}/listings/facets", params=params, timeout=5.0)
+        if resp.status_code != 200:
+            raise stale_cache.UpstreamError(JsonResponse({"detail": resp.text}, status=resp.status_code))
+        return resp.json()
+
+    raw_key = json.dumps(sorted(request.GET.items()))
+    cache_key = "listing_facets:" + hashlib.sha256(raw_key.encode()).hexdigest()
+    try:
+        payload = await stale_cache.aget(cache_key, "facets", fetch, version=generation)
+    except stale_cache.UpstreamError as exc:
+        return exc.response
+    return JsonResponse(payload)
+
+
+@require_GET
+@_upstream_errors
+async def get_listing_details(request, listing_id: int):
+    """
+    Detail page: return a single listing with its images (embedded by
+    listing_service, so this is one upstream call).
+    """
+    core_resp = await singleflight.get(
+        "listing",
+        f"{LISTING_URL}/listing/{listing_id}",
+        params={"include": "images"},
+        headers=_forward_validators(request),
+        timeout=5.0,
+    )
+    if core_resp.status_code == 304:
+        response = HttpResponseNotModified()
+    elif core_resp.status_code != 200:
+        return JsonResponse({"detail": core_resp.text}, status=core_resp.status_code)
+    else:
         listing = core_resp.json()
+        listing["images"] = listing.get("images") or []
+        response = JsonResponse(listing)
+    for name, value in _validator_headers(core_resp).items():
+        response[name] = value
+    return response
 
-        # listing images
-        img_resp = client.get(
-            f"{LISTING_URL}/listing/{listing_id}/images/",
-            timeout=5.0,
-        )
-        images = img_resp.json() if img_resp.status_code == 200 else []
+def get_image_variant(request, name: str):
+    """
+    Resized listing image, rendered on demand by listing_service.
+    Mounted at the same path as upstream so `sizes` URLs work through brain.
+    """
+    client = upstreams.client("listing")
+    resp = client.get(
+        f"{LISTING_URL}/media/variant/{name}",
+        params=dict(request.GET.items()),
+        timeout=15.0,
+    )
+    response = HttpResponse(
+        resp.content,
+        status=resp.status_code,
+        content_type=resp.headers.get("content-type"),
+    )
+    if "cache-control" in resp.headers:
+        response["Cache-Control"] = resp.headers["cache-control"]
+    return response
 
-    listing["images"] = images
-    return Response(listing, status=status.HTTP_200_OK)
 
 @api_view(["POST"])
 @parser_classes([MultiPartParser, FormParser])
@@ -186,16 +407,16 @@ def upload_listing_image(request, listing_id: int):
 
     files["image"] = (image_file.name, image_file.read(), image_file.content_type)
 
-    with httpx.Client() as client:
-        resp = client.post(
-            f"{LISTING_URL}/listing/{listing_id}/image/upload",
-            files=files,
-            headers=_forward_auth_header(request),
-            timeout=15.0,
-        )
-        if resp.status_code not in (200, 201):
-            return Response({"detail": resp.text}, status=resp.status_code)
-        return Response(resp.json(), status=resp.status_code)
+    client = upstreams.client("listing")
+    resp = client.post(
+        f"{LISTING_URL}/listing/{listing_id}/image/upload",
+        files=files,
+        headers=_forward_auth_header(request),
+        timeout=15.0,
+    )
+    if resp.status_code not in (200, 201):
+        return Response({"detail": resp.text}, status=resp.status_code)
+    return Response(resp.json(), status=resp.status_code)
 
 
 @api_view(["POST"])
@@ -211,8 +432,8 @@ def register(request):
     """
     data = request.data
 
-    with httpx.Client() as client:
-        resp = client.post(f"{AUTH_URL}/register", json=data, timeout=5.0)
+    client = upstreams.client("auth")
+    resp = client.post(f"{AUTH_URL}/register", json=data, timeout=5.0)
 
     # Try to decode JSON body if present
     try:
@@ -236,43 +457,43 @@ def register(request):
 @parser_classes([JSONParser])
 def login(request):
     data = request.data
-    with httpx.Client() as client:
-        resp = client.post(f"{AUTH_URL}/login", json=data)
-        if resp.status_code != 200:
-            return Response(
-                {"detail": resp.text},
-                status=resp.status_code,
-            )
-        return Response(resp.json(), status=status.HTTP_200_OK)
+    client = upstreams.client("auth")
+    resp = client.post(f"{AUTH_URL}/login", json=data)
+    if resp.status_code != 200:
+        return Response(
+            {"detail": resp.text},
+            status=resp.status_code,
+        )
+    return Response(resp.json(), status=status.HTTP_200_OK)
 
 
 @api_view(["POST"])
 @parser_classes([JSONParser])
 def change_password(request):
     data = request.data
-    with httpx.Client() as client:
-        resp = client.post(f"{AUTH_URL}/users/change_password", json=data)
-        if resp.status_code != 200:
-            return Response(
-                {"detail": resp.text},
-                status=resp.status_code,
-            )
-        return Response(resp.json(), status=status.HTTP_200_OK)
+    client = upstreams.client("auth")
+    resp = client.post(f"{AUTH_URL}/users/change_password", json=data)
+    if resp.status_code != 200:
+        return Response(
+            {"detail": resp.text},
+            status=resp.status_code,
+        )
+    return Response(resp.json(), status=status.HTTP_200_OK)
 
 
 @api_view(["GET"])
 def get_user(request, user_id: int):
-    with httpx.Client() as client:
-        try:
-            resp = client.get(
-                f"{AUTH_URL}/users/{user_id}",
-                timeout=5.0,
-            )
-        except httpx.RequestError:
-            return Response(
-                {"detail": "Auth service unavailable"},
-                status=status.HTTP_503_SERVICE_UNAVAILABLE,
-            )
+    client = upstreams.client("auth")
+    try:
+        resp = client.get(
+            f"{AUTH_URL}/users/{user_id}",
+            timeout=5.0,
+        )
+    except httpx.RequestError:
+        return Response(
+            {"detail": "Auth service unavailable"},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
 
     if resp.status_code != 200:
         return Response(
@@ -294,17 +515,17 @@ def update_user_profile(request):
         )
     user_id = user.get("user_id")
 
-    with httpx.Client() as client:
-        resp = client.post(
-            f"{AUTH_URL}/update_user_profile/{user_id}",
-            json=request.data,
+    client = upstreams.client("auth")
+    resp = client.post(
+        f"{AUTH_URL}/update_user_profile/{user_id}",
+        json=request.data,
+    )
+    if resp.status_code != 200:
+        return Response(
+            {"detail": resp.text},
+            status=resp.status_code,
         )
-        if resp.status_code != 200:
-            return Response(
-                {"detail": resp.text},
-                status=resp.status_code,
-            )
-        return Response(resp.json(), status=status.HTTP_200_OK)
+    return Response(resp.json(), status=status.HTTP_200_OK)
 
 
 @api_view(["POST"])
@@ -314,7 +535,7 @@ def create_listing(request):
     Brain endpoint used by UI `sell_submit`.
 
     Expects JSON:
-    title, category (int), price (float/int),
+    title, description, category (int), price (float/int),
     state_slug, district_slug, city_slug, locality_slug,
     optional is_active.
 
@@ -355,6 +576,7 @@ def create_listing(request):
     payload = {
         "user_id": user_id,
         "title": data.get("title"),
+        "description": data.get("description", ""),
         "category": data.get("category"),
         "price": data.get("price"),
         "locality_slug": data.get("locality_slug"),
@@ -362,14 +584,50 @@ def create_listing(request):
         "is_active": data.get("is_active", True),
     }
 
-    with httpx.Client() as client:
-        resp = client.post(f"{LISTING_URL}/listing/create", json=payload)
-        if resp.status_code not in (200, 201):
-            return Response(
-                {"detail": resp.text},
-                status=resp.status_code,
-            )
-        return Response(resp.json(), status=status.HTTP_200_OK)
+    client = upstreams.client("listing")
+    # copy the locality's point for radius search; listings without
+    # one are picked up later by listing_service's geocode_listings
+    try:
+        points = _locality_points(location_path)
+    except httpx.HTTPError:
+        points = []
+    if len(points) == 1:
+        payload["latitude"] = points[0]["latitude"]
+        payload["longitude"] = points[0]["longitude"]
+    resp = client.post(f"{LISTING_URL}/listing/create", json=payload)
+    if resp.status_code not in (200, 201):
+        return Response(
+            {"detail": resp.text},
+            status=resp.status_code,
+        )
+    return Response(resp.json(), status=status.HTTP_200_OK)
+
+
+@csrf_exempt
+@require_POST
+def bulk_create_listings(request):
+    """
+    Bulk create/upsert for the logged-in user from an NDJSON or CSV feed.
+
+    Plain Django view so the body is streamed to listing_service as it is
+    read instead of being parsed by DRF first. `mode` is passed through.
+    """
+    user = verify_user(request)
+    if not user:
+        return JsonResponse({"detail": "Please log in to continue"}, status=401)
+
+    params = {"user_id": user.get("user_id"), "mode": request.GET.get("mode", "insert")}
+    client = upstreams.client("listing")
+    resp = client.post(
+        f"{LISTING_URL}/listings/bulk",
+        params=params,
+        content=iter(request),
+        headers={"Content-Type": request.content_type or "application/x-ndjson"},
+        timeout=300.0,
+    )
+    if resp.status_code != 200:
+        return JsonResponse({"detail": resp.text}, status=resp.status_code)
+    return JsonResponse(resp.json())
 
 
 @api_view(["PUT"])
@@ -384,32 +642,42 @@ def update_listing(request, listing_id: int):
     user_id = user.get("user_id")
     is_staff = user.get("is_staff", False)
 
-    with httpx.Client() as client:
-        # fetch listing to check ownership
-        resp = client.get(f"{LISTING_URL}/listing/{listing_id}")
-        if resp.status_code != 200:
-            return Response(
-                {"detail": "Listing not found"},
-                status=resp.status_code,
-            )
-        listing = resp.json()
+    client = upstreams.client("listing")
+    # fetch listing to check ownership
+    resp = client.get(f"{LISTING_URL}/listing/{listing_id}")
+    if resp.status_code != 200:
+        return Response(
+            {"detail": "Listing not found"},
+            status=resp.status_code,
+        )
+    listing = resp.json()
 
-        if listing.get("owner_user_id") != user_id and not is_staff:
-            return Response(
-                {"detail": "Unauthorized"},
-                status=status.HTTP_401_UNAUTHORIZED,
-            )
+    if listing.get("owner_user_id") != user_id and not is_staff:
+        return Response(
+            {"detail": "Unauthorized"},
+            status=status.HTTP_401_UNAUTHORIZED,
+        )
 
-        update_resp = client.put(
-            f"{LISTING_URL}/listing/{listing_id}",
-            json=request.data,
+    payload = dict(request.data)
+    if payload.get("location") and "latitude" not in payload:
+        try:
+            points = _locality_points(payload["location"])
+        except httpx.HTTPError:
+            points = []
+        if len(points) == 1:
+            payload["latitude"] = points[0]["latitude"]
+            payload["longitude"] = points[0]["longitude"]
+
+    update_resp = client.put(
+        f"{LISTING_URL}/listing/{listing_id}",
+        json=payload,
+    )
+    if update_resp.status_code != 200:
+        return Response(
+            {"detail": update_resp.text},
+            status=update_resp.status_code,
         )
-        if update_resp.status_code != 200:
-            return Response(
-                {"detail": update_resp.text},
-                status=update_resp.status_code,
-            )
-        return Response(update_resp.json(), status=status.HTTP_200_OK)
+    return Response(update_resp.json(), status=status.HTTP_200_OK)
 
 
 @api_view(["DELETE"])
@@ -424,188 +692,294 @@ def delete_listing(request, listing_id: int):
     user_id = user.get("user_id")
     is_staff = user.get("is_staff", False)
 
-    with httpx.Client() as client:
-        resp = client.get(f"{LISTING_URL}/listing/{listing_id}")
-        if resp.status_code != 200:
-            return Response(
-                {"detail": "Listing not found"},
-                status=resp.status_code,
-            )
+    client = upstreams.client("listing")
+    resp = client.get(f"{LISTING_URL}/listing/{listing_id}")
+    if resp.status_code != 200:
+        return Response(
+            {"detail": "Listing not found"},
+            status=resp.status_code,
+        )
 
-        listing = resp.json()
-        if listing.get("owner_user_id") != user_id and not is_staff:
-            return Response(
-                {"detail": "Unauthorized"},
+    listing = resp.json()
+    if listing.get("owner_user_id") != user_id and not is_staff:
+        return Response(
+            {"detail": "Unauthorized"},
+            status=status.HTTP_401_UNAUTHORIZED,
+        )
+
+    delete_resp = client.delete(f"{LISTING_URL}/listing/{listing_id}")
+    if delete_resp.status_code != 200:
+        return Response(
+            {"detail": delete_resp.text},
+            status=delete_resp.status_code,
+        )
+    return Response(delete_resp.json(), status=status.HTTP_200_OK)
+
+
+@api_view(["GET", "POST"])
+@parser_classes([JSONParser])
+def listing_reviews(request, listing_id: int):
+    """
+    GET: a listing's reviews, newest first (`cursor`/`limit`).
+    POST: add a review as the logged-in user; JSON `rating` (1-5), `comment`.
+    """
+    client = upstreams.client("listing")
+    if request.method == "GET":
+        params = {key: request.GET[key] for key in ("cursor", "limit") if request.GET.get(key)}
+        resp = client.get(f"{LISTING_URL}/listing/{listing_id}/reviews", params=params)
+    else:
+        user = verify_user(request)
+        if not user:
+            return Response(
+                {"detail": "Please log in to continue"},
                 status=status.HTTP_401_UNAUTHORIZED,
             )
+        payload = {
+            "user_id": user.get("user_id"),
+            "rating": request.data.get("rating"),
+            "comment": request.data.get("comment", ""),
+        }
+        resp = client.post(f"{LISTING_URL}/listing/{listing_id}/reviews", json=payload)
+    if resp.status_code != 200:
+        return Response(
+            {"detail": resp.text},
+            status=resp.status_code,
+        )
+    return Response(resp.json(), status=status.HTTP_200_OK)
 
-        delete_resp = client.delete(f"{LISTING_URL}/listing/{listing_id}")
-        if delete_resp.status_code != 200:
-            return Response(
-                {"detail": delete_resp.text},
-                status=delete_resp.status_code,
-            )
-        return Response(delete_resp.json(), status=status.HTTP_200_OK)
+
+@api_view(["GET"])
+def get_favorites(request):
+    """The logged-in user's favorites, newest first, one cursor page at a time."""
+    user = verify_user(request)
+    if not user:
+        return Response(
+            {"detail": "Please log in to continue"},
+            status=status.HTTP_401_UNAUTHORIZED,
+        )
+    params = {key: request.GET[key] for key in ("cursor", "limit") if request.GET.get(key)}
+    client = upstreams.client("listing")
+    resp = client.get(f"{LISTING_URL}/favorites/{user.get('user_id')}", params=params)
+    if resp.status_code != 200:
+        return Response(
+            {"detail": resp.text},
+            status=resp.status_code,
+        )
+    return Response(resp.json(), status=status.HTTP_200_OK)
 
 
 @api_view(["GET"])
+def get_favorites_contains(request):
+    """
+    Which of `?ids=1,2,3` the logged-in user has favorited, so a grid page
+    can mark its cards with one call.
+    """
+    user = verify_user(request)
+    if not user:
+        return Response(
+            {"detail": "Please log in to continue"},
+            status=status.HTTP_401_UNAUTHORIZED,
+        )
+    client = upstreams.client("listing")
+    resp = client.get(
+        f"{LISTING_URL}/favorites/{user.get('user_id')}/contains",
+        params={"ids": request.GET.get("ids", "")},
+    )
+    if resp.status_code != 200:
+        return Response(
+            {"detail": resp.text},
+            status=resp.status_code,
+        )
+    return Response(resp.json(), status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+@_cached_proxy("regions")
 def get_states(request):
-    with httpx.Client() as client:
-        resp = client.get(f"{REGION_URL}/states")
-        if resp.status_code != 200:
-            return Response(
-                {"detail": "Failed to fetch states"},
-                status=resp.status_code,
-            )
-        return Response(resp.json(), status=status.HTTP_200_OK)
+    client = upstreams.client("region")
+    resp = client.get(f"{REGION_URL}/states")
+    if resp.status_code != 200:
+        return Response(
+            {"detail": "Failed to fetch states"},
+            status=resp.status_code,
+        )
+    return Response(resp.json(), status=status.HTTP_200_OK, headers=_validator_headers(resp))
 
 
 @api_view(["GET"])
+@_cached_proxy("regions")
 def get_districts(request, state_slug: str):
-    with httpx.Client() as client:
-        state_resp = client.get(
-            f"{REGION_URL}/states",
-            params={"slug": state_slug},
+    client = upstreams.client("region")
+    state_resp = client.get(
+        f"{REGION_URL}/states",
+        params={"slug": state_slug},
+    )
+    if state_resp.status_code != 200:
+        return Response(
+            {"detail": "Failed to fetch state"},
+            status=state_resp.status_code,
+        )
+    states = state_resp.json()
+    if not states:
+        return Response(
+            {"detail": "State not found"},
+            status=status.HTTP_404_NOT_FOUND,
         )
-        if state_resp.status_code != 200:
-            return Response(
-                {"detail": "Failed to fetch state"},
-                status=state_resp.status_code,
-            )
-        states = state_resp.json()
-        if not states:
-            return Response(
-                {"detail": "State not found"},
-                status=status.HTTP_404_NOT_FOUND,
-            )
 
-        state_code = states[0]["code"]
-        dist_resp = client.get(
-            f"{REGION_URL}/states/{state_code}/districts"
+    state_code = states[0]["code"]
+    dist_resp = client.get(
+        f"{REGION_URL}/states/{state_code}/districts"
+    )
+    if dist_resp.status_code != 200:
+        return Response(
+            {"detail": "Failed to fetch districts"},
+            status=dist_resp.status_code,
         )
-        if dist_resp.status_code != 200:
-            return Response(
-                {"detail": "Failed to fetch districts"},
-                status=dist_resp.status_code,
-            )
-        return Response(dist_resp.json(), status=status.HTTP_200_OK)
+    return Response(dist_resp.json(), status=status.HTTP_200_OK, headers=_validator_headers(dist_resp))
 
 
 @api_view(["GET"])
+@_cached_proxy("regions")
 def get_cities(request, state_slug: str, district_slug: str):
-    with httpx.Client() as client:
-        state_resp = client.get(
-            f"{REGION_URL}/states",
-            params={"slug": state_slug},
+    client = upstreams.client("region")
+    state_resp = client.get(
+        f"{REGION_URL}/states",
+        params={"slug": state_slug},
+    )
+    if state_resp.status_code != 200:
+        return Response(
+            {"detail": "Failed to fetch state"},
+            status=state_resp.status_code,
         )
-        if state_resp.status_code != 200:
-            return Response(
-                {"detail": "Failed to fetch state"},
-                status=state_resp.status_code,
-            )
-        states = state_resp.json()
-        if not states:
-            return Response(
-                {"detail": "State not found"},
-                status=status.HTTP_404_NOT_FOUND,
-            )
-        state_code = states[0]["code"]
+    states = state_resp.json()
+    if not states:
+        return Response(
+            {"detail": "State not found"},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+    state_code = states[0]["code"]
 
-        dist_resp = client.get(
-            f"{REGION_URL}/states/{state_code}/districts"
+    dist_resp = client.get(
+        f"{REGION_URL}/states/{state_code}/districts"
+    )
+    if dist_resp.status_code != 200:
+        return Response(
+            {"detail": "Failed to fetch districts"},
+            status=dist_resp.status_code,
         )
-        if dist_resp.status_code != 200:
-            return Response(
-                {"detail": "Failed to fetch districts"},
-                status=dist_resp.status_code,
-            )
-        districts = dist_resp.json()
-        district = next(
-            (d for d in districts if d["slug"] == district_slug),
-            None,
+    districts = dist_resp.json()
+    district = next(
+        (d for d in districts if d["slug"] == district_slug),
+        None,
+    )
+    if not district:
+        return Response(
+            {"detail": "District not found"},
+            status=status.HTTP_404_NOT_FOUND,
         )
-        if not district:
-            return Response(
-                {"detail": "District not found"},
-                status=status.HTTP_404_NOT_FOUND,
-            )
 
-        city_resp = client.get(
-            f"{REGION_URL}/states/{state_code}/districts/{district['code']}/cities"
+    city_resp = client.get(
+        f"{REGION_URL}/states/{state_code}/districts/{district['code']}/cities"
+    )
+    if city_resp.status_code != 200:
+        return Response(
+            {"detail": "Failed to fetch cities"},
+            status=city_resp.status_code,
         )
-        if city_resp.status_code != 200:
-            return Response(
-                {"detail": "Failed to fetch cities"},
-                status=city_resp.status_code,
-            )
-        return Response(city_resp.json(), status=status.HTTP_200_OK)
+    return Response(city_resp.json(), status=status.HTTP_200_OK, headers=_validator_headers(city_resp))
 
 
 @api_view(["GET"])
+@_cached_proxy("regions")
 def get_localities(request, state_slug: str, district_slug: str, city_slug: str):
-    with httpx.Client() as client:
-        state_resp = client.get(
-            f"{REGION_URL}/states",
-            params={"slug": state_slug},
+    client = upstreams.client("region")
+    state_resp = client.get(
+        f"{REGION_URL}/states",
+        params={"slug": state_slug},
+    )
+    if state_resp.status_code != 200:
+        return Response(
+            {"detail": "Failed to fetch state"},
+            status=state_resp.status_code,
         )
-        if state_resp.status_code != 200:
-            return Response(
-                {"detail": "Failed to fetch state"},
-                status=state_resp.status_code,
-            )
-        states = state_resp.json()
-        if not states:
-            return Response(
-                {"detail": "State not found"},
-                status=status.HTTP_404_NOT_FOUND,
-            )
-        state_code = states[0]["code"]
+    states = state_resp.json()
+    if not states:
+        return Response(
+            {"detail": "State not found"},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+    state_code = states[0]["code"]
 
-        dist_resp = client.get(
-            f"{REGION_URL}/states/{state_code}/districts"
+    dist_resp = client.get(
+        f"{REGION_URL}/states/{state_code}/districts"
+    )
+    if dist_resp.status_code != 200:
+        return Response(
+            {"detail": "Failed to fetch districts"},
+            status=dist_resp.status_code,
         )
-        if dist_resp.status_code != 200:
-            return Response(
-                {"detail": "Failed to fetch districts"},
-                status=dist_resp.status_code,
-            )
-        districts = dist_resp.json()
-        district = next(
-            (d for d in districts if d["slug"] == district_slug),
-            None,
+    districts = dist_resp.json()
+    district = next(
+        (d for d in districts if d["slug"] == district_slug),
+        None,
+    )
+    if not district:
+        return Response(
+            {"detail": "District not found"},
+            status=status.HTTP_404_NOT_FOUND,
         )
-        if not district:
-            return Response(
-                {"detail": "District not found"},
-                status=status.HTTP_404_NOT_FOUND,
-            )
 
-        city_resp = client.get(
-            f"{REGION_URL}/states/{state_code}/districts/{district['code']}/cities"
+    city_resp = client.get(
+        f"{REGION_URL}/states/{state_code}/districts/{district['code']}/cities"
+    )
+    if city_resp.status_code != 200:
+        return Response(
+            {"detail": "Failed to fetch cities"},
+            status=city_resp.status_code,
         )
-        if city_resp.status_code != 200:
-            return Response(
-                {"detail": "Failed to fetch cities"},
-                status=city_resp.status_code,
-            )
-        cities = city_resp.json()
-        city = next(
-            (c for c in cities if c["slug"] == city_slug),
-            None,
+    cities = city_resp.json()
+    city = next(
+        (c for c in cities if c["slug"] == city_slug),
+        None,
+    )
+    if not city:
+        return Response(
+            {"detail": "City not found"},
+            status=status.HTTP_404_NOT_FOUND,
         )
-        if not city:
-            return Response(
-                {"detail": "City not found"},
-                status=status.HTTP_404_NOT_FOUND,
-            )
 
-        loc_resp = client.get(
-            f"{REGION_URL}/states/{state_code}/districts/"
-            f"{district['code']}/cities/{city['code']}/locality"
+    loc_resp = client.get(
+        f"{REGION_URL}/states/{state_code}/districts/"
+        f"{district['code']}/cities/{city['code']}/locality"
+    )
+    if loc_resp.status_code != 200:
+        return Response(
+            {"detail": "Failed to fetch localities"},
+            status=loc_resp.status_code,
         )
-        if loc_resp.status_code != 200:
-            return Response(
-                {"detail": "Failed to fetch localities"},
-                status=loc_resp.status_code,
-            )
-        return Response(loc_resp.json(), status=status.HTTP_200_OK)
\ No newline at end of file
+    return Response(loc_resp.json(), status=status.HTTP_200_OK, headers=_validator_headers(loc_resp))
+
+@api_view(["GET"])
+def get_upstream_stats(request):
+    """
+    Per upstream: connection pool usage (open/idle/in-use connections, pool
+    wait) and single-flight counters (calls made, requests that joined one,
+    results shared by another worker).
+    """
+    stats = upstreams.pool_stats()
+    for name, entry in stats.items():
+        entry["single_flight"] = singleflight.stats(name)
+    return Response(stats, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+def get_cache_stats(request):
+    """
+    This worker's cache counters: L1 (in-process LRU) hits, misses,
+    evictions and size; L2 (shared) hits, misses and errors; and how often
+    cached proxies answered fresh, stale, from upstream, or stale because
+    upstream failed.
+    """
+    stats = cache.stats()
+    stats["stale"] = stale_cache.stats()
+    return Response(stats, status=status.HTTP_200_OK)
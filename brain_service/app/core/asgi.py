@@ -14,3 +14,15 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_asgi_application()
+
+# imported after setup: they read settings
+from django.conf import settings  # noqa: E402
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler  # noqa: E402
+
+from brain.upstreams import LifespanMiddleware  # noqa: E402
+
+if settings.DEBUG:
+    # runserver did this for the UI's css/js; uvicorn does not
+    application = ASGIStaticFilesHandler(application)
+
+application = LifespanMiddleware(application)
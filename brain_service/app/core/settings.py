@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -29,13 +30,117 @@ DEBUG = True
 
 ALLOWED_HOSTS = ["*"]
 
+# two tiers (brain/tiered_cache.py): a per-process LRU bounded by bytes in
+# front of the "shared" cache every worker sees. Redis when REDIS_URL is
+# set, otherwise a DB table (python manage.py createcachetable)
+REDIS_URL = os.getenv("REDIS_URL")
+
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "BACKEND": "brain.tiered_cache.TieredCache",
         "LOCATION": "brain-default-cache",
         "TIMEOUT": 300,  # default timeout in seconds
-    }
+        "OPTIONS": {
+            "shared": "shared",
+            "max_bytes": int(os.getenv("CACHE_L1_MAX_BYTES", str(64 * 1024 * 1024))),
+            # longest an L1 copy may miss another worker's overwrite/delete
+            "max_timeout": int(os.getenv("CACHE_L1_MAX_TIMEOUT", "30")),
+        },
+    },
+    "shared": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+            "TIMEOUT": 300,
+        }
+        if REDIS_URL
+        else {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "brain_cache",
+            "TIMEOUT": 300,
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    ),
 }
+
+# cached GET proxies (brain/stale_cache.py), in seconds: entries are
+# fresh for `fresh`, then served stale while a background refresh runs for
+# `stale_while_revalidate`, and kept as a fallback for upstream errors
+# until `stale_if_error` past fresh
+CACHE_POLICIES = {
+    "listings": {
+        "fresh": int(os.getenv("LISTINGS_CACHE_SECONDS", "60")),
+        "stale_while_revalidate": 60,
+        "stale_if_error": 600,
+    },
+    # facet counts follow the same listings generation as the pages
+    "facets": {
+        "fresh": int(os.getenv("FACETS_CACHE_SECONDS", "60")),
+        "stale_while_revalidate": 300,
+        "stale_if_error": 3600,
+    },
+    # localities move about as often as the region dataset is reloaded
+    "near": {
+        "fresh": int(os.getenv("NEAR_CACHE_SECONDS", "3600")),
+        "stale_while_revalidate": 3600,
+        "stale_if_error": 86400,
+    },
+    "categories": {
+        "fresh": int(os.getenv("CATEGORY_CACHE_SECONDS", "60")),
+        "stale_while_revalidate": 300,
+        "stale_if_error": 3600,
+    },
+    "regions": {
+        "fresh": int(os.getenv("REGION_CACHE_SECONDS", "3600")),
+        "stale_while_revalidate": 86400,
+        "stale_if_error": 86400,
+    },
+}
+
+# upstream services; each gets one pooled client (brain/upstreams.py).
+# `timeout` is the default read/write timeout in seconds
+UPSTREAMS = {
+    "auth": {
+        "base_url": os.getenv("AUTH_URL", "http://auth-srv:8000/api/v1"),
+        "timeout": float(os.getenv("AUTH_TIMEOUT", "5")),
+    },
+    "listing": {
+        "base_url": os.getenv("LISTING_URL", "http://listing-srv:8000/api/v1"),
+        "timeout": float(os.getenv("LISTING_TIMEOUT", "15")),
+    },
+    "region": {
+        "base_url": os.getenv("REGION_URL", "http://region-srv:5000"),
+        "timeout": float(os.getenv("REGION_TIMEOUT", "5")),
+    },
+}
+UPSTREAM_POOL = {
+    "max_connections": int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "100")),
+    "max_keepalive_connections": int(os.getenv("UPSTREAM_MAX_KEEPALIVE", "20")),
+    "keepalive_expiry": float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "30")),
+    "connect_timeout": float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "2")),
+    # how long a request may wait for a free connection
+    "pool_timeout": float(os.getenv("UPSTREAM_POOL_TIMEOUT", "5")),
+    "connect_retries": int(os.getenv("UPSTREAM_CONNECT_RETRIES", "1")),
+}
+# requests one worker's async views may have in flight to each upstream
+UPSTREAM_CONCURRENCY = int(os.getenv("UPSTREAM_CONCURRENCY", "20"))
+# requires the h2 package (httpx[http2])
+UPSTREAM_HTTP2 = os.getenv("UPSTREAM_HTTP2", "False") == "True"
+
+# coalescing of identical in-flight upstream GETs (brain/singleflight.py):
+# lock_ttl bounds how long a crashed worker's lock blocks others, result_ttl
+# how long a response is kept for the workers that waited on that call
+# (only they can find it), wait how long they wait before calling
+# upstream themselves
+SINGLE_FLIGHT = {
+    "lock_ttl": float(os.getenv("SINGLE_FLIGHT_LOCK_TTL", "10")),
+    "result_ttl": float(os.getenv("SINGLE_FLIGHT_RESULT_TTL", "1")),
+    "wait": float(os.getenv("SINGLE_FLIGHT_WAIT", "5")),
+    "poll_interval": 0.05,
+}
+
+# how often cached listing pages check listing_service's change feed
+LISTING_CHANGES_POLL_SECONDS = float(os.getenv("LISTING_CHANGES_POLL_SECONDS", "2"))
 # Application definition
 
 INSTALLED_APPS = [
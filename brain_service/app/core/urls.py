@@ -10,9 +10,11 @@ urlpatterns = [
 
     # Brain proxy API (to auth_service, listing_service, location, etc.)
     path("api/v1/brain/categories", views.get_categories),
+    path("api/v1/brain/categories/tree", views.get_category_tree),
     path("api/v1/brain/listings", views.get_all_listings),
     path("api/v1/brain/user/<int:user_id>/listings", views.get_user_listings),
     path("api/v1/brain/listings-with-images", views.get_listings_with_images),
+    path("api/v1/brain/listings/facets", views.get_listing_facets),
     path(
         "api/v1/brain/listing/<int:listing_id>/image/upload",
         views.upload_listing_image,
@@ -21,6 +23,8 @@ urlpatterns = [
         "api/v1/brain/listing/<int:listing_id>/with-images",
         views.get_listing_details,
     ),
+    # on-demand image sizes (same path as listing_service, see ListingImageOut.sizes)
+    path("api/v1/media/variant/<path:name>", views.get_image_variant),
 
     # Auth-related proxy endpoints
     path("api/v1/brain/register", views.register),
@@ -31,9 +35,16 @@ urlpatterns = [
 
     # Listing CRUD proxy
     path("api/v1/brain/listing/create", views.create_listing),
+    path("api/v1/brain/listings/bulk", views.bulk_create_listings),
     path("api/v1/brain/listing/<int:listing_id>", views.update_listing),
     path("api/v1/brain/listing/<int:listing_id>/delete", views.delete_listing),
 
+    path("api/v1/brain/listing/<int:listing_id>/reviews", views.listing_reviews),
+
+    # Favorites of the logged-in user
+    path("api/v1/brain/favorites", views.get_favorites),
+    path("api/v1/brain/favorites/contains", views.get_favorites_contains),
+
     # Location proxy
     path("api/v1/brain/states", views.get_states),
     path("api/v1/brain/states/<str:state_slug>/districts", views.get_districts),
@@ -47,6 +58,10 @@ urlpatterns = [
         views.get_localities,
     ),
 
+    # Monitoring
+    path("api/v1/brain/upstreams/stats", views.get_upstream_stats),
+    path("api/v1/brain/cache/stats", views.get_cache_stats),
+
     # UI (HTMX + templates)
     path("", include(("huduku_ui.urls", "huduku_ui"), namespace="huduku_ui")),
 ]
@@ -17,17 +17,26 @@ def is_jwt_authenticated(request) -> bool:
     """
     return hasattr(request, "user_id")
 
+_categories = {"etag": None, "data": []}
+
+
 def fetch_categories():
     """
     Call Brain proxy to fetch categories for the sell form.
+    Revalidates the last copy with its ETag, so unchanged categories cost a 304.
     """
+    headers = {"If-None-Match": _categories["etag"]} if _categories["etag"] else {}
     try:
-        resp = requests.get(f"{BRAIN_SERVICE_BASE_URL}/categories", timeout=5)
+        resp = requests.get(f"{BRAIN_SERVICE_BASE_URL}/categories", headers=headers, timeout=5)
+        if resp.status_code == 304:
+            return _categories["data"]
         if resp.status_code == 200:
-            return resp.json()
+            _categories["data"] = resp.json()
+            _categories["etag"] = resp.headers.get("ETag")
+            return _categories["data"]
     except requests.RequestException:
         pass
-    return []
+    return _categories["data"]
 
 def home(request, state_slug=None, district_slug=None,
          city_slug=None, locality_slug=None, category_slug_path=None):
@@ -43,9 +52,10 @@ def home(request, state_slug=None, district_slug=None,
         # use last segment as category slug, if present
         "category_slug": category_slug_path.split("/")[-1]
         if category_slug_path else None,
-        "location": search_q or None,  # or adjust to your search logic
+        "q": search_q or None,  # full-text search over title/description
         "min_price": min_price or None,
         "max_price": max_price or None,
+        "cursor": request.GET.get("cursor") or None,
     }
     params = {k: v for k, v in filters.items() if v is not None}
 
@@ -56,17 +66,26 @@ def home(request, state_slug=None, district_slug=None,
             timeout=5,
         )
         if resp.status_code == 200:
-            listings = resp.json()
+            page = resp.json()
         else:
-            listings = []
+            page = {}
     except requests.RequestException:
-        listings = []
+        page = {}
+    listings = page.get("items", [])
+
+    # keep current search/price filters on the "load more" link
+    next_query = None
+    if page.get("next_cursor"):
+        query = request.GET.copy()
+        query["cursor"] = page["next_cursor"]
+        next_query = query.urlencode()
 
     categories = []        # later: Brain /categories
     selected_location = {} # later: derive from slugs
 
     context = {
         "listings": listings,
+        "next_query": next_query,
         "categories": categories,
         "selected_location": selected_location,
         "filters": filters,
@@ -136,7 +155,8 @@ def listing_detail(request, listing_slug):
             "price_display": listing_data.get("price_display") or str(listing_data.get("price", "")),
             "location_display": listing_data.get("location_display") or listing_data.get("location", ""),
             "images": [
-                {"url": img.get("image") or img.get("url")}
+                # detail-size variant instead of the full-size upload
+                {"url": (img.get("sizes") or {}).get("detail") or img.get("image") or img.get("url")}
                 for img in images
                 if img.get("image") or img.get("url")
             ],
@@ -227,6 +247,7 @@ def sell_submit(request):
         return HttpResponse("Missing user id", status=401)
 
     title = request.POST.get("title", "").strip()
+    description = request.POST.get("description", "").strip()
     category = request.POST.get("category", "").strip()  # should be numeric id from UI
     price = request.POST.get("price", "").strip()
     state_slug = request.POST.get("state_slug", "").strip()
@@ -260,6 +281,7 @@ def sell_submit(request):
     try:
         payload = {
             "title": title,
+            "description": description,
             "category": int(category),
             "price": int(price),
             "state_slug": state_slug,
@@ -604,9 +626,24 @@ def filters_partial(request):
     """
     HTMX: return filters bar (categories, search, price, location selector).
     """
-    # TODO: fetch categories and maybe current selection from Brain
-    categories = []
-    context = {"categories": categories}
+    params = {k: v for k, v in request.GET.items() if v}
+    # unfiltered browse pages take slightly stale counts instead of a full count
+    if not any(params.get(k) for k in ("q", "min_price", "max_price", "district_slug", "city_slug", "locality_slug")):
+        params["cached"] = "true"
+
+    facets = {}
+    try:
+        resp = requests.get(f"{BRAIN_SERVICE_BASE_URL}/listings/facets", params=params, timeout=5)
+        if resp.status_code == 200:
+            facets = resp.json()
+    except requests.RequestException:
+        pass
+
+    context = {
+        "categories": facets.get("categories", []),
+        "location_facet": facets.get("location", {}),
+        "price_facet": facets.get("price", []),
+    }
     return render(request, "listings/_filters.html", context)
 
 
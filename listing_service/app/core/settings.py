@@ -23,6 +23,9 @@ MEDIA_ROOT = BASE_DIR / "media"
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = 'django-insecure-5f()+1w++5fiqpg1)=7(^5)7z)pzchcwri9@#v)0=3+l^a1ql+'
 
+# signs the login JWTs (shared with auth_service and brain_service)
+JWT_SECRET = os.getenv("JWT_SECRET", "hrdhfhuier$343847520#D*&^^")
+
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.getenv("DJANGO_DEBUG","True") == "True"
 
@@ -38,6 +41,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'inventory.apps.InventoryConfig',
 ]
 
@@ -82,6 +86,19 @@ DATABASES = {
         "PASSWORD":os.getenv("POSTGRES_PASSWORD"),
         "HOST":os.getenv("DB_HOST"),
         "PORT":os.getenv("DB_PORT"),
+        # psycopg connection pool: without it every ASGI request opens (and
+        # closes) its own database connection
+        "OPTIONS": (
+            {
+                "pool": {
+                    "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+                    "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "20")),
+                    "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+                }
+            }
+            if os.getenv("DB_POOL", "True") == "True"
+            else {}
+        ),
     }
 }
 
@@ -125,6 +142,40 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# hand /media/ transfers to the front server: "" (Django streams the file
+# through Python; the default, and all uvicorn can do), "x-accel-redirect"
+# (nginx, `internal` location at MEDIA_ACCEL_PREFIX aliased to MEDIA_ROOT)
+# or "x-sendfile" (Apache mod_xsendfile, lighttpd). Only a front server
+# makes the transfer zero-copy; see inventory/media.py
+MEDIA_ACCEL = os.getenv("MEDIA_ACCEL", "")
+MEDIA_ACCEL_PREFIX = os.getenv("MEDIA_ACCEL_PREFIX", "/protected-media/")
+# browser cache lifetime for media that is not content-addressed
+MEDIA_MAX_AGE = int(os.getenv("MEDIA_MAX_AGE", "3600"))
+
+# hash uploads while they stream in (content-addressed image storage)
+FILE_UPLOAD_HANDLERS = [
+    "inventory.uploads.HashingMemoryFileUploadHandler",
+    "inventory.uploads.HashingTemporaryFileUploadHandler",
+]
+
+# Listing image variants: name -> longest edge in px, rendered as JPEG and WebP
+IMAGE_VARIANTS = {"grid": 320, "detail": 1280}
+IMAGE_VARIANT_WORKERS = int(os.getenv("IMAGE_VARIANT_WORKERS", "2"))
+# widths the on-demand endpoint will render (bounded to keep the cache finite)
+IMAGE_ONDEMAND_WIDTHS = (160, 320, 480, 640, 960, 1280, 1920)
+IMAGE_CACHE_DIR = MEDIA_ROOT / "cache"
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# seconds /listings/facets?cached=true may serve counts for
+FACETS_CACHE_TTL = int(os.getenv("FACETS_CACHE_TTL", "300"))
+
+# source of locality coordinates for the geocode_listings command
+REGION_URL = os.getenv("REGION_URL", "http://region-srv:5000")
+
+# radius search (near_lat/near_lng): default and largest radius_km; the
+# largest bounds how many grid cells one query probes
+GEO_DEFAULT_RADIUS_KM = float(os.getenv("GEO_DEFAULT_RADIUS_KM", "10"))
+GEO_MAX_RADIUS_KM = float(os.getenv("GEO_MAX_RADIUS_KM", "50"))
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
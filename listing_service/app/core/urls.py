@@ -17,14 +17,15 @@ Including another URLconf
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path
+from django.urls import path, re_path
 
 from inventory.api import api
+from inventory.media import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/',api.urls),
-
-]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    re_path(r'^%s(?P<name>.+)$' % settings.MEDIA_URL.lstrip('/'), serve_media),
+]
 if settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
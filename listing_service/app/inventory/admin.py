@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Category, Listing,  Review, Favorite, ListingImage
+from .models import Category, Listing, ListingArchive, Review, Favorite, ListingImage, ImageBlob
 
 
 # -------------------------
@@ -24,7 +24,7 @@ class ListingAdmin(admin.ModelAdmin):
         'location', 'is_active', 'created_at','updated_at'
     )
     search_fields = ('title', 'description', 'location')
-    list_filter = ('is_active', 'category')
+    list_filter = ('is_active', 'category', 'state_slug')
     readonly_fields = ('created_at', 'updated_at')
     ordering = ('-created_at',)
 
@@ -53,6 +53,26 @@ class ListingImageAdmin(admin.ModelAdmin):
 
 
 
+# -------------------------
+# IMAGE BLOB ADMIN
+# -------------------------
+@admin.register(ImageBlob)
+class ImageBlobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'size', 'ref_count', 'created_at')
+    search_fields = ('sha256', 'name')
+    readonly_fields = ('sha256', 'name', 'size', 'ref_count', 'created_at')
+
+
+# -------------------------
+# LISTING ARCHIVE ADMIN
+# -------------------------
+@admin.register(ListingArchive)
+class ListingArchiveAdmin(admin.ModelAdmin):
+    list_display = ('id', 'title', 'owner_user_id', 'category_id', 'price', 'created_at', 'archived_at')
+    search_fields = ('title', 'external_id')
+    ordering = ('-archived_at',)
+
+
 # -------------------------
 # FAVORITE ADMIN
 # -------------------------
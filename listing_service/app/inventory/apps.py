@@ -11,6 +11,8 @@ class InventoryConfig(AppConfig):
     name = 'inventory'
 
     def ready(self):
+        import inventory.signals
+
         # avoid running in migrations
         from django.conf import settings
         if not getattr(settings, "RUN_BOOTSTRAP", True):
@@ -0,0 +1,114 @@
+"""
+Moving listings between the hot Listing table and ListingArchive.
+
+archive() copies a listing with its images, reviews and favorites into
+one ListingArchive row and deletes the live rows; restore() recreates
+them with their original ids. Both must run inside a transaction.
+
+Image files are reference counted (inventory.blobs): the archive row
+takes its own reference on each image before the live ListingImage rows
+release theirs, and gives it back when it is deleted (restore, purge,
+DELETE /listing/{id} or the admin; see signals.release_archived_images).
+"""
+import datetime
+
+from django.contrib.auth.models import User
+
+from .blobs import retain_blob
+from .changes import record_changes
+from .models import Category, Favorite, Listing, ListingArchive, ListingChange, ListingImage, Review
+
+# Listing columns restore() writes back; rating_avg is generated from the sums
+RESTORED_FIELDS = [field for field in ListingArchive.ARCHIVED_FIELDS if field != "rating_avg"]
+
+
+class RestoreError(Exception):
+    pass
+
+
+def _by_listing(queryset):
+    rows = {}
+    for row in queryset:
+        rows.setdefault(row.listing_id, []).append(row)
+    return rows
+
+
+def archive(listings):
+    """Move `listings` (locked Listing rows) into the archive; returns how many."""
+    ids = [listing.id for listing in listings]
+    images = _by_listing(ListingImage.objects.filter(listing_id__in=ids).order_by("-created_at", "-id"))
+    reviews = _by_listing(Review.objects.filter(listing_id__in=ids).order_by("id"))
+    favorites = _by_listing(Favorite.objects.filter(listing_id__in=ids).order_by("id"))
+
+    ListingArchive.objects.bulk_create([
+        ListingArchive.from_listing(
+            listing,
+            images.get(listing.id, []),
+            reviews.get(listing.id, []),
+            favorites.get(listing.id, []),
+        )
+        for listing in listings
+    ])
+    # the archive takes its own reference before the cascade below
+    # releases the ListingImage ones, so the files survive
+    for listing_images in images.values():
+        for img in listing_images:
+            retain_blob(img.image.name)
+    record_changes(ids, ListingChange.LISTING_ARCHIVED)
+    # cascades to images, favorites and reviews, all copied above
+    Listing.objects.filter(id__in=ids).delete()
+    return len(ids)
+
+
+def restore(archived):
+    """
+    Put one ListingArchive row back into Listing; returns the Listing.
+    Reviews and favorites of users deleted since archival are dropped and
+    the aggregates recounted. Raises RestoreError when the listing's
+    category no longer exists.
+    """
+    if not Category.objects.filter(id=archived.category_id).exists():
+        raise RestoreError(f"Listing {archived.id}: category {archived.category_id} no longer exists")
+
+    listing = Listing(**{field: getattr(archived, field) for field in RESTORED_FIELDS})
+    user_ids = {row["reviewer_user_id"] for row in archived.reviews} | {
+        row["user_id"] for row in archived.favorites
+    }
+    existing = set(User.objects.filter(id__in=user_ids).values_list("id", flat=True))
+    reviews = [row for row in archived.reviews if row["reviewer_user_id"] in existing]
+    favorites = [row for row in archived.favorites if row["user_id"] in existing]
+    listing.rating_sum = sum(row["rating"] for row in reviews)
+    listing.rating_count = len(reviews)
+    listing.favorite_count = len(favorites)
+    listing.save(force_insert=True)
+    # auto_now_add/auto_now overwrote the archived timestamps on insert
+    Listing.objects.filter(id=listing.id).update(created_at=archived.created_at)
+    listing.created_at = archived.created_at
+
+    images = archived.image_rows()
+    created = {(ListingImage, img.id): img.created_at for img in images}
+    ListingImage.objects.bulk_create(images)
+    for img in images:
+        # the ListingImage rows need their own reference; the archive's goes
+        # with the archive row below
+        retain_blob(img.image.name)
+    Review.objects.bulk_create([
+        Review(
+            id=row["id"], listing_id=listing.id, reviewer_user_id=row["reviewer_user_id"],
+            rating=row["rating"], comment=row["comment"],
+        )
+        for row in reviews
+    ])
+    Favorite.objects.bulk_create([
+        Favorite(id=row["id"], listing_id=listing.id, user_id=row["user_id"]) for row in favorites
+    ])
+    for model, rows in ((Review, reviews), (Favorite, favorites)):
+        for row in rows:
+            created[model, row["id"]] = datetime.datetime.fromisoformat(row["created_at"])
+    # auto_now_add again: put the original times back, the pages sort on them
+    for (model, row_id), created_at in created.items():
+        model.objects.filter(id=row_id).update(created_at=created_at)
+
+    record_changes([listing.id], ListingChange.LISTING_RESTORED)
+    archived.delete()
+    return listing
@@ -0,0 +1,21 @@
+"""
+Bearer-token authentication for endpoints that act as a user.
+
+Tokens are the HS256 JWTs auth_service issues at login (also checked by
+brain's JWTAuthMiddleware); request.auth is their payload, whose user_id
+identifies the caller.
+"""
+import jwt
+from django.conf import settings
+from ninja.security import HttpBearer
+
+
+class JWTAuth(HttpBearer):
+    def authenticate(self, request, token):
+        try:
+            payload = jwt.decode(token, settings.JWT_SECRET, algorithms=["HS256"])
+        except jwt.InvalidTokenError:
+            return None
+        if not payload.get("user_id"):
+            return None
+        return payload
@@ -0,0 +1,77 @@
+"""
+Content-addressed storage for listing images.
+
+Each distinct upload is stored once at ``listings/<h0h1>/<h2h3>/<sha256><ext>``
+and tracked by an ImageBlob row whose ref_count is the number of
+ListingImage rows (and archived listing images) using it. The file (and
+its variants) is deleted when the last reference goes away.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+
+from .images import FORMATS, variant_name
+from .models import ImageBlob
+
+
+def content_name(sha256, original_name):
+    ext = os.path.splitext(original_name or "")[1].lower()[:10]
+    return f"listings/{sha256[:2]}/{sha256[2:4]}/{sha256}{ext}"
+
+
+def _hash_chunks(uploaded):
+    # fallback for files that did not come through the hashing upload handlers
+    digest = hashlib.sha256()
+    for chunk in uploaded.chunks():
+        digest.update(chunk)
+    uploaded.seek(0)
+    return digest.hexdigest()
+
+
+def store_upload(uploaded):
+    """
+    Store the uploaded bytes unless identical content is already stored, and
+    take a reference on it. Must run inside a transaction; returns the
+    storage name to put on ListingImage.image.
+    """
+    sha256 = getattr(uploaded, "content_hash", None) or _hash_chunks(uploaded)
+    # the row lock serialises concurrent uploads and releases of the same content
+    blob, _ = ImageBlob.objects.select_for_update().get_or_create(
+        sha256=sha256,
+        defaults={"name": content_name(sha256, uploaded.name), "size": uploaded.size},
+    )
+    if not default_storage.exists(blob.name):
+        # temporary uploads are moved into place, not copied
+        default_storage.save(blob.name, uploaded)
+    ImageBlob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") + 1)
+    return blob.name
+
+
+def retain_blob(name):
+    """Take one more reference on already stored content (no-op for legacy files)."""
+    ImageBlob.objects.filter(name=name).update(ref_count=F("ref_count") + 1)
+
+
+def _delete_if_unreferenced(name):
+    with transaction.atomic():
+        blob = ImageBlob.objects.select_for_update().filter(name=name, ref_count=0).first()
+        if blob is None:
+            return
+        for size in settings.IMAGE_VARIANTS:
+            for fmt in FORMATS:
+                default_storage.delete(variant_name(name, size, fmt))
+        default_storage.delete(name)
+        blob.delete()
+
+
+def release_blob(name):
+    """Drop one reference; the file goes once the last reference has committed."""
+    released = ImageBlob.objects.filter(name=name, ref_count__gt=0).update(
+        ref_count=F("ref_count") - 1
+    )
+    if released:
+        transaction.on_commit(lambda: _delete_if_unreferenced(name))
@@ -0,0 +1,50 @@
+"""
+Process-level cache of the category list and tree.
+
+Every process keeps the built payloads in memory next to the version they
+were built for. The version is a CacheVersion row, bumped in the same
+transaction as the category write, so a write in any process or worker
+invalidates all of them once it commits; readers only pay a primary-key
+lookup.
+"""
+import time
+
+from django.db.models import F
+
+from .models import CacheVersion
+
+VERSION_NAME = "categories"
+
+_entries = {}  # kind -> (version, payload)
+
+
+def _initial():
+    # time-based start so a recreated row never hands out an old version again
+    return {"version": time.time_ns()}
+
+
+async def current_version():
+    row, _ = await CacheVersion.objects.aget_or_create(name=VERSION_NAME, defaults=_initial())
+    return row.version
+
+
+def invalidate():
+    """Bump the version as part of the current transaction."""
+    updated = CacheVersion.objects.filter(name=VERSION_NAME).update(version=F("version") + 1)
+    if not updated:
+        CacheVersion.objects.get_or_create(name=VERSION_NAME, defaults=_initial())
+
+
+async def get(kind, build):
+    """(version, payload) for `kind`, rebuilding with `await build()` when the version moved."""
+    version = await current_version()
+    entry = _entries.get(kind)
+    if entry and entry[0] == version:
+        return entry
+    payload = await build()
+    _entries[kind] = (version, payload)
+    return version, payload
+
+
+def etag(version):
+    return f'"cat-{version}"'
@@ -0,0 +1,72 @@
+"""
+Transactional outbox for listing changes.
+
+record_change() must be called inside the transaction of the write it
+describes, so an event exists exactly when the write committed.
+
+Ids are handed out at insert time but transactions commit in any order,
+so the feed is ordered by the id of the transaction that wrote each event
+(txid) instead. read_changes() only returns events of transactions below
+the current snapshot's xmin: every transaction under it has finished, and
+any still running, or yet to start, has a txid at or above it. A consumer
+that resumes from the last txid it saw therefore never skips an event,
+however long the writing transaction took to commit.
+"""
+from django.db import connection
+from django.db.models import Q
+
+from .models import ListingChange
+
+
+def record_change(listing_id, kind, **data):
+    return ListingChange.objects.create(listing_id=listing_id, kind=kind, data=data)
+
+
+def record_changes(listing_ids, kind):
+    ListingChange.objects.bulk_create(
+        [ListingChange(listing_id=listing_id, kind=kind) for listing_id in listing_ids]
+    )
+
+
+def _snapshot_xmin():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+        return cursor.fetchone()[0]
+
+
+def read_changes(since, limit, kinds=None):
+    """
+    Committed events of transactions after txid `since`, oldest first;
+    returns (events, next_since). A transaction's events are never split
+    across pages, so a page holds more than `limit` events when one
+    transaction wrote more than that. `kinds` limits the events to those
+    prefixes ("listing" for listing.created, listing.updated, ...).
+
+    Once a page reaches the end of the committed range, next_since is the
+    head rather than the last event returned, so rows the kinds filter
+    skipped are not scanned again on the next call.
+    """
+    xmin = _snapshot_xmin()
+    if since is None:
+        # no position yet: start the consumer at the current head
+        return [], xmin - 1
+    qs = ListingChange.objects.filter(txid__gt=since, txid__lt=xmin)
+    if kinds:
+        matching = Q()
+        for kind in kinds:
+            matching |= Q(kind__startswith=f"{kind}.")
+        qs = qs.filter(matching)
+    events = list(qs.order_by("txid", "id")[:limit + 1])
+    if len(events) <= limit:
+        # everything committed up to the head is on this page
+        return events, max(since, xmin - 1)
+    last = events[limit - 1].txid
+    if events[limit].txid == last:
+        # the page ends inside a transaction: stop before it, or take
+        # all of it when it is the only one on the page
+        events = [event for event in events[:limit] if event.txid != last]
+        if not events:
+            events = list(qs.filter(txid=last).order_by("id"))
+    else:
+        events = events[:limit]
+    return events, events[-1].txid
@@ -0,0 +1,56 @@
+"""
+Conditional GET helpers: strong ETags, Last-Modified and 304 short-circuits.
+
+Views compute validators from data they already loaded (updated_at, the
+image set, the category version) and answer If-None-Match /
+If-Modified-Since with a bodyless 304 before any serialization.
+"""
+from django.http import HttpResponseNotModified
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+
+
+def stamp(dt):
+    """Microsecond timestamp; updated_at in whole seconds would hide fast edits."""
+    return int(dt.timestamp() * 1_000_000)
+
+
+def make_etag(*parts):
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+
+def image_set_parts(images):
+    """ETag parts for a set of ListingImage rows; changes on add, delete and re-render."""
+    if not images:
+        return ("images", 0)
+    return (
+        "images",
+        len(images),
+        max(img.id for img in images),
+        stamp(max(img.updated_at for img in images)),
+    )
+
+
+def not_modified(request, etag, last_modified=None):
+    header = request.headers.get("If-None-Match")
+    if header:
+        # If-None-Match wins over If-Modified-Since (RFC 9110 13.2.2)
+        return header.strip() == "*" or etag in parse_etags(header)
+    since = request.headers.get("If-Modified-Since")
+    if since and last_modified is not None:
+        since = parse_http_date_safe(since)
+        return since is not None and int(last_modified.timestamp()) <= since
+    return False
+
+
+def set_validators(response, etag, last_modified=None):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    # cacheable, but always revalidated
+    response["Cache-Control"] = "no-cache"
+
+
+def not_modified_response(etag, last_modified=None):
+    response = HttpResponseNotModified()
+    set_validators(response, etag, last_modified)
+    return response
@@ -0,0 +1,111 @@
+"""
+Facet counts for the browse page.
+
+All facets come from one aggregate pass: the filtered listing query is
+wrapped in a GROUPING SETS query that counts by category, by the next
+location level below the current filter, and by price bucket at once.
+Category counts are rolled up the materialized path so a parent includes
+its descendants.
+"""
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .models import Category, LOCATION_LEVELS
+
+# lower bounds of the price buckets; the last bucket is open ended
+PRICE_BUCKETS = (0, 1_000, 5_000, 10_000, 50_000, 100_000, 500_000, 1_000_000)
+
+
+def next_location_level(filters):
+    """Slug column one level below the deepest location filter, or None at locality."""
+    depth = 0
+    for i, field in enumerate(LOCATION_LEVELS):
+        if filters.get(field):
+            depth = i + 1
+    return LOCATION_LEVELS[depth] if depth < len(LOCATION_LEVELS) else None
+
+
+def _price_bucket():
+    whens = [
+        When(price__lt=upper, then=Value(i))
+        for i, upper in enumerate(PRICE_BUCKETS[1:])
+    ]
+    return Case(*whens, default=Value(len(PRICE_BUCKETS) - 1), output_field=IntegerField())
+
+
+def _category_tree(direct_counts):
+    """Nested categories with subtree counts; categories without listings are left out."""
+    categories = list(Category.objects.values("id", "name", "slug", "parent_id", "path"))
+    path_of = {c["id"]: c["path"] for c in categories}
+    totals = {}
+    for category_id, count in direct_counts.items():
+        # a listing in /1/4/9/ counts towards 1, 4 and 9
+        for ancestor in path_of.get(category_id, "").strip("/").split("/"):
+            if ancestor:
+                totals[int(ancestor)] = totals.get(int(ancestor), 0) + count
+
+    nodes = {
+        c["id"]: {"id": c["id"], "name": c["name"], "slug": c["slug"],
+                  "count": totals[c["id"]], "children": [], "parent_id": c["parent_id"]}
+        for c in categories
+        if totals.get(c["id"])
+    }
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node.pop("parent_id"))
+        (parent["children"] if parent else roots).append(node)
+    return roots
+
+
+def listing_facets(qs, level):
+    """
+    Counts for the filtered listing queryset `qs`: total, category tree,
+    `level` location slugs (skipped when None) and price buckets.
+    """
+    inner = qs.annotate(
+        f_category=F("category_id"),
+        f_location=F(level) if level else Value(""),
+        f_bucket=_price_bucket(),
+    ).values_list("f_category", "f_location", "f_bucket")
+    inner_sql, params = inner.query.sql_with_params()
+
+    sql = f"""
+        SELECT f.f_category, f.f_location, f.f_bucket, COUNT(*),
+               GROUPING(f.f_category, f.f_location, f.f_bucket)
+        FROM ({inner_sql}) AS f
+        GROUP BY GROUPING SETS ((f.f_category), (f.f_location), (f.f_bucket), ())
+    """
+    total = 0
+    by_category, by_location, by_bucket = {}, {}, {}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for category_id, location, bucket, count, grouping in cursor.fetchall():
+            # GROUPING() sets a bit for every column *not* in the row's set
+            if grouping == 0b011:
+                by_category[category_id] = count
+            elif grouping == 0b101:
+                by_location[location] = count
+            elif grouping == 0b110:
+                by_bucket[bucket] = count
+            else:
+                total = count
+
+    price = []
+    for i, lower in enumerate(PRICE_BUCKETS):
+        upper = PRICE_BUCKETS[i + 1] if i + 1 < len(PRICE_BUCKETS) else None
+        if by_bucket.get(i):
+            price.append({"min": lower, "max": upper, "count": by_bucket[i]})
+
+    return {
+        "total": total,
+        "categories": _category_tree(by_category),
+        "location": {
+            "level": level,
+            "counts": [
+                {"slug": slug, "count": count}
+                for slug, count in sorted(by_location.items(), key=lambda item: -item[1])
+                if level and slug
+            ],
+        },
+        "price": price,
+    }
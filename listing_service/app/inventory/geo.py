@@ -0,0 +1,75 @@
+"""
+Radius search without PostGIS.
+
+Listings carry latitude/longitude (copied from the region service's
+locality) and a generated `geo_cell`: the index of the fixed
+CELL_DEGREES x CELL_DEGREES grid cell the point falls in. A radius query
+turns into an indexed `geo_cell IN (...)` over the cells covering the
+circle's bounding box, a cheap lat/lng box check, and the exact haversine
+distance only for the rows that survive.
+"""
+import math
+
+from django.db.models import FloatField, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# 0.1 degree is ~11 km north-south; a 10 km radius covers about 9 cells.
+# Changing it needs a migration: geo_cell is a generated column.
+CELL_DEGREES = 0.1
+CELL_COLUMNS = round(360 / CELL_DEGREES)
+
+
+def cell_of(lat, lng):
+    """Python twin of the Listing.geo_cell expression."""
+    return math.floor((lat + 90) / CELL_DEGREES) * CELL_COLUMNS + math.floor((lng + 180) / CELL_DEGREES)
+
+
+def bounding_box(lat, lng, radius_km):
+    """(min_lat, max_lat, min_lng, max_lng) around the circle."""
+    dlat = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    # longitude degrees shrink towards the poles; use the widest latitude
+    widest = max(abs(min_lat), abs(max_lat))
+    if widest >= 89.9:
+        return min_lat, max_lat, -180.0, 180.0
+    dlng = radius_km / (KM_PER_DEGREE * math.cos(math.radians(widest)))
+    return min_lat, max_lat, lng - dlng, lng + dlng
+
+
+def covering_cells(lat, lng, radius_km):
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    rows = range(
+        math.floor((min_lat + 90) / CELL_DEGREES),
+        math.floor((min(max_lat, 89.999999) + 90) / CELL_DEGREES) + 1,
+    )
+    first_col = math.floor((min_lng + 180) / CELL_DEGREES)
+    last_col = math.floor((max_lng + 180) / CELL_DEGREES)
+    # columns past the antimeridian wrap around
+    cols = {col % CELL_COLUMNS for col in range(first_col, last_col + 1)}
+    return [row * CELL_COLUMNS + col for row in rows for col in sorted(cols)]
+
+
+def distance_km(lat, lng):
+    """Haversine distance from (lat, lng) to each row's point, as an expression."""
+    lat0 = math.radians(lat)
+    lng0 = math.radians(lng)
+    dlat = (Radians("latitude") - Value(lat0)) / 2
+    dlng = (Radians("longitude") - Value(lng0)) / 2
+    a = Power(Sin(dlat), 2) + Value(math.cos(lat0)) * Cos(Radians("latitude")) * Power(Sin(dlng), 2)
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(a, output_field=FloatField()))
+
+
+def within_radius(qs, lat, lng, radius_km):
+    """Rows of `qs` within `radius_km`, annotated with `distance_km`."""
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    qs = qs.filter(
+        geo_cell__in=covering_cells(lat, lng, radius_km),
+        latitude__gte=min_lat,
+        latitude__lte=max_lat,
+    )
+    if min_lng >= -180 and max_lng <= 180:
+        qs = qs.filter(longitude__gte=min_lng, longitude__lte=max_lng)
+    return qs.annotate(distance_km=distance_km(lat, lng)).filter(distance_km__lte=radius_km)
@@ -0,0 +1,220 @@
+"""
+Derived sizes for ListingImage uploads.
+
+The fixed variants in settings.IMAGE_VARIANTS are rendered as JPEG and WebP
+in a background thread once the upload has committed, and stored next to
+the original (``listings/abc.jpg`` -> ``listings/abc__grid.jpg``,
+``listings/abc__grid.webp``). Any other allowed width is rendered on demand
+into a disk cache that is kept under settings.IMAGE_CACHE_MAX_BYTES by
+evicting the least recently used files.
+"""
+import hashlib
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# format -> file extension
+FORMATS = {"jpeg": "jpg", "webp": "webp"}
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_VARIANT_WORKERS,
+    thread_name_prefix="image-variants",
+)
+_cache_lock = threading.Lock()
+_cache_bytes = None  # per-process estimate, corrected by every eviction scan
+_variant_url_prefix = None
+
+
+def variant_key(size, fmt):
+    return size if fmt == "jpeg" else f"{size}_{fmt}"
+
+
+def variant_name(name, size, fmt):
+    stem, _ = os.path.splitext(name)
+    return f"{stem}__{size}.{FORMATS[fmt]}"
+
+
+def _open_rgb(name, edge):
+    """Decode a stored original; JPEGs are decoded straight at reduced scale."""
+    with default_storage.open(name, "rb") as fh:
+        im = Image.open(fh)
+        im.draft("RGB", (edge, edge))
+        im = ImageOps.exif_transpose(im)
+        return im.convert("RGB")
+
+
+def _encode(im, fmt):
+    buf = io.BytesIO()
+    if fmt == "webp":
+        im.save(buf, "WEBP", quality=80, method=4)
+    else:
+        im.save(buf, "JPEG", quality=82, optimize=True, progressive=True)
+    return buf.getvalue()
+
+
+# ---------------------------
+# PRE-GENERATED VARIANTS
+# ---------------------------
+def generate_variants(image_id):
+    """Render every configured variant from a single decode of the original."""
+    from .models import ListingImage
+
+    listing_image = ListingImage.objects.filter(id=image_id).first()
+    if listing_image is None:
+        return
+    name = listing_image.image.name
+
+    # content-addressed originals share variants; only render what is missing
+    variants = {
+        variant_key(size, fmt): variant_name(name, size, fmt)
+        for size in settings.IMAGE_VARIANTS
+        for fmt in FORMATS
+    }
+    missing = {key for key, vname in variants.items() if not default_storage.exists(vname)}
+
+    if missing:
+        # largest first, shrinking the same decoded pixels for each smaller size
+        sizes = sorted(settings.IMAGE_VARIANTS.items(), key=lambda item: item[1], reverse=True)
+        im = _open_rgb(name, sizes[0][1])
+        for size, edge in sizes:
+            im.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+            for fmt in FORMATS:
+                key = variant_key(size, fmt)
+                if key in missing:
+                    variants[key] = default_storage.save(variants[key], ContentFile(_encode(im, fmt)))
+
+    # updated_at moves so image-set ETags change once the new sizes exist
+    ListingImage.objects.filter(id=image_id).update(variants=variants, updated_at=timezone.now())
+
+
+def _run_generate(image_id):
+    try:
+        generate_variants(image_id)
+    except Exception as exc:
+        logger.exception("Error generating variants for image %s: %s", image_id, exc)
+    finally:
+        connections.close_all()
+
+
+def schedule_variants(image_id):
+    """Queue variant generation once the current transaction commits."""
+    transaction.on_commit(lambda: _executor.submit(_run_generate, image_id))
+
+
+def variant_url(name, width, fmt):
+    global _variant_url_prefix
+    if _variant_url_prefix is None:
+        _variant_url_prefix = reverse("api-1.0.0:image_variant", kwargs={"name": "x"})[:-1]
+    return f"{_variant_url_prefix}{name}?width={width}&format={fmt}"
+
+
+def size_map(name, generated=None):
+    """
+    URLs for every configured size of an image: the stored variant when it
+    has been generated, otherwise the on-demand endpoint.
+    """
+    generated = generated or {}
+    sizes = {}
+    for size, edge in settings.IMAGE_VARIANTS.items():
+        for fmt in FORMATS:
+            key = variant_key(size, fmt)
+            if key in generated:
+                sizes[key] = default_storage.url(generated[key])
+            else:
+                sizes[key] = variant_url(name, edge, fmt)
+    return sizes
+
+
+# ---------------------------
+# ON-DEMAND VARIANTS
+# ---------------------------
+def _cache_entries():
+    for root, _, files in os.walk(settings.IMAGE_CACHE_DIR):
+        for filename in files:
+            path = os.path.join(root, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            yield stat.st_mtime, stat.st_size, path
+
+
+def _evict(target_bytes, keep):
+    """Delete least recently used cache files until the cache fits target_bytes."""
+    entries = sorted(_cache_entries())
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in entries:
+        if total <= target_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+    return total
+
+
+def _account(path, nbytes):
+    global _cache_bytes
+    with _cache_lock:
+        _cache_bytes += nbytes
+        if _cache_bytes > settings.IMAGE_CACHE_MAX_BYTES:
+            # evict a little extra so we don't rescan on every miss
+            _cache_bytes = _evict(settings.IMAGE_CACHE_MAX_BYTES * 0.9, keep=path)
+
+
+def render_variant(name, width, fmt):
+    """
+    Open file of `name` resized to `width` in `fmt`.
+
+    A pre-generated variant of exactly that width is used as is; anything
+    else is rendered once into the disk cache and touched on every hit so
+    eviction drops the least recently used files.
+    """
+    global _cache_bytes
+    for size, edge in settings.IMAGE_VARIANTS.items():
+        pregenerated = variant_name(name, size, fmt)
+        if edge == width and default_storage.exists(pregenerated):
+            return open(default_storage.path(pregenerated), "rb")
+
+    digest = hashlib.sha256(f"{name}:{width}:{fmt}".encode()).hexdigest()
+    path = os.path.join(settings.IMAGE_CACHE_DIR, digest[:2], f"{digest}.{FORMATS[fmt]}")
+    try:
+        fh = open(path, "rb")
+    except FileNotFoundError:
+        pass
+    else:
+        os.utime(path)
+        return fh
+
+    im = _open_rgb(name, width)
+    im.thumbnail((width, width), Image.Resampling.LANCZOS)
+    data = _encode(im, fmt)
+
+    with _cache_lock:
+        if _cache_bytes is None:
+            _cache_bytes = sum(size for _, size, _ in _cache_entries())
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(data)
+    os.replace(tmp_path, path)
+    # open before accounting: an evicted file stays readable once open
+    fh = open(path, "rb")
+    _account(path, len(data))
+    return fh
@@ -0,0 +1,220 @@
+"""
+Bulk listing ingest for dealer feeds.
+
+Rows are read one at a time from an NDJSON or CSV request body, validated
+in batches of BATCH_SIZE and written with one bulk_create per batch, each
+batch in its own transaction. In upsert mode rows are keyed on
+(owner_user_id, external_id).
+
+Rows are checked against the column limits before they reach the
+database. If a batch still fails there, it is retried row by row so the
+failure is reported against the row that caused it.
+"""
+import codecs
+import csv
+import json
+from decimal import Decimal
+from typing import Optional
+
+from django.db import DatabaseError, transaction
+from pydantic import Field, ValidationError
+from ninja import Schema
+
+from .changes import record_changes
+from .models import Category, Listing, ListingChange, LOCATION_LEVELS
+
+BATCH_SIZE = 500
+
+UPSERT_FIELDS = [
+    "title", "description", "price", "category", "location",
+    *LOCATION_LEVELS, "latitude", "longitude", "is_active", "updated_at",
+]
+
+
+class BulkListingIn(Schema):
+    # limits mirror the Listing columns
+    external_id: Optional[str] = Field(None, max_length=255)
+    title: str = Field(min_length=1, max_length=255)
+    description: Optional[str] = ""
+    category: Optional[int] = None
+    category_slug: Optional[str] = None
+    price: Decimal = Field(max_digits=12, decimal_places=2)
+    location: str = Field(max_length=255)  # full path: "state/district/city/locality"
+    is_active: Optional[bool] = True
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+
+def read_ndjson(stream):
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            yield exc
+
+
+def read_csv(stream):
+    for row in csv.DictReader(codecs.iterdecode(stream, "utf-8")):
+        # empty cells mean "not given", not an empty string
+        yield {key: value for key, value in row.items() if key and value != ""}
+
+
+def _error(row_no, message, external_id=None):
+    return {"row": row_no, "status": "error", "external_id": external_id, "error": message}
+
+
+def _db_error(exc):
+    # first line of the driver's message, without the SQL context lines
+    lines = str(exc).strip().splitlines()
+    return f"Database error: {lines[0]}" if lines else "Database error"
+
+
+class _Ingest:
+    def __init__(self, owner_user_id, upsert):
+        self.owner_user_id = owner_user_id
+        self.upsert = upsert
+        # one query for all categories instead of a lookup per row
+        self.category_ids = set()
+        self.category_by_slug = {}
+        for category_id, slug in Category.objects.values_list("id", "slug"):
+            self.category_ids.add(category_id)
+            self.category_by_slug[slug] = category_id
+
+    def _build(self, row_no, raw):
+        if isinstance(raw, Exception):
+            return None, _error(row_no, f"Invalid JSON: {raw}")
+        try:
+            data = BulkListingIn.model_validate(raw)
+        except ValidationError as exc:
+            return None, _error(row_no, "; ".join(
+                f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in exc.errors()
+            ))
+
+        if data.category is not None:
+            category_id = data.category if data.category in self.category_ids else None
+        else:
+            category_id = self.category_by_slug.get(data.category_slug)
+        if category_id is None:
+            return None, _error(row_no, "Unknown category", data.external_id)
+        if self.upsert and not data.external_id:
+            return None, _error(row_no, "external_id is required in upsert mode")
+
+        listing = Listing(
+            owner_user_id=self.owner_user_id,
+            external_id=data.external_id,
+            title=data.title,
+            description=data.description or "",
+            category_id=category_id,
+            price=data.price,
+            is_active=data.is_active,
+        )
+        listing.set_location(data.location)
+        try:
+            listing.set_point(data.latitude, data.longitude)
+        except ValueError as exc:
+            return None, _error(row_no, str(exc), data.external_id)
+        return listing, None
+
+    def _write(self, pending, results):
+        """
+        Insert (or upsert) the (row_no, listing) pairs in one transaction.
+        Returns the pairs written and the external_ids that already existed.
+        """
+        seen = {listing.external_id for _, listing in pending if listing.external_id}
+        with transaction.atomic():
+            existing = set()
+            if seen:
+                existing = set(
+                    Listing.objects.filter(owner_user_id=self.owner_user_id, external_id__in=seen)
+                    .values_list("external_id", flat=True)
+                )
+            if not self.upsert:
+                # plain inserts must not collide with the unique key
+                for row_no, listing in [p for p in pending if p[1].external_id in existing]:
+                    results[row_no] = _error(row_no, "external_id already exists", listing.external_id)
+                pending = [p for p in pending if p[1].external_id not in existing]
+
+            listings = [listing for _, listing in pending]
+            if self.upsert:
+                Listing.objects.bulk_create(
+                    listings,
+                    update_conflicts=True,
+                    unique_fields=["owner_user_id", "external_id"],
+                    update_fields=UPSERT_FIELDS,
+                )
+            else:
+                Listing.objects.bulk_create(listings)
+
+            record_changes(
+                [l.id for l in listings if l.external_id not in existing], ListingChange.LISTING_CREATED
+            )
+            record_changes(
+                [l.id for l in listings if l.external_id in existing], ListingChange.LISTING_UPDATED
+            )
+        return pending, existing
+
+    def write_batch(self, batch):
+        """Validate and insert one batch; returns per-row results in row order."""
+        results = {}
+        pending = []  # (row_no, listing)
+        seen = set()
+        for row_no, raw in batch:
+            listing, error = self._build(row_no, raw)
+            if error:
+                results[row_no] = error
+            elif listing.external_id and listing.external_id in seen:
+                results[row_no] = _error(row_no, "Duplicate external_id in batch", listing.external_id)
+            else:
+                if listing.external_id:
+                    seen.add(listing.external_id)
+                pending.append((row_no, listing))
+
+        try:
+            pending, existing = self._write(pending, results)
+        except DatabaseError:
+            # one bad row fails the whole statement; find it row by row
+            rows, pending, existing = pending, [], set()
+            for row_no, listing in rows:
+                try:
+                    written, written_existing = self._write([(row_no, listing)], results)
+                except DatabaseError as exc:
+                    results[row_no] = _error(row_no, _db_error(exc), listing.external_id)
+                    continue
+                pending += written
+                existing |= written_existing
+
+        for row_no, listing in pending:
+            results[row_no] = {
+                "row": row_no,
+                "status": "updated" if listing.external_id in existing else "created",
+                "id": listing.id,
+                "external_id": listing.external_id,
+            }
+        return [results[row_no] for row_no, _ in batch]
+
+
+def ingest(rows, owner_user_id, upsert=False):
+    """Write every row from the `rows` iterator; returns counts and per-row results."""
+    job = _Ingest(owner_user_id, upsert)
+    results = []
+    batch = []
+    for row_no, raw in enumerate(rows, start=1):
+        batch.append((row_no, raw))
+        if len(batch) >= BATCH_SIZE:
+            results.extend(job.write_batch(batch))
+            batch = []
+    if batch:
+        results.extend(job.write_batch(batch))
+
+    counts = {"created": 0, "updated": 0, "error": 0}
+    for result in results:
+        counts[result["status"]] += 1
+    return {
+        "created": counts["created"],
+        "updated": counts["updated"],
+        "failed": counts["error"],
+        "results": results,
+    }
@@ -0,0 +1,71 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from inventory.archive import archive
+from inventory.models import Listing, ListingArchive
+
+
+class Command(BaseCommand):
+    help = (
+        "Move inactive listings (and, with --expire-days, old ones) into ListingArchive in "
+        "id-ordered batches, one transaction per batch, so the hot listing table only holds "
+        "live rows. restore_listings moves them back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--inactive-days", type=int, default=30,
+                            help="archive inactive listings not updated for this many days")
+        parser.add_argument("--expire-days", type=int, default=None,
+                            help="also archive listings created this many days ago, active or not")
+        parser.add_argument("--purge-days", type=int, default=None,
+                            help="delete archived listings archived this many days ago, "
+                                 "releasing their image files")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        due = Q(is_active=False, updated_at__lt=now - datetime.timedelta(days=options["inactive_days"]))
+        if options["expire_days"] is not None:
+            due |= Q(created_at__lt=now - datetime.timedelta(days=options["expire_days"]))
+        purge = None
+        if options["purge_days"] is not None:
+            purge = Q(archived_at__lt=now - datetime.timedelta(days=options["purge_days"]))
+
+        if options["dry_run"]:
+            count = Listing.objects.filter(due).count()
+            self.stdout.write(f"{count} listings would be archived")
+            if purge is not None:
+                count = ListingArchive.objects.filter(purge).count()
+                self.stdout.write(f"{count} archived listings would be purged")
+            return
+
+        archived = self._batches(Listing.objects.filter(due), archive, options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} listings"))
+        if purge is not None:
+            purged = self._batches(ListingArchive.objects.filter(purge), self._purge, options["batch_size"])
+            self.stdout.write(self.style.SUCCESS(f"Purged {purged} archived listings"))
+
+    def _purge(self, rows):
+        # sends post_delete per row, which releases the archived image refs
+        ListingArchive.objects.filter(id__in=[row.id for row in rows]).delete()
+        return len(rows)
+
+    def _batches(self, queryset, handle, batch_size):
+        done = 0
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    queryset.filter(id__gt=last_id)
+                    .order_by("id")
+                    .select_for_update(skip_locked=True)[:batch_size]
+                )
+                if not rows:
+                    return done
+                last_id = rows[-1].id
+                done += handle(rows)
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from inventory.models import Listing, ListingImage
+
+
+class Command(BaseCommand):
+    help = "Set Listing.cover_image to each listing's newest image, in id-range batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        newest = (
+            ListingImage.objects.filter(listing=OuterRef("pk"))
+            .order_by("-created_at", "-id")
+            .values("image")[:1]
+        )
+
+        last_id = 0
+        updated = 0
+        while True:
+            ids = list(
+                Listing.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            # one UPDATE ... SET cover_image = (SELECT ...) per batch
+            updated += Listing.objects.filter(id__in=ids).update(
+                cover_image=Coalesce(Subquery(newest), Value(""))
+            )
+            last_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled cover_image on {updated} listings"))
@@ -0,0 +1,69 @@
+import asyncio
+import statistics
+import time
+
+import httpx
+from django.core.management.base import BaseCommand
+
+DEFAULT_PATHS = ["/listings", "/listings?include=images", "/category"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load a running listing service with concurrent reads and report throughput "
+        "and latency per concurrency level. Run it against one worker before and "
+        "after a change to compare how many requests that worker overlaps."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://localhost:8000/api/v1")
+        parser.add_argument("--path", action="append", dest="paths",
+                            help="path to request, repeatable (default: listings, listings with images, categories)")
+        parser.add_argument("--concurrency", default="1,8,32,64",
+                            help="comma separated concurrency levels")
+        parser.add_argument("--requests", type=int, default=500, help="requests per level")
+
+    def handle(self, *args, **options):
+        levels = [int(c) for c in options["concurrency"].split(",")]
+        paths = list(options["paths"] or DEFAULT_PATHS)
+        # a listing id that exists, so the detail endpoints are measured too
+        first = httpx.get(f"{options['base_url']}/listings", params={"limit": 1}).json()["items"]
+        if first and not options["paths"]:
+            paths += [f"/listing/{first[0]['id']}", f"/listing/{first[0]['id']}/images/"]
+
+        self.stdout.write(f"{'concurrency':>11} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>6}")
+        for level in levels:
+            rps, p50, p99, errors = asyncio.run(
+                self._run(options["base_url"], paths, level, options["requests"])
+            )
+            self.stdout.write(f"{level:>11} {rps:>9.1f} {p50:>8.1f} {p99:>8.1f} {errors:>6}")
+
+    async def _run(self, base_url, paths, concurrency, total):
+        latencies = []
+        errors = 0
+        queue = asyncio.Queue()
+        for i in range(total):
+            queue.put_nowait(paths[i % len(paths)])
+
+        async def worker(client):
+            nonlocal errors
+            while not queue.empty():
+                path = queue.get_nowait()
+                start = time.perf_counter()
+                try:
+                    resp = await client.get(path)
+                    if resp.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        return total / elapsed, statistics.median(latencies), p99, errors
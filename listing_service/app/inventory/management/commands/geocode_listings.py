@@ -0,0 +1,55 @@
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from inventory.changes import record_changes
+from inventory.models import Listing, ListingChange
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy locality coordinates from the region service onto listings that "
+        "have none yet. One region lookup per distinct locality path."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--region-url", default=settings.REGION_URL)
+
+    def handle(self, *args, **options):
+        paths = (
+            Listing.objects.filter(latitude__isnull=True)
+            .exclude(locality_slug="")
+            .values_list("state_slug", "district_slug", "city_slug", "locality_slug")
+            .distinct()
+        )
+        located = missing = 0
+        with httpx.Client(base_url=options["region_url"], timeout=10.0) as client:
+            for state, district, city, locality in paths:
+                resp = client.get(
+                    "/localities",
+                    params={"slug": locality, "city": city, "district": district, "state": state},
+                )
+                resp.raise_for_status()
+                points = [p for p in resp.json() if p["latitude"] is not None]
+                if len(points) != 1:
+                    missing += 1
+                    continue
+                with transaction.atomic():
+                    qs = Listing.objects.filter(
+                        latitude__isnull=True,
+                        state_slug=state, district_slug=district, city_slug=city, locality_slug=locality,
+                    )
+                    ids = list(qs.values_list("id", flat=True))
+                    qs.update(
+                        latitude=points[0]["latitude"],
+                        longitude=points[0]["longitude"],
+                        updated_at=timezone.now(),
+                    )
+                    record_changes(ids, ListingChange.LISTING_UPDATED)
+                located += len(ids)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Located {located} listings; {missing} localities have no coordinates"
+        ))
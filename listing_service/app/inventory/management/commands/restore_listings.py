@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from inventory.archive import RestoreError, restore
+from inventory.models import ListingArchive
+
+
+class Command(BaseCommand):
+    help = (
+        "Move archived listings back into the listing table with their images, reviews "
+        "and favorites, one transaction per listing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("ids", nargs="*", type=int, help="archived listing ids")
+        parser.add_argument("--owner-user-id", type=int,
+                            help="restore every archived listing of this owner")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        if not options["ids"] and options["owner_user_id"] is None:
+            raise CommandError("Pass listing ids or --owner-user-id")
+        archived = ListingArchive.objects.all()
+        if options["ids"]:
+            archived = archived.filter(id__in=options["ids"])
+        if options["owner_user_id"] is not None:
+            archived = archived.filter(owner_user_id=options["owner_user_id"])
+        ids = list(archived.order_by("id").values_list("id", flat=True))
+
+        if options["dry_run"]:
+            self.stdout.write(f"{len(ids)} listings would be restored")
+            return
+
+        restored = 0
+        for listing_id in ids:
+            with transaction.atomic():
+                row = ListingArchive.objects.select_for_update().filter(id=listing_id).first()
+                if row is None:
+                    continue  # restored or purged meanwhile
+                try:
+                    restore(row)
+                except RestoreError as exc:
+                    self.stderr.write(str(exc))
+                    continue
+                restored += 1
+        self.stdout.write(self.style.SUCCESS(f"Restored {restored} listings"))
@@ -0,0 +1,183 @@
+"""
+Serving /media/ files.
+
+Requests are validated here, answered with 304 when the client copy is
+current, and the transfer itself is handed to the front server when
+settings.MEDIA_ACCEL is set (nginx X-Accel-Redirect or Apache/lighttpd
+X-Sendfile). That is the only zero-copy path in the shipped deployment.
+
+Without it (the default, and what docker-compose runs) the file is
+streamed by Django in BLOCK_SIZE reads, with single-range support.
+uvicorn has no wsgi.file_wrapper, so every byte goes through Python. The
+file object keeps its fileno(), so a WSGI server with a sendfile-capable
+file_wrapper (gunicorn) would use os.sendfile, but nothing here runs one.
+
+To offload, put nginx in front of listing-srv with an `internal`
+location at MEDIA_ACCEL_PREFIX aliased to MEDIA_ROOT (the media volume)
+and set MEDIA_ACCEL=x-accel-redirect in env/listing.env.
+
+Content-addressed paths (``listings/<h0h1>/<h2h3>/<sha256>...``) never
+change, so they are cached as immutable for a year.
+"""
+import datetime
+import mimetypes
+import os
+import re
+import stat
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.http import parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from . import conditional
+
+# originals and their pre-generated variants (``<sha256>__grid.webp``)
+HASHED_NAME = re.compile(r"^listings/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(__\w+)?\.\w+$")
+
+BYTE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$", re.IGNORECASE)
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# read size when Django streams the file itself; larger blocks mean
+# fewer thread hops per file under ASGI
+BLOCK_SIZE = 256 * 1024
+
+
+def cache_control(name):
+    if HASHED_NAME.match(name):
+        return IMMUTABLE
+    return f"public, max-age={settings.MEDIA_MAX_AGE}"
+
+
+class RangeFile:
+    """
+    Read-only view of `length` bytes of an open file starting at `start`.
+
+    It has no seek()/tell(), so FileResponse leaves Content-Length to the
+    caller; fileno() stays available and the underlying offset is
+    positioned at `start`, which is all a sendfile-based file_wrapper needs.
+    """
+
+    def __init__(self, fh, start, length):
+        fh.seek(start)
+        self._fh = fh
+        self._remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._fh.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self._fh.fileno()
+
+    def close(self):
+        self._fh.close()
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single ``bytes=`` range, None to ignore
+    the header (malformed or multiple ranges: the full file is sent), or
+    ValueError when the range cannot be satisfied.
+    """
+    match = BYTE_RANGE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    elif last:
+        start, end = max(size - int(last), 0), size - 1
+        if int(last) == 0:
+            raise ValueError("empty suffix range")
+    else:
+        return None
+    if start >= size:
+        raise ValueError("range starts past the end")
+    return start, end
+
+
+def _range_applies(request, etag, last_modified):
+    if_range = request.headers.get("If-Range")
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(last_modified.timestamp()) <= since
+
+
+def _offload(name, path):
+    response = HttpResponse()
+    if settings.MEDIA_ACCEL == "x-accel-redirect":
+        # nginx serves it from an `internal` location aliased to MEDIA_ROOT
+        response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_PREFIX + name
+    else:
+        response["X-Sendfile"] = path
+    # the front server fills in the length and handles Range itself
+    return response
+
+
+@require_safe
+def serve_media(request, name):
+    try:
+        path = safe_join(settings.MEDIA_ROOT, name)
+        st = os.stat(path)
+    except (OSError, ValueError):
+        raise Http404("Not found")
+    if not stat.S_ISREG(st.st_mode):
+        raise Http404("Not found")
+
+    etag = conditional.make_etag("media", st.st_size, st.st_mtime_ns)
+    last_modified = datetime.datetime.fromtimestamp(st.st_mtime, tz=datetime.timezone.utc)
+    if conditional.not_modified(request, etag, last_modified):
+        response = conditional.not_modified_response(etag, last_modified)
+        response["Cache-Control"] = cache_control(name)
+        return response
+
+    content_type, _ = mimetypes.guess_type(name)
+    content_type = content_type or "application/octet-stream"
+
+    if settings.MEDIA_ACCEL:
+        response = _offload(name, path)
+        response["Content-Type"] = content_type
+    else:
+        response = _stream(request, path, st.st_size, etag, last_modified, content_type)
+        if response.status_code == 416:
+            return response
+
+    conditional.set_validators(response, etag, last_modified)
+    response["Cache-Control"] = cache_control(name)
+    return response
+
+
+def _stream(request, path, size, etag, last_modified, content_type):
+    byte_range = None
+    header = request.headers.get("Range")
+    if header and _range_applies(request, etag, last_modified):
+        try:
+            byte_range = parse_range(header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    fh = open(path, "rb")
+    if byte_range is None:
+        response = FileResponse(fh, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(RangeFile(fh, start, end - start + 1), content_type=content_type, status=206)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = end - start + 1
+    response.block_size = BLOCK_SIZE
+    response["Accept-Ranges"] = "bytes"
+    return response
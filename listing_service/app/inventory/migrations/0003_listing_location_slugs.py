@@ -0,0 +1,66 @@
+# Generated by Django 5.2 on 2026-10-17 20:18
+
+from django.db import migrations, models
+
+LOCATION_LEVELS = ("state_slug", "district_slug", "city_slug", "locality_slug")
+BATCH_SIZE = 2000
+
+
+def backfill_location_slugs(apps, schema_editor):
+    """Fill the slug columns from the existing "state/district/city/locality" paths."""
+    Listing = apps.get_model("inventory", "Listing")
+    batch = []
+    for listing in Listing.objects.only("id", "location").iterator(chunk_size=BATCH_SIZE):
+        parts = [p for p in (listing.location or "").strip("/").split("/") if p]
+        parts = (parts + [""] * len(LOCATION_LEVELS))[: len(LOCATION_LEVELS)]
+        for field, value in zip(LOCATION_LEVELS, parts):
+            setattr(listing, field, value)
+        batch.append(listing)
+        if len(batch) >= BATCH_SIZE:
+            Listing.objects.bulk_update(batch, LOCATION_LEVELS)
+            batch = []
+    if batch:
+        Listing.objects.bulk_update(batch, LOCATION_LEVELS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_listing_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='city_slug',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='district_slug',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='locality_slug',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='state_slug',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.RunPython(backfill_location_slugs, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['is_active', 'state_slug', 'district_slug', 'city_slug', 'locality_slug'], name='listing_active_location_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['is_active', 'locality_slug'], name='listing_active_locality_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['is_active', 'category', 'state_slug', 'district_slug', 'city_slug'], name='listing_active_cat_loc_idx'),
+        ),
+    ]
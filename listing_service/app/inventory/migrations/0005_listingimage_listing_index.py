@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-17 20:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_listing_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='listingimage',
+            index=models.Index(fields=['listing', '-created_at'], name='listingimage_listing_idx'),
+        ),
+    ]
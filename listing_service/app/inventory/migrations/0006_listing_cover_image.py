@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 20:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_listingimage_listing_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='cover_image',
+            field=models.ImageField(blank=True, default='', upload_to='listings/'),
+        ),
+    ]
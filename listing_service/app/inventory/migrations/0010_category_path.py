@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-17 20:27
+
+from django.db import migrations, models
+
+
+def backfill_category_paths(apps, schema_editor):
+    """Compute "/root/.../id/" for every category from the parent links."""
+    Category = apps.get_model("inventory", "Category")
+    parents = dict(Category.objects.values_list("id", "parent_id"))
+
+    def path_of(category_id, seen=()):
+        parent_id = parents[category_id]
+        if parent_id is None or parent_id in seen:
+            return f"/{category_id}/"
+        return f"{path_of(parent_id, seen + (category_id,))}{category_id}/"
+
+    categories = list(Category.objects.only("id"))
+    for category in categories:
+        category.path = path_of(category.id)
+    Category.objects.bulk_update(categories, ["path"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_listing_external_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_category_paths, migrations.RunPython.noop),
+    ]
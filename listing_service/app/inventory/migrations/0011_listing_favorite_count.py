@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-17 20:34
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_favorite_counts(apps, schema_editor):
+    Listing = apps.get_model("inventory", "Listing")
+    Favorite = apps.get_model("inventory", "Favorite")
+    counts = (
+        Favorite.objects.filter(listing=OuterRef("pk"))
+        .values("listing")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+    Listing.objects.update(favorite_count=Coalesce(Subquery(counts), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0010_category_path'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='favorite_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_favorite_counts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='favorite_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-17 20:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0012_listing_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('listing_id', models.IntegerField()),
+                ('kind', models.CharField(choices=[('listing.created', 'listing.created'), ('listing.updated', 'listing.updated'), ('listing.deleted', 'listing.deleted'), ('image.added', 'image.added'), ('image.deleted', 'image.deleted'), ('favorite.added', 'favorite.added'), ('favorite.removed', 'favorite.removed'), ('review.added', 'review.added'), ('review.removed', 'review.removed')], max_length=32)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
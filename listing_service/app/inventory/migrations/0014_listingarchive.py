@@ -0,0 +1,48 @@
+# Generated by Django 5.2 on 2026-10-17 20:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0013_listingchange'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='listingchange',
+            name='kind',
+            field=models.CharField(choices=[('listing.created', 'listing.created'), ('listing.updated', 'listing.updated'), ('listing.deleted', 'listing.deleted'), ('listing.archived', 'listing.archived'), ('image.added', 'image.added'), ('image.deleted', 'image.deleted'), ('favorite.added', 'favorite.added'), ('favorite.removed', 'favorite.removed'), ('review.added', 'review.added'), ('review.removed', 'review.removed')], max_length=32),
+        ),
+        migrations.CreateModel(
+            name='ListingArchive',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('owner_user_id', models.IntegerField()),
+                ('external_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('category_id', models.IntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('description', models.TextField()),
+                ('price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('location', models.CharField(max_length=255)),
+                ('state_slug', models.CharField(blank=True, default='', max_length=255)),
+                ('district_slug', models.CharField(blank=True, default='', max_length=255)),
+                ('city_slug', models.CharField(blank=True, default='', max_length=255)),
+                ('locality_slug', models.CharField(blank=True, default='', max_length=255)),
+                ('cover_image', models.ImageField(blank=True, default='', upload_to='listings/')),
+                ('is_active', models.BooleanField(default=False)),
+                ('favorite_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('rating_avg', models.FloatField(default=0)),
+                ('images', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner_user_id', '-created_at'], name='listingarchive_owner_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-17 21:07
+
+import inventory.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0016_cacheversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listingchange',
+            name='txid',
+            field=models.BigIntegerField(db_default=inventory.models.CurrentTransactionId(), editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='listingchange',
+            index=models.Index(fields=['txid', 'id'], name='listingchange_txid_idx'),
+        ),
+    ]
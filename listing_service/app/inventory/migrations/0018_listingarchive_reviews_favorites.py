@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-17 21:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0017_listingchange_txid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listingarchive',
+            name='favorites',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='listingarchive',
+            name='reviews',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AlterField(
+            model_name='listingchange',
+            name='kind',
+            field=models.CharField(choices=[('listing.created', 'listing.created'), ('listing.updated', 'listing.updated'), ('listing.deleted', 'listing.deleted'), ('listing.archived', 'listing.archived'), ('listing.restored', 'listing.restored'), ('image.added', 'image.added'), ('image.deleted', 'image.deleted'), ('favorite.added', 'favorite.added'), ('favorite.removed', 'favorite.removed'), ('review.added', 'review.added'), ('review.removed', 'review.removed')], max_length=32),
+        ),
+    ]
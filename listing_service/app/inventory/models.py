@@ -1,13 +1,27 @@
+import datetime
 import uuid
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import models, transaction
+from django.db.models import Case, F, Subquery, Value, When
+from django.db.models.functions import Cast, Concat, Floor, Substr
 from rest_framework import serializers
 from django.contrib.auth.models import User
 
+from .geo import CELL_COLUMNS, CELL_DEGREES
+
 
 
 # ---------------------------
 # CATEGORY MODEL
 # ---------------------------
+class CategoryQuerySet(models.QuerySet):
+    def subtree(self, **lookup):
+        """The category matching `lookup` (e.g. id=4 or slug="cars") and all its descendants."""
+        root = Category.objects.filter(**lookup).values("path")[:1]
+        return self.filter(path__startswith=Subquery(root))
+
+
 class Category(models.Model):
     id = models.AutoField(primary_key=True,editable=False)
     name = models.CharField(max_length=255)
@@ -19,6 +33,11 @@ class Category(models.Model):
         related_name='children'
     )
     slug = models.SlugField(max_length=255, unique=True)
+    # materialized path of ids from the root, e.g. "/2/4/"; maintained by
+    # save() and, on delete, by signals.detach_category_subtree
+    path = models.CharField(max_length=255, db_index=True, blank=True, default="", editable=False)
+
+    objects = CategoryQuerySet.as_manager()
 
     class Meta:
         ordering = ['name']
@@ -26,14 +45,70 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # stored path, not self.path: an ancestor may have moved since this was loaded
+        old_path = ""
+        if self.pk:
+            old_path = Category.objects.filter(pk=self.pk).values_list("path", flat=True).first() or ""
+        parent_path = "/"
+        if self.parent_id:
+            parent_path = Category.objects.values_list("path", flat=True).get(id=self.parent_id)
+            if old_path and parent_path.startswith(old_path):
+                raise ValueError("A category cannot be moved under itself or its descendants")
+        # one transaction, so the row, its subtree's paths and the category
+        # cache version (bumped by the post_save signal) commit together
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            new_path = f"{parent_path}{self.id}/"
+            if new_path != old_path:
+                Category.objects.filter(id=self.id).update(path=new_path)
+                if old_path:
+                    # moved: rewrite the path prefix of the whole subtree at once
+                    Category.objects.filter(path__startswith=old_path).exclude(id=self.id).update(
+                        path=Concat(Value(new_path), Substr("path", len(old_path) + 1))
+                    )
+                self.path = new_path
+
+
+class CacheVersion(models.Model):
+    """
+    Version counter for a process-level cache (see category_cache). Bumped
+    in the writing transaction, so every process sees the new version
+    exactly when it can see the new rows.
+    """
+    name = models.CharField(max_length=64, primary_key=True)
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.name}={self.version}"
+
 
 # ---------------------------
 # LISTING MODEL
 # ---------------------------
+# levels of the "state/district/city/locality" location path
+LOCATION_LEVELS = ("state_slug", "district_slug", "city_slug", "locality_slug")
+
+
+def split_location(path):
+    """Split a location path into its level slugs, padding missing levels with ""."""
+    parts = [p for p in (path or "").strip("/").split("/") if p][: len(LOCATION_LEVELS)]
+    return parts + [""] * (len(LOCATION_LEVELS) - len(parts))
+
+
+class ListingManager(models.Manager):
+    def get_queryset(self):
+        # search_vector is only used in WHERE/ORDER BY; never ship it to Python
+        return super().get_queryset().defer("search_vector")
+
+
 class Listing(models.Model):
     id = models.AutoField(primary_key=True,editable=False)
 
     owner_user_id = models.IntegerField()  # if you don’t have a User model
+    # the owner's own id for the listing (dealer feeds), unique per owner
+    external_id = models.CharField(max_length=255, null=True, blank=True)
     category = models.ForeignKey(
         Category,
         on_delete=models.CASCADE,
@@ -44,13 +119,122 @@ class Listing(models.Model):
     description = models.TextField()
     price = models.DecimalField(max_digits=12, decimal_places=2)
     location = models.CharField(max_length=255)
+    # structured copy of `location`, filled by set_location()
+    state_slug = models.CharField(max_length=255, blank=True, default="")
+    district_slug = models.CharField(max_length=255, blank=True, default="")
+    city_slug = models.CharField(max_length=255, blank=True, default="")
+    locality_slug = models.CharField(max_length=255, blank=True, default="")
+    # the locality's point, copied from the region service; null when unknown
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    # grid cell of the point (see inventory.geo), the indexed radius prefilter
+    geo_cell = models.GeneratedField(
+        expression=Cast(
+            Floor((F("latitude") + 90) / CELL_DEGREES) * CELL_COLUMNS
+            + Floor((F("longitude") + 180) / CELL_DEGREES),
+            models.BigIntegerField(),
+        ),
+        output_field=models.BigIntegerField(),
+        db_persist=True,
+    )
+    # newest ListingImage file, kept in sync by the image endpoints so
+    # grid reads never touch ListingImage
+    cover_image = models.ImageField(upload_to="listings/", blank=True, default="")
     is_active = models.BooleanField(default=True)
+    # number of Favorite rows, kept in step by add_favorite/delete_favorite
+    favorite_count = models.PositiveIntegerField(default=0)
+    # Review aggregates, kept in step by the review endpoints
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_avg = models.GeneratedField(
+        expression=Case(
+            When(rating_count=0, then=Value(0.0)),
+            default=Cast("rating_sum", models.FloatField()) / F("rating_count"),
+        ),
+        output_field=models.FloatField(),
+        db_persist=True,
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # stored tsvector maintained by Postgres on every insert/update
+    search_vector = models.GeneratedField(
+        expression=SearchVector("title", weight="A", config="english")
+        + SearchVector("description", weight="B", config="english"),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    objects = ListingManager()
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="listing_search_vector_idx"),
+            # keyset pagination: (sort key, id) behind the is_active filter
+            models.Index(fields=["is_active", "-created_at", "-id"], name="listing_active_created_idx"),
+            models.Index(fields=["is_active", "price", "id"], name="listing_active_price_idx"),
+            models.Index(fields=["owner_user_id", "-created_at", "-id"], name="listing_owner_created_idx"),
+            models.Index(fields=["is_active", "-rating_avg", "-id"], name="listing_active_rating_idx"),
+            # location filters are equality lookups on a prefix of these
+            models.Index(
+                fields=["is_active", "state_slug", "district_slug", "city_slug", "locality_slug"],
+                name="listing_active_location_idx",
+            ),
+            models.Index(fields=["is_active", "locality_slug"], name="listing_active_locality_idx"),
+            models.Index(fields=["is_active", "geo_cell"], name="listing_active_geo_cell_idx"),
+            models.Index(
+                fields=["is_active", "category", "state_slug", "district_slug", "city_slug"],
+                name="listing_active_cat_loc_idx",
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["owner_user_id", "external_id"], name="listing_owner_external_id_uniq"
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    def refresh_cover_image(self):
+        """Point cover_image at the newest remaining image, or clear it."""
+        newest = (
+            self.images.order_by("-created_at", "-id")
+            .values_list("image", flat=True)
+            .first()
+        )
+        self.cover_image = newest or ""
+        self.save(update_fields=["cover_image", "updated_at"])
+
+    def set_location(self, path):
+        """Store the "state/district/city/locality" path and its slug columns."""
+        self.location = path
+        for field, value in zip(LOCATION_LEVELS, split_location(path)):
+            setattr(self, field, value)
+
+    def set_point(self, latitude, longitude):
+        """Store the locality's coordinates; both or neither."""
+        if (latitude is None) != (longitude is None):
+            raise ValueError("latitude and longitude go together")
+        if latitude is not None and not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValueError("coordinates out of range")
+        self.latitude = latitude
+        self.longitude = longitude
+
+
+# ---------------------------
+# STORED IMAGE FILES
+# ---------------------------
+class ImageBlob(models.Model):
+    """One stored file per distinct image content, shared by ListingImage rows."""
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField()
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
 
 # ---------------------------
 # LISTING MEDIA MODEL
@@ -64,11 +248,16 @@ class ListingImage(models.Model):
         related_name='images'
     )
     image = models.ImageField(upload_to="listings/")  # if media is handled externally (S3, etc.)
+    # generated variant key ("grid", "grid_webp", ...) -> storage name
+    variants = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["listing", "-created_at"], name="listingimage_listing_idx"),
+        ]
 
     def __str__(self):
         return f"Image for {self.listing.title}"
@@ -92,6 +281,11 @@ class Review(models.Model):
     comment = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["listing", "-created_at", "-id"], name="review_listing_created_idx"),
+        ]
+
     def __str__(self):
         return f"Review {self.rating}★"
 
@@ -105,7 +299,162 @@ class Favorite(models.Model):
 
     class Meta:
         unique_together = ('user', 'listing')  # prevent duplicate favorites
+        indexes = [
+            # a user's favorites, newest first, for keyset pagination
+            models.Index(fields=["user", "-created_at", "-id"], name="favorite_user_created_idx"),
+        ]
 
     def __str__(self):
         return f"Favorite by {self.user.id} for listing {self.listing.id}"
 
+
+
+# ---------------------------
+# CHANGE FEED
+# ---------------------------
+class CurrentTransactionId(models.Func):
+    """The inserting transaction's 64-bit id (pg_current_xact_id())."""
+    template = "pg_current_xact_id()::text::bigint"
+    output_field = models.BigIntegerField()
+
+
+class ListingChange(models.Model):
+    """
+    Append-only log of listing-visible writes, inserted in the same
+    transaction as the write itself (see changes.record_change) and read
+    by consumers through GET /changes.
+    """
+    LISTING_CREATED = "listing.created"
+    LISTING_UPDATED = "listing.updated"
+    LISTING_DELETED = "listing.deleted"
+    LISTING_ARCHIVED = "listing.archived"
+    LISTING_RESTORED = "listing.restored"
+    IMAGE_ADDED = "image.added"
+    IMAGE_DELETED = "image.deleted"
+    FAVORITE_ADDED = "favorite.added"
+    FAVORITE_REMOVED = "favorite.removed"
+    REVIEW_ADDED = "review.added"
+    REVIEW_REMOVED = "review.removed"
+    KINDS = [
+        (kind, kind) for kind in (
+            LISTING_CREATED, LISTING_UPDATED, LISTING_DELETED, LISTING_ARCHIVED, LISTING_RESTORED,
+            IMAGE_ADDED, IMAGE_DELETED,
+            FAVORITE_ADDED, FAVORITE_REMOVED,
+            REVIEW_ADDED, REVIEW_REMOVED,
+        )
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    # plain integer, not a FK: the event outlives a deleted listing
+    listing_id = models.IntegerField()
+    kind = models.CharField(max_length=32, choices=KINDS)
+    data = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # feed position: filled in by the database, see changes.read_changes
+    txid = models.BigIntegerField(db_default=CurrentTransactionId(), editable=False)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [models.Index(fields=["txid", "id"], name="listingchange_txid_idx")]
+
+    def __str__(self):
+        return f"{self.kind} {self.listing_id}"
+
+
+# ---------------------------
+# LISTING ARCHIVE
+# ---------------------------
+class ListingArchive(models.Model):
+    """
+    Listings moved out of the hot table by the archive_listings command.
+
+    Rows keep their Listing id (ids are never reused, so one id is in one
+    table), the columns ListingOut needs, and the image, review and
+    favorite rows as JSON, so inventory.archive.restore() can put the
+    listing back as it was. The image files stay referenced: each archived
+    image holds an ImageBlob ref until the archive row is deleted.
+    """
+    id = models.IntegerField(primary_key=True)
+    owner_user_id = models.IntegerField()
+    external_id = models.CharField(max_length=255, null=True, blank=True)
+    # plain id, not a FK: categories can be removed after archival
+    category_id = models.IntegerField()
+    title = models.CharField(max_length=255)
+    description = models.TextField()
+    price = models.DecimalField(max_digits=12, decimal_places=2)
+    location = models.CharField(max_length=255)
+    state_slug = models.CharField(max_length=255, blank=True, default="")
+    district_slug = models.CharField(max_length=255, blank=True, default="")
+    city_slug = models.CharField(max_length=255, blank=True, default="")
+    locality_slug = models.CharField(max_length=255, blank=True, default="")
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    cover_image = models.ImageField(upload_to="listings/", blank=True, default="")
+    is_active = models.BooleanField(default=False)
+    favorite_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_avg = models.FloatField(default=0)
+    # [{"id", "image", "variants", "created_at"}, ...], newest first
+    images = models.JSONField(default=list, blank=True)
+    # [{"id", "reviewer_user_id", "rating", "comment", "created_at"}, ...]
+    reviews = models.JSONField(default=list, blank=True)
+    # [{"id", "user_id", "created_at"}, ...]
+    favorites = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["owner_user_id", "-created_at"], name="listingarchive_owner_idx"),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    ARCHIVED_FIELDS = (
+        "id", "owner_user_id", "external_id", "category_id", "title", "description",
+        "price", "location", "state_slug", "district_slug", "city_slug", "locality_slug",
+        "latitude", "longitude", "cover_image", "is_active", "favorite_count", "rating_sum", "rating_count",
+        "rating_avg", "created_at", "updated_at",
+    )
+
+    @classmethod
+    def from_listing(cls, listing, images, reviews=(), favorites=()):
+        archive = cls(**{field: getattr(listing, field) for field in cls.ARCHIVED_FIELDS})
+        archive.images = [
+            {
+                "id": img.id,
+                "image": img.image.name,
+                "variants": img.variants,
+                "created_at": img.created_at.isoformat(),
+            }
+            for img in images
+        ]
+        archive.reviews = [
+            {
+                "id": review.id,
+                "reviewer_user_id": review.reviewer_user_id,
+                "rating": review.rating,
+                "comment": review.comment,
+                "created_at": review.created_at.isoformat(),
+            }
+            for review in reviews
+        ]
+        archive.favorites = [
+            {"id": fav.id, "user_id": fav.user_id, "created_at": fav.created_at.isoformat()}
+            for fav in favorites
+        ]
+        return archive
+
+    def image_rows(self):
+        """Unsaved ListingImage objects for the archived images, for serialization."""
+        rows = []
+        for data in self.images:
+            created_at = datetime.datetime.fromisoformat(data["created_at"])
+            rows.append(ListingImage(
+                id=data["id"], listing_id=self.id, image=data["image"],
+                variants=data["variants"], created_at=created_at, updated_at=created_at,
+            ))
+        return rows
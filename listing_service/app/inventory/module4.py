@@ -1,18 +1,34 @@
 from email.mime import image
-from typing import List,Optional
+from typing import Dict,List,Optional,Union
 from typing import List,Optional
 import uuid
 from ninja import Router,Schema
-from .models import Category, Listing, Review, Favorite, ListingImage
+from .models import Category, Listing, ListingArchive, ListingChange, Review, Favorite, ListingImage, LOCATION_LEVELS, split_location
 from ninja.errors import HttpError
 from ninja import Schema
-from django.shortcuts import get_object_or_404
+from django.shortcuts import aget_object_or_404, get_object_or_404
 import  datetime
+import hashlib
 from ninja import  File
 from ninja.files import UploadedFile
 from ninja import Query
-from django.db import IntegrityError
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import F, FloatField, Prefetch
+from django.db.models.functions import Cast, Now
+from django.contrib.postgres.search import SearchQuery, SearchRank
 from core import settings
+from django.core.cache import cache
+from django.http import FileResponse, HttpResponse
+from PIL import UnidentifiedImageError
+from . import archive, category_cache, conditional, geo, media
+from .auth import JWTAuth
+from .blobs import store_upload
+from .changes import read_changes, record_change
+from .facets import listing_facets, next_location_level
+from .ingest import ingest, read_csv, read_ndjson
+from .images import FORMATS, render_variant, schedule_variants, size_map
+from .pagination import DEFAULT_PAGE_SIZE, LISTING_SORTS, MAX_PAGE_SIZE, apaginate, paginate
 
 router = Router()
 MEDIA_URL = '/media/'
@@ -32,6 +48,14 @@ class CategoryOut(Schema):
     slug: str
     parent_id: Optional[int]
 
+class CategoryTreeOut(Schema):
+    id: int
+    name: str
+    slug: str
+    children: List["CategoryTreeOut"] = []
+
+CategoryTreeOut.model_rebuild()
+
 
 @router.get(
     "/category",
@@ -40,8 +64,36 @@ class CategoryOut(Schema):
     summary="List all categories",
     description="List all categories"
 )
-def get_categories(request):
-    return Category.objects.all()
+async def get_categories(request, response: HttpResponse):
+    return await _cached_categories(request, response, "list", _build_category_list)
+
+@router.get("/category/tree", response=List[CategoryTreeOut], summary="Nested category tree")
+async def get_category_tree(request, response: HttpResponse):
+    return await _cached_categories(request, response, "tree", _build_category_tree)
+
+async def _build_category_list():
+    return [c async for c in Category.objects.values("id", "name", "slug", "parent_id")]
+
+async def _build_category_tree():
+    # one query; ordering by name keeps siblings sorted as they are attached
+    nodes = {
+        c["id"]: {**c, "children": []}
+        async for c in Category.objects.values("id", "name", "slug", "parent_id")
+    }
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node["parent_id"])
+        (parent["children"] if parent else roots).append(node)
+    return roots
+
+async def _cached_categories(request, response, kind, build):
+    """Serve from the versioned process cache; 304 when the client's ETag is current."""
+    version, payload = await category_cache.get(kind, build)
+    etag = category_cache.etag(version)
+    if conditional.not_modified(request, etag):
+        return conditional.not_modified_response(etag)
+    conditional.set_validators(response, etag)
+    return payload
 
 @router.post("/category/create", tags=["module4"],summary="create new category" )
 def create_category(request, data: CategoryIn):
@@ -60,10 +112,14 @@ def get_category(request, category_id: int):
 @router.put("/category/{category_id}", response=CategoryOut)
 def update_category(request, category_id: int, data: CategoryIn):
     category = get_object_or_404(Category, id=category_id)
+    values = data.dict()
     if data.parent is not None:
-        data.parent = category
+        parent = get_object_or_404(Category, id=data.parent)
+        if parent.path.startswith(category.path):
+            raise HttpError(400, "A category cannot be moved under itself or its descendants")
+        values["parent"] = parent
 
-    for attr, value in data.dict().items():
+    for attr, value in values.items():
         setattr(category, attr, value)
 
     category.save()
@@ -86,127 +142,398 @@ class ListingIn(Schema):
     title: str
     category: int
     price: float
+    description: Optional[str] = ""
     locality_slug: str   # still stored separately if you want
     location: str        # full path: "state/district/city/locality"
     is_active: Optional[bool] = True
+    # the locality's point (brain copies it from region_service)
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+
+# declared ahead of ListingOut, which can embed images
+class ListingImageOut(Schema):
+    id: int
+    listing_id: int
+    image: str
+    # "grid", "grid_webp", "detail", "detail_webp" -> URL
+    sizes: Dict[str, str]
+    created_at: datetime.datetime
+
+
+def _image_out(img):
+    return {
+        "id": img.id,
+        "listing_id": img.listing_id,
+        "image": img.image.url,
+        "sizes": size_map(img.image.name, img.variants),
+        "created_at": img.created_at,
+    }
 
 
 class ListingOut(Schema):
     id: int
     title: str
+    description: str
     owner_user_id: int
     category_id: int
     price: float
     location: str
+    state_slug: str
+    district_slug: str
+    city_slug: str
+    locality_slug: str
     is_active: bool
+    favorite_count: int
+    rating_count: int
+    rating_avg: float
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
     created_at: datetime.datetime
     updated_at: datetime.datetime
-
-
-@router.get("/listings", response=List[ListingOut])
-def get_listings(
-    request,
-    location: Optional[str] = Query(None),
-    category: Optional[int] = Query(None),
-    min_price: Optional[float] = Query(None),
-    max_price: Optional[float] = Query(None),
-    user_id: Optional[int] = Query(None),
-    state_slug: Optional[str] = Query(None),
-    district_slug: Optional[str] = Query(None),
-    city_slug: Optional[str] = Query(None),
-    locality_slug: Optional[str] = Query(None),
-    category_slug: Optional[str] = Query(None),
-):
+    # only filled on radius searches
+    distance_km: Optional[float] = None
+    # only filled when requested with `include=images`
+    images: Optional[List[ListingImageOut]] = None
+    cover_image_url: Optional[str] = None
+    cover_sizes: Optional[Dict[str, str]] = None
+
+    @staticmethod
+    def resolve_images(obj):
+        images = getattr(obj, "prefetched_images", None)
+        return None if images is None else [_image_out(img) for img in images]
+
+    @staticmethod
+    def resolve_cover_image_url(obj):
+        return obj.cover_image.url if obj.cover_image else None
+
+    @staticmethod
+    def resolve_cover_sizes(obj):
+        return size_map(obj.cover_image.name) if obj.cover_image else None
+
+
+LISTING_INCLUDES = ("images", "cover")
+
+
+def _with_includes(qs, include):
+    """
+    Prefetch images for `include=images` (all, newest first), one extra
+    query per page. `include=cover` needs no join: cover_image_url is read
+    from the denormalized Listing.cover_image column on every response.
+    """
+    if include is None:
+        return qs
+    if include not in LISTING_INCLUDES:
+        raise HttpError(400, f"Unknown include: {include}")
+    if include == "images":
+        images = ListingImage.objects.order_by("-created_at", "-id")
+        return qs.prefetch_related(Prefetch("images", queryset=images, to_attr="prefetched_images"))
+    return qs
+
+
+class ListingPageOut(Schema):
+    items: List[ListingOut]
+    next_cursor: Optional[str] = None
+
+
+class ListingFilters(Schema):
+    """Query filters shared by /listings and /listings/facets."""
+    q: Optional[str] = None
+    location: Optional[str] = None
+    category: Optional[int] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    user_id: Optional[int] = None
+    state_slug: Optional[str] = None
+    district_slug: Optional[str] = None
+    city_slug: Optional[str] = None
+    locality_slug: Optional[str] = None
+    category_slug: Optional[str] = None
+    # radius search around a point (brain resolves `near=<locality>` to it)
+    near_lat: Optional[float] = None
+    near_lng: Optional[float] = None
+    radius_km: Optional[float] = None
+
+
+def _location_filters(filters):
+    """Slug column -> value from both the `location` path and the *_slug params."""
+    values = {}
+    # `location` is a (partial) "state/district/city/locality" path
+    if filters.location:
+        values.update(zip(LOCATION_LEVELS, split_location(filters.location)))
+    for field in LOCATION_LEVELS:
+        if getattr(filters, field):
+            values[field] = getattr(filters, field)
+    return {field: value for field, value in values.items() if value}
+
+
+def _filter_listings(filters):
     qs = Listing.objects.filter(is_active=True)
 
-    if location:
-        qs = qs.filter(location__icontains=location)
-
-    if category:
-        qs = qs.filter(category_id=category)
-
-    if min_price is not None:
-        qs = qs.filter(price__gte=min_price)
+    # full-text search on title/description via the GIN-indexed search_vector
+    q = (filters.q or "").strip()
+    if q:
+        qs = qs.filter(search_vector=SearchQuery(q, config="english", search_type="websearch"))
 
-    if max_price is not None:
-        qs = qs.filter(price__lte=max_price)
+    # location filter: equality on the indexed slug columns
+    qs = qs.filter(**_location_filters(filters))
 
-    if user_id is not None:
-        qs = qs.filter(owner_user_id=user_id)
+    # category filters match the whole subtree ("automobiles" includes cars, bikes)
+    if filters.category:
+        qs = qs.filter(category__in=Category.objects.subtree(id=filters.category).values("id"))
 
     # slug-based category filter
-    if category_slug:
-        qs = qs.filter(category__slug=category_slug)
-
-    # location slug filter: you may choose a scheme; here we store locality_slug in Listing.location
-    if locality_slug:
-        qs = qs.filter(location__endswith=f"/{locality_slug}")
-    elif city_slug and state_slug and district_slug:
-        # state/district/city prefix
-        qs = qs.filter(
-            location__startswith=f"{state_slug}/{district_slug}/{city_slug}/"
-        )
-    elif district_slug and state_slug:
-        # state/district prefix
-        qs = qs.filter(location__startswith=f"{state_slug}/{district_slug}/")
-    elif state_slug:
-        # state prefix
-        qs = qs.filter(location__startswith=f"{state_slug}/")
-
-    return list(qs)
+    if filters.category_slug:
+        qs = qs.filter(category__in=Category.objects.subtree(slug=filters.category_slug).values("id"))
+
+    if filters.min_price is not None:
+        qs = qs.filter(price__gte=filters.min_price)
+
+    if filters.max_price is not None:
+        qs = qs.filter(price__lte=filters.max_price)
+
+    if filters.user_id is not None:
+        qs = qs.filter(owner_user_id=filters.user_id)
+
+    if filters.near_lat is not None or filters.near_lng is not None:
+        if filters.near_lat is None or filters.near_lng is None:
+            raise HttpError(400, "near_lat and near_lng go together")
+        radius_km = filters.radius_km or settings.GEO_DEFAULT_RADIUS_KM
+        if not 0 < radius_km <= settings.GEO_MAX_RADIUS_KM:
+            raise HttpError(400, f"radius_km must be between 0 and {settings.GEO_MAX_RADIUS_KM}")
+        if not (-90 <= filters.near_lat <= 90 and -180 <= filters.near_lng <= 180):
+            raise HttpError(400, "near_lat/near_lng out of range")
+        # indexed grid cells first, haversine only for what is left
+        qs = geo.within_radius(qs, filters.near_lat, filters.near_lng, radius_km)
+
+    return qs
+
+
+# The hot read endpoints are async; writes stay sync. Django's async ORM
+# still runs each query on a thread through sync_to_async (there is no
+# native async driver path), so this alone does not raise throughput.
+# What does is reusing database connections: see the psycopg pool in
+# DATABASES, which bench_reads measured at ~2x req/s.
+@router.get("/listings", response=ListingPageOut)
+async def get_listings(
+    request,
+    filters: ListingFilters = Query(...),
+    sort: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE),
+    include: Optional[str] = Query(None),
+):
+    q = (filters.q or "").strip()
+    near = filters.near_lat is not None
+    # search results default to relevance order, radius searches to
+    # nearest first, browsing to newest first
+    sort = sort or ("relevance" if q else "distance" if near else "newest")
+    if (
+        sort not in LISTING_SORTS
+        or (sort == "relevance" and not q)
+        or (sort == "distance" and not near)
+    ):
+        raise HttpError(400, f"Unknown sort: {sort}")
+
+    qs = _filter_listings(filters)
+    if q:
+        query = SearchQuery(q, config="english", search_type="websearch")
+        # ts_rank is a float4; cast so the cursor value round-trips exactly
+        qs = qs.annotate(rank=Cast(SearchRank(F("search_vector"), query), FloatField()))
+
+    qs = _with_includes(qs, include)
+
+    field, descending = LISTING_SORTS[sort]
+    items, next_cursor = await apaginate(qs, sort, field, descending, cursor, limit)
+    return {"items": items, "next_cursor": next_cursor}
+
+
+class CategoryFacetOut(Schema):
+    id: int
+    name: str
+    slug: str
+    count: int
+    children: List["CategoryFacetOut"] = []
+
+CategoryFacetOut.model_rebuild()
+
+class LocationFacetOut(Schema):
+    level: Optional[str]        # slug column the counts are for, None below locality
+    counts: List[Dict[str, Union[str, int]]]
+
+class PriceFacetOut(Schema):
+    min: int
+    max: Optional[int]
+    count: int
+
+class ListingFacetsOut(Schema):
+    total: int
+    categories: List[CategoryFacetOut]
+    location: LocationFacetOut
+    price: List[PriceFacetOut]
+    cached: bool = False
+
+@router.get("/listings/facets", response=ListingFacetsOut)
+def get_listing_facets(request, filters: ListingFilters = Query(...), cached: bool = False):
+    """
+    Counts by category (rolled up the tree), by the next location level and
+    by price bucket for the listings matching `filters`, from one query.
+    cached=true serves counts up to FACETS_CACHE_TTL seconds old, meant for
+    broad browse pages where exact numbers are not worth a full scan.
+    """
+    level = next_location_level(_location_filters(filters))
+    if not cached:
+        return listing_facets(_filter_listings(filters), level)
+
+    key = "inventory:facets:" + hashlib.sha1(filters.model_dump_json(exclude_none=True).encode()).hexdigest()
+    facets = cache.get(key)
+    if facets is None:
+        facets = listing_facets(_filter_listings(filters), level)
+        cache.set(key, facets, settings.FACETS_CACHE_TTL)
+    return {**facets, "cached": True}
 
 @router.post("/listing/create", response=ListingOut)
 def create_listing(request, data: ListingIn):
     category = get_object_or_404(Category, id=data.category)
 
-    listing = Listing.objects.create(
+    listing = Listing(
         title=data.title,
+        description=data.description or "",
         category=category,
         price=data.price,
-        location=data.location,  # hierarchical path from brain
         is_active=data.is_active,
         owner_user_id=data.user_id,
     )
+    listing.set_location(data.location)  # hierarchical path from brain
+    try:
+        listing.set_point(data.latitude, data.longitude)
+    except ValueError as exc:
+        raise HttpError(400, str(exc))
+    with transaction.atomic():
+        listing.save()
+        record_change(listing.id, ListingChange.LISTING_CREATED)
     return listing
+
+class BulkRowOut(Schema):
+    row: int
+    status: str          # created | updated | error
+    id: Optional[int] = None
+    external_id: Optional[str] = None
+    error: Optional[str] = None
+
+class BulkIngestOut(Schema):
+    created: int
+    updated: int
+    failed: int
+    results: List[BulkRowOut]
+
+@router.post("/listings/bulk", response=BulkIngestOut)
+def bulk_create_listings(request, user_id: int, mode: str = "insert"):
+    """
+    Create (or with mode=upsert, create-or-update by external_id) many
+    listings from an NDJSON or CSV body (Content-Type text/csv). The body is
+    read row by row, never loaded whole.
+    """
+    if mode not in ("insert", "upsert"):
+        raise HttpError(400, "mode must be insert or upsert")
+    rows = read_csv(request) if request.content_type == "text/csv" else read_ndjson(request)
+    return ingest(rows, owner_user_id=user_id, upsert=mode == "upsert")
 # #
 # #
 @router.get("/listing/{listing_id}", response=ListingOut)
-def get_listing(request, listing_id: int):
-    return get_object_or_404(Listing, id=listing_id)
+async def get_listing(request, response: HttpResponse, listing_id: int, include: Optional[str] = Query(None)):
+    try:
+        listing = await _with_includes(Listing.objects.all(), include).aget(id=listing_id)
+    except Listing.DoesNotExist:
+        # archived listings stay readable by id
+        listing = await aget_object_or_404(ListingArchive, id=listing_id)
+        if include == "images":
+            listing.prefetched_images = listing.image_rows()
+
+    parts = ["listing", listing.id, conditional.stamp(listing.updated_at)]
+    last_modified = listing.updated_at
+    images = getattr(listing, "prefetched_images", None)
+    if images is not None:
+        parts += conditional.image_set_parts(images)
+        last_modified = max([last_modified] + [img.updated_at for img in images])
+    etag = conditional.make_etag(*parts)
+    if conditional.not_modified(request, etag, last_modified):
+        return conditional.not_modified_response(etag, last_modified)
+    conditional.set_validators(response, etag, last_modified)
+    return listing
 #
 
 class ListingUpdateIn(Schema):
     title: Optional[str] = None
+    description: Optional[str] = None
     category: Optional[int] = None
     price: Optional[int] = None
     location: Optional[str] = None
     is_active: Optional[bool] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
 #
 @router.put("/listing/{listing_id}", response=ListingOut)
 def update_listing(request, listing_id:int , data: ListingUpdateIn):
-    listing = get_object_or_404(Listing, id=listing_id)
+    try:
+        listing = Listing.objects.get(id=listing_id)
+    except Listing.DoesNotExist:
+        if ListingArchive.objects.filter(id=listing_id).exists():
+            raise HttpError(409, "Listing is archived; restore it first")
+        raise HttpError(404, "Not Found")
 
     #update fields individually
     if data.title:
         listing.title = data.title
+    if data.description is not None:
+        listing.description = data.description
     if data.category:
         listing.category = get_object_or_404(Category,id=data.category)
     if data.price is not None:
         listing.price = data.price
-    if data.location:
-        listing.location = data.location
+    try:
+        if data.location:
+            listing.set_location(data.location)
+            # a new location without a point must not keep the old one
+            listing.set_point(data.latitude, data.longitude)
+        elif data.latitude is not None or data.longitude is not None:
+            listing.set_point(data.latitude, data.longitude)
+    except ValueError as exc:
+        raise HttpError(400, str(exc))
     if data.is_active is not None:
         listing.is_active = data.is_active
 
-    listing.save()
+    with transaction.atomic():
+        listing.save()
+        record_change(listing.id, ListingChange.LISTING_UPDATED)
     return listing
 #
 #
 @router.delete("/listing/{listing_id}")
 def delete_listing(request, listing_id: int):
-    listing = get_object_or_404(Listing, id=listing_id)
-    listing.delete()
+    with transaction.atomic():
+        listing = (
+            Listing.objects.filter(id=listing_id).first()
+            or ListingArchive.objects.filter(id=listing_id).first()
+        )
+        if listing is None:
+            raise HttpError(404, "Not Found")
+        record_change(listing.id, ListingChange.LISTING_DELETED)
+        # an archive row releases its image refs on delete (signals.py)
+        listing.delete()
     return {"success": True}
+
+
+@router.post("/listing/{listing_id}/restore", response=ListingOut)
+def restore_listing(request, listing_id: int):
+    """Move an archived listing back, with its images, reviews and favorites."""
+    with transaction.atomic():
+        archived = get_object_or_404(ListingArchive.objects.select_for_update(), id=listing_id)
+        try:
+            listing = archive.restore(archived)
+        except archive.RestoreError as exc:
+            raise HttpError(409, str(exc))
+    return listing
 #
 # # #-------------------
 # #ListingImages
@@ -216,118 +543,340 @@ class ListingImageIn(Schema):
 
 
 
-class ListingImageOut(Schema):
-    id: int
-    listing_id: int
-    image: str
-    created_at: datetime.datetime
-
 @router.post("/listing/{listing_id}/image/upload", response=ListingImageOut )
 def upload_listing_image(request, listing_id: int,image:UploadedFile = File(...)
                          ):
     listing = get_object_or_404(Listing, id=listing_id)
 
-    listing_image = ListingImage.objects.create(
-        listing=listing,
-        image=image
-    )
-
-    return {
-        "id": listing_image.id,
-        "listing_id": listing.id,
-        "image": listing_image.image.url,
-        "created_at": listing_image.created_at,
-    }
+    with transaction.atomic():
+        # identical bytes are stored once and shared (see blobs.py)
+        listing_image = ListingImage.objects.create(
+            listing=listing,
+            image=store_upload(image)
+        )
+        # the newest upload becomes the cover
+        listing.cover_image = listing_image.image.name
+        listing.save(update_fields=["cover_image", "updated_at"])
+        record_change(listing.id, ListingChange.IMAGE_ADDED, image_id=listing_image.id)
+        # thumbnails are rendered in the background after commit
+        schedule_variants(listing_image.id)
+
+    return _image_out(listing_image)
 #
 @router.get("/listing/{listing_id}/images/", response=List[ListingImageOut])
-def get_listing_images(request, listing_id: int):
-    images = ListingImage.objects.filter(listing_id=listing_id)
-
-    return [
-         {
-             "id": img.id,
-             "listing_id": img.listing_id,
-             "image":img.image.url,
-             "created_at": img.created_at,
-         }
-       for img in images
-   ]
-
-@router.delete("/listing/{listing_id}/images/")
+async def get_listing_images(request, response: HttpResponse, listing_id: int):
+    images = [img async for img in ListingImage.objects.filter(listing_id=listing_id)]
+
+    etag = conditional.make_etag(listing_id, *conditional.image_set_parts(images))
+    last_modified = max((img.updated_at for img in images), default=None)
+    if conditional.not_modified(request, etag, last_modified):
+        return conditional.not_modified_response(etag, last_modified)
+    conditional.set_validators(response, etag, last_modified)
+    return [_image_out(img) for img in images]
+
+
+@router.get("/listings/images", response=Dict[int, List[ListingImageOut]])
+def get_images_for_listings(request, ids: str = Query(...)):
+    """
+    Images for many listings in one query, grouped by listing id.
+    `ids` is a comma-separated list, e.g. `?ids=1,2,3`.
+    """
+    try:
+        listing_ids = {int(i) for i in ids.split(",") if i.strip()}
+    except ValueError:
+        raise HttpError(400, "ids must be comma-separated integers")
+    if len(listing_ids) > MAX_PAGE_SIZE:
+        raise HttpError(400, f"At most {MAX_PAGE_SIZE} ids per request")
+
+    grouped = {listing_id: [] for listing_id in listing_ids}
+    for img in ListingImage.objects.filter(listing_id__in=listing_ids):
+        grouped[img.listing_id].append(_image_out(img))
+    return grouped
+
+@router.get("/media/variant/{path:name}", url_name="image_variant")
+def get_image_variant(
+    request,
+    name: str,
+    width: int = Query(...),
+    fmt: str = Query("jpeg", alias="format"),
+):
+    """
+    Serve a stored listing image resized to `width` (JPEG or WebP), from
+    the pre-generated variant or the on-demand disk cache.
+    """
+    if width not in settings.IMAGE_ONDEMAND_WIDTHS:
+        raise HttpError(400, f"width must be one of {settings.IMAGE_ONDEMAND_WIDTHS}")
+    if fmt not in FORMATS:
+        raise HttpError(400, f"format must be one of {tuple(FORMATS)}")
+    if not name.startswith("listings/") or ".." in name.split("/"):
+        raise HttpError(404, "Not found")
+
+    try:
+        variant = render_variant(name, width, fmt)
+    except FileNotFoundError:
+        raise HttpError(404, "Not found")
+    except UnidentifiedImageError:
+        raise HttpError(400, "Not an image")
+
+    response = FileResponse(variant, content_type=f"image/{fmt}")
+    # a variant of content-addressed bytes never changes either
+    response["Cache-Control"] = media.IMMUTABLE if media.HASHED_NAME.match(name) else "public, max-age=86400"
+    return response
+
+
+def _require_owner(request, listing):
+    """403 unless the bearer token belongs to the listing's owner (or staff)."""
+    if request.auth["user_id"] != listing.owner_user_id and not request.auth.get("is_staff", False):
+        raise HttpError(403, "Only the owner can change this listing")
+
+
+@router.delete("/listing/{listing_id}/images/", auth=JWTAuth())
 def delete_listing_image(request, listing_id : int):
     listing = get_object_or_404(Listing, id=listing_id)
-    user = verify_user(request)
-    if user.get("user_id") != listing.owner_user_id and not user.get("is_staff", False):
-        raise HttpError(401, "Unauthorized")
-    deleted_count, _ = ListingImage.objects.filter(listing=listing).delete()
+    _require_owner(request, listing)
+    with transaction.atomic():
+        deleted_count, _ = ListingImage.objects.filter(listing=listing).delete()
+        listing.cover_image = ""
+        listing.save(update_fields=["cover_image", "updated_at"])
+        record_change(listing.id, ListingChange.IMAGE_DELETED, count=deleted_count)
     return {
         "success": True,
         "deleted_images": deleted_count
     }
 
 
-@router.delete("/listing/{listing_id}/image/{image_id}")
+@router.delete("/listing/{listing_id}/image/{image_id}", auth=JWTAuth())
 def delete_single_listing_image(request, listing_id: int, image_id: int):
     listing = get_object_or_404(Listing, id=listing_id)
-    user = verify_user(request)
-    if user.get("user_id") != listing.owner_user_id and not user.get("is_staff", False):
-        raise HttpError(401, "Unauthorized")
+    _require_owner(request, listing)
     image = get_object_or_404(
         ListingImage,
         id=image_id,
         listing_id=listing_id
     )
-    image.delete()
+    with transaction.atomic():
+        image.delete()
+        if image.image.name == listing.cover_image.name:
+            listing.refresh_cover_image()
+        record_change(listing.id, ListingChange.IMAGE_DELETED, image_id=image_id)
     return {"success": True}
 
+# # #--------------------
+# # #Review Endpoints
+# # #--------------------
+class ReviewIn(Schema):
+    user_id: int
+    rating: int          # 1..5
+    comment: str = ""
+
+class ReviewOut(Schema):
+    id: int
+    listing_id: int
+    reviewer_user_id: int
+    rating: int
+    comment: str
+    created_at: datetime.datetime
+
+class ReviewPageOut(Schema):
+    items: List[ReviewOut]
+    next_cursor: Optional[str] = None
+
+
+@router.post("/listing/{listing_id}/reviews", response=ReviewOut)
+def create_review(request, listing_id: int, data: ReviewIn):
+    if not 1 <= data.rating <= 5:
+        raise HttpError(400, "rating must be between 1 and 5")
+    listing = get_object_or_404(Listing, id=listing_id)
+    # the reviewer FK is deferred to commit, where it would surface as a 500
+    if not User.objects.filter(id=data.user_id).exists():
+        raise HttpError(404, "Unknown user")
+
+    # the aggregate moves in the same transaction as the review row;
+    # rating_avg is a generated column and follows on its own
+    with transaction.atomic():
+        review = Review.objects.create(
+            listing=listing,
+            reviewer_user_id=data.user_id,
+            rating=data.rating,
+            comment=data.comment,
+        )
+        Listing.objects.filter(id=listing.id).update(
+            rating_sum=F("rating_sum") + data.rating,
+            rating_count=F("rating_count") + 1,
+            # get_listing's validators follow updated_at
+            updated_at=Now(),
+        )
+        record_change(listing.id, ListingChange.REVIEW_ADDED, review_id=review.id)
+    return review
+
+
+@router.get("/listing/{listing_id}/reviews", response=ReviewPageOut)
+def list_reviews(
+    request,
+    listing_id: int,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE),
+):
+    qs = Review.objects.filter(listing_id=listing_id)
+    items, next_cursor = paginate(qs, "newest", "created_at", True, cursor, limit)
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.delete("/review/{review_id}")
+def delete_review(request, review_id: int):
+    with transaction.atomic():
+        # row lock: a concurrent delete of the same review must not subtract twice
+        review = get_object_or_404(Review.objects.select_for_update(), id=review_id)
+        review.delete()
+        Listing.objects.filter(id=review.listing_id).update(
+            rating_sum=F("rating_sum") - review.rating,
+            rating_count=F("rating_count") - 1,
+            updated_at=Now(),
+        )
+        record_change(review.listing_id, ListingChange.REVIEW_REMOVED, review_id=review_id)
+    return {"success": True}
+
+
 # # #--------------------
 # # #Favotite Endpoints
 # # #--------------------
 class FavoriteIn(Schema):
     listing_id:int
 
+class FavoriteListingOut(Schema):
+    """Compact listing card embedded in favorites."""
+    id: int
+    title: str
+    price: float
+    location: str
+    is_active: bool
+    favorite_count: int
+    cover_image_url: Optional[str] = None
+    cover_sizes: Optional[Dict[str, str]] = None
+
+    @staticmethod
+    def resolve_cover_image_url(obj):
+        return obj.cover_image.url if obj.cover_image else None
+
+    @staticmethod
+    def resolve_cover_sizes(obj):
+        return size_map(obj.cover_image.name) if obj.cover_image else None
+
 class FavoriteOut(Schema):
     id: int
     user_id: int
     listing_id: int
     created_at: datetime.datetime
+    listing: FavoriteListingOut
+
+class FavoritePageOut(Schema):
+    items: List[FavoriteOut]
+    next_cursor: Optional[str] = None
 
 
 
 
-@router.post("/favorite/add", response=bool)
+@router.post("/favorite/add", response=bool, auth=JWTAuth())
 def add_favorite(request, data: FavoriteIn):
+    """Favorite a listing as the user the bearer token belongs to."""
+    user_id = request.auth["user_id"]
     listing = get_object_or_404(Listing, id=data.listing_id)
-    user = verify_user(request)
+    # checked up front: the user FK is only enforced at commit, where it
+    # would be indistinguishable from the duplicate below
+    if not User.objects.filter(id=user_id).exists():
+        raise HttpError(404, "Unknown user")
 
     try:
-        favorite = Favorite.objects.create(
-        user=user,
-        listing=listing
-    )
+        with transaction.atomic():
+            Favorite.objects.create(user_id=user_id, listing=listing)
+            # updated_at too: it is what get_listing's ETag/Last-Modified follow
+            Listing.objects.filter(id=listing.id).update(
+                favorite_count=F("favorite_count") + 1, updated_at=Now()
+            )
+            record_change(listing.id, ListingChange.FAVORITE_ADDED, user_id=user_id)
     except IntegrityError:
-        return{
-            "error": True,
-            "message":"Already a favorite"
-        }
+        if not Favorite.objects.filter(user_id=user_id, listing=listing).exists():
+            raise
+        # response is a bool, so report the duplicate as a conflict
+        raise HttpError(409, "Already a favorite")
     return True
 
 
-@router.get("/favorites/{user_id}", response=List[FavoriteOut])
-def list_favorites(request, user_id: int):
+@router.get("/favorites/{user_id}/contains", response=List[int])
+def favorites_contains(request, user_id: int, ids: str = Query(...)):
+    """Which of the comma separated listing `ids` the user has favorited."""
+    try:
+        listing_ids = {int(i) for i in ids.split(",") if i.strip()}
+    except ValueError:
+        raise HttpError(400, "ids must be comma separated integers")
+    if len(listing_ids) > MAX_PAGE_SIZE:
+        raise HttpError(400, f"At most {MAX_PAGE_SIZE} ids per request")
+    # served by the (user, listing) unique index
     return list(
-        Favorite.objects.filter(user_id=user_id).select_related("listing")
+        Favorite.objects.filter(user_id=user_id, listing_id__in=listing_ids)
+        .values_list("listing_id", flat=True)
+    )
 
-   )
 
-@router.delete("/favorite/{favorite_id}")
+@router.get("/favorites/{user_id}", response=FavoritePageOut)
+def list_favorites(
+    request,
+    user_id: int,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE),
+):
+    qs = Favorite.objects.filter(user_id=user_id).select_related("listing")
+    items, next_cursor = paginate(qs, "newest", "created_at", True, cursor, limit)
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.delete("/favorite/{favorite_id}", auth=JWTAuth())
 def delete_favorite(request, favorite_id: int):
-    try:
-        fav = Favorite.objects.get(id=favorite_id)
-    except Favorite.DoesNotExist:
-        return{"error": True,"message":"Favorite not found "}
-    fav.delete()
+    with transaction.atomic():
+        # row lock: a concurrent delete of the same favorite must not decrement twice
+        try:
+            fav = Favorite.objects.select_for_update().get(id=favorite_id, user_id=request.auth["user_id"])
+        except Favorite.DoesNotExist:
+            return{"error": True,"message":"Favorite not found "}
+        fav.delete()
+        Listing.objects.filter(id=fav.listing_id).update(
+            favorite_count=F("favorite_count") - 1, updated_at=Now()
+        )
+        record_change(fav.listing_id, ListingChange.FAVORITE_REMOVED, user_id=fav.user_id)
     return {"success": True}
 
+
+# # #--------------------
+# # #Change feed
+# # #--------------------
+class ListingChangeOut(Schema):
+    id: int
+    listing_id: int
+    kind: str
+    data: dict
+    created_at: datetime.datetime
+    txid: int
+
+class ListingChangePageOut(Schema):
+    changes: List[ListingChangeOut]
+    # a transaction id, not an event id: pass back as `since` on the next call
+    next_since: int
+
+@router.get("/changes", response=ListingChangePageOut)
+def get_changes(
+    request,
+    since: Optional[int] = Query(None),
+    limit: int = Query(MAX_PAGE_SIZE),
+    kinds: Optional[str] = Query(None),
+):
+    """
+    Committed listing changes after `since`, in transaction order. Without
+    `since` no events are returned, only the current head to start
+    consuming from. `kinds=listing,image` keeps only those kinds of event;
+    next_since then stays at the last one of them.
+    """
+    kind_list = [kind.strip() for kind in (kinds or "").split(",") if kind.strip()]
+    changes, next_since = read_changes(since, max(1, min(limit, 1000)), kind_list)
+    return {"changes": changes, "next_since": next_since}
+
 # # #------------------
 
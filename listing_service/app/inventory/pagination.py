@@ -0,0 +1,97 @@
+import base64
+import binascii
+import datetime
+import json
+from decimal import Decimal
+
+from django.db.models import Q
+from ninja.errors import HttpError
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# sort name -> (ordering field, descending)
+LISTING_SORTS = {
+    "newest": ("created_at", True),
+    "oldest": ("created_at", False),
+    "price_asc": ("price", False),
+    "price_desc": ("price", True),
+    "rating": ("rating_avg", True),
+    # only valid with a full-text `q`; `rank` is annotated by get_listings
+    "relevance": ("rank", True),
+    # only valid with near_lat/near_lng; annotated by geo.within_radius
+    "distance": ("distance_km", False),
+}
+
+
+def _to_json(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(sort: str, value, last_id: int) -> str:
+    """Opaque cursor holding the sort key and the last row's (value, id)."""
+    raw = json.dumps({"s": sort, "v": _to_json(value), "id": last_id})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value, last_id = data["v"], int(data["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HttpError(400, "Invalid cursor")
+    if data.get("s") != sort:
+        raise HttpError(400, "Cursor does not match sort order")
+    return value, last_id
+
+
+def clamp_limit(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def _page_query(qs, sort, field, descending, cursor, limit):
+    op = "lt" if descending else "gt"
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort)
+        qs = qs.filter(
+            Q(**{f"{field}__{op}": value})
+            | Q(**{field: value, f"id__{op}": last_id})
+        )
+
+    prefix = "-" if descending else ""
+    # one extra row tells us whether there is a next page
+    return qs.order_by(f"{prefix}{field}", f"{prefix}id")[: limit + 1]
+
+
+def _page_result(rows, sort, field, limit):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, getattr(last, field), last.id)
+    return rows, next_cursor
+
+
+def paginate(qs, sort: str, field: str, descending: bool, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Keyset pagination on (field, id).
+
+    Rows after the cursor are found with an index range scan instead of an
+    OFFSET, so every page costs the same no matter how deep the client is.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    limit = clamp_limit(limit)
+    rows = list(_page_query(qs, sort, field, descending, cursor, limit))
+    return _page_result(rows, sort, field, limit)
+
+
+async def apaginate(qs, sort: str, field: str, descending: bool, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """paginate() for async views."""
+    limit = clamp_limit(limit)
+    rows = [row async for row in _page_query(qs, sort, field, descending, cursor, limit)]
+    return _page_result(rows, sort, field, limit)
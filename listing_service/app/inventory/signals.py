@@ -0,0 +1,40 @@
+from django.db.models import Value
+from django.db.models.functions import Concat, Substr
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import category_cache
+from .blobs import release_blob
+from .models import Category, ListingArchive, ListingImage
+
+
+@receiver(post_delete, sender=ListingImage)
+def release_listing_image(sender, instance, **kwargs):
+    # fires for single, queryset and cascaded deletes alike
+    if instance.image:
+        release_blob(instance.image.name)
+
+
+@receiver(post_delete, sender=ListingArchive)
+def release_archived_images(sender, instance, **kwargs):
+    # the archive's own references, taken by inventory.archive.archive()
+    for img in instance.images:
+        release_blob(img["image"])
+
+
+@receiver(pre_delete, sender=Category)
+def detach_category_subtree(sender, instance, **kwargs):
+    # the children are about to be re-parented to NULL (SET_NULL), making
+    # them roots; read the stored path, the instance may predate a move
+    path = Category.objects.filter(id=instance.id).values_list("path", flat=True).first()
+    if path:
+        Category.objects.filter(path__startswith=path).exclude(id=instance.id).update(
+            path=Concat(Value("/"), Substr("path", len(path) + 1))
+        )
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_cache(sender, **kwargs):
+    # covers the category endpoints, bootstrap_categories and the admin
+    category_cache.invalidate()
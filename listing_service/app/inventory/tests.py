@@ -1,3 +1,625 @@
-from django.test import TestCase
+import io
+import json
+import shutil
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone
 
-# Create your tests here.
+import jwt
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models import F
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from PIL import Image
+
+from . import category_cache, media
+from .changes import read_changes, record_change
+from .models import (
+    CacheVersion, Category, Favorite, ImageBlob, Listing, ListingArchive, ListingChange, ListingImage,
+    Review,
+)
+
+
+def make_listing(category, **fields):
+    defaults = {
+        "owner_user_id": 1,
+        "title": "Listing",
+        "description": "",
+        "price": 1,
+        "location": "ka/bengaluru-urban/bengaluru/koramangala",
+    }
+    defaults.update(fields)
+    listing = Listing(category=category, **defaults)
+    listing.set_location(defaults["location"])
+    listing.save()
+    return listing
+
+
+def bearer(user_id):
+    exp = datetime.now(timezone.utc) + timedelta(hours=1)
+    token = jwt.encode({"user_id": user_id, "exp": exp}, settings.JWT_SECRET, algorithm="HS256")
+    return {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+
+def png(color, name="photo.png"):
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), color).save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+class TempMediaMixin:
+    """Runs the test case against a throwaway MEDIA_ROOT."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._media_root = tempfile.mkdtemp()
+        cls._media_settings = override_settings(
+            MEDIA_ROOT=cls._media_root, IMAGE_CACHE_DIR=f"{cls._media_root}/cache"
+        )
+        cls._media_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._media_settings.disable()
+        shutil.rmtree(cls._media_root, ignore_errors=True)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name="Cars", slug="cars")
+        # only 5 distinct prices, so pages must break ties on id
+        self.listings = [
+            make_listing(self.category, title=f"Listing {i}", price=i % 5) for i in range(23)
+        ]
+
+    def _walk(self, **params):
+        ids, cursor = [], None
+        while True:
+            query = {"limit": 5, **params}
+            if cursor:
+                query["cursor"] = cursor
+            response = self.client.get("/api/v1/listings", query)
+            self.assertEqual(response.status_code, 200, response.content)
+            page = response.json()
+            self.assertLessEqual(len(page["items"]), 5)
+            ids += [item["id"] for item in page["items"]]
+            cursor = page["next_cursor"]
+            if not cursor:
+                return ids
+
+    def test_every_sort_visits_each_row_once(self):
+        for sort in ("newest", "oldest", "price_asc", "price_desc"):
+            with self.subTest(sort=sort):
+                ids = self._walk(sort=sort)
+                self.assertEqual(len(ids), 23)
+                self.assertEqual(set(ids), {listing.id for listing in self.listings})
+
+    def test_order_follows_sort_then_id(self):
+        ids = self._walk(sort="price_asc")
+        by_id = {listing.id: listing for listing in self.listings}
+        keys = [(by_id[i].price, i) for i in ids]
+        self.assertEqual(keys, sorted(keys))
+
+    def test_rows_inserted_mid_walk_do_not_shift_pages(self):
+        first = self.client.get("/api/v1/listings", {"limit": 5, "sort": "oldest"}).json()
+        make_listing(self.category, title="Newcomer")
+        second = self.client.get(
+            "/api/v1/listings", {"limit": 5, "sort": "oldest", "cursor": first["next_cursor"]}
+        ).json()
+        first_ids = {item["id"] for item in first["items"]}
+        self.assertFalse(first_ids & {item["id"] for item in second["items"]})
+        self.assertEqual(second["items"][0]["id"], self.listings[5].id)
+
+    def test_last_page_has_no_cursor(self):
+        page = self.client.get("/api/v1/listings", {"limit": 100}).json()
+        self.assertEqual(len(page["items"]), 23)
+        self.assertIsNone(page["next_cursor"])
+
+    def test_bad_cursor_is_rejected(self):
+        self.assertEqual(self.client.get("/api/v1/listings", {"cursor": "garbage"}).status_code, 400)
+        cursor = self.client.get("/api/v1/listings", {"limit": 5, "sort": "newest"}).json()["next_cursor"]
+        response = self.client.get("/api/v1/listings", {"cursor": cursor, "sort": "price_asc"})
+        self.assertEqual(response.status_code, 400)
+
+
+class CoverImageTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        self.listing = make_listing(Category.objects.create(name="Cars", slug="cars"))
+
+    def _upload(self, color):
+        response = self.client.post(
+            f"/api/v1/listing/{self.listing.id}/image/upload", {"image": png(color)}
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return ListingImage.objects.get(id=response.json()["id"])
+
+    def test_newest_upload_is_the_cover(self):
+        self._upload("red")
+        blue = self._upload("blue")
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.cover_image.name, blue.image.name)
+
+    def test_deleting_the_cover_falls_back_to_the_next_newest(self):
+        red = self._upload("red")
+        blue = self._upload("blue")
+        response = self.client.delete(f"/api/v1/listing/{self.listing.id}/image/{blue.id}", **bearer(1))
+        self.assertEqual(response.status_code, 200, response.content)
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.cover_image.name, red.image.name)
+
+    def test_deleting_all_images_clears_the_cover(self):
+        self._upload("red")
+        self._upload("blue")
+        response = self.client.delete(f"/api/v1/listing/{self.listing.id}/images/", **bearer(1))
+        self.assertEqual(response.json(), {"success": True, "deleted_images": 2})
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.cover_image.name, "")
+
+
+    def test_only_the_owner_can_delete_images(self):
+        red = self._upload("red")
+        single = f"/api/v1/listing/{self.listing.id}/image/{red.id}"
+        every = f"/api/v1/listing/{self.listing.id}/images/"
+        for headers, status in (({}, 401), (bearer(2), 403)):
+            with self.subTest(status=status):
+                self.assertEqual(self.client.delete(single, **headers).status_code, status)
+                self.assertEqual(self.client.delete(every, **headers).status_code, status)
+        self.assertTrue(ListingImage.objects.filter(id=red.id).exists())
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.cover_image.name, red.image.name)
+
+
+class BlobRefCountTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Cars", slug="cars")
+        self.first = make_listing(category)
+        self.second = make_listing(category)
+
+    def _upload(self, listing, color):
+        response = self.client.post(f"/api/v1/listing/{listing.id}/image/upload", {"image": png(color)})
+        self.assertEqual(response.status_code, 200, response.content)
+        return ListingImage.objects.get(id=response.json()["id"])
+
+    def test_identical_uploads_share_one_file(self):
+        a = self._upload(self.first, "red")
+        b = self._upload(self.second, "red")
+        self.assertEqual(a.image.name, b.image.name)
+        blob = ImageBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        self.assertTrue(default_storage.exists(blob.name))
+
+    def test_file_survives_until_the_last_reference_goes(self):
+        a = self._upload(self.first, "red")
+        b = self._upload(self.second, "red")
+        name = a.image.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/v1/listing/{self.first.id}/image/{a.id}", **bearer(1))
+        self.assertEqual(ImageBlob.objects.get(name=name).ref_count, 1)
+        self.assertTrue(default_storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/v1/listing/{self.second.id}/image/{b.id}", **bearer(1))
+        self.assertFalse(ImageBlob.objects.filter(name=name).exists())
+        self.assertFalse(default_storage.exists(name))
+
+    def test_deleting_a_listing_releases_its_images(self):
+        a = self._upload(self.first, "red")
+        self._upload(self.first, "blue")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/v1/listing/{self.first.id}")
+        self.assertFalse(ImageBlob.objects.exists())
+        self.assertFalse(default_storage.exists(a.image.name))
+
+
+class BulkIngestTests(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name="Cars", slug="cars")
+
+    def _post(self, rows, **params):
+        body = "\n".join(json.dumps(row) for row in rows)
+        query = "&".join(f"{key}={value}" for key, value in {"user_id": 7, **params}.items())
+        response = self.client.post(
+            f"/api/v1/listings/bulk?{query}", body, content_type="application/x-ndjson"
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def _row(self, **fields):
+        return {"title": "Swift", "price": 100, "location": "ka/b/c/d", "category_slug": "cars", **fields}
+
+    def test_each_row_gets_a_result(self):
+        result = self._post([
+            self._row(external_id="a"),
+            self._row(external_id="b", title="x" * 256),
+            self._row(external_id="c", price="12345678901.5"),
+            self._row(external_id="d", category_slug="boats"),
+            self._row(external_id="a"),
+        ])
+        self.assertEqual((result["created"], result["failed"]), (1, 4))
+        statuses = [(r["row"], r["status"]) for r in result["results"]]
+        self.assertEqual(statuses, [(1, "created"), (2, "error"), (3, "error"), (4, "error"), (5, "error")])
+        self.assertIn("title", result["results"][1]["error"])
+        self.assertIn("price", result["results"][2]["error"])
+        self.assertEqual(Listing.objects.get().external_id, "a")
+
+    def test_a_row_the_database_rejects_only_fails_itself(self):
+        # passes the schema, but Postgres text cannot hold NUL
+        result = self._post([
+            self._row(external_id="a"),
+            self._row(external_id="b", title="bad\x00title"),
+            self._row(external_id="c"),
+        ])
+        self.assertEqual((result["created"], result["failed"]), (2, 1))
+        self.assertEqual(result["results"][1]["status"], "error")
+        self.assertTrue(result["results"][1]["error"].startswith("Database error"))
+        self.assertEqual(
+            sorted(Listing.objects.values_list("external_id", flat=True)), ["a", "c"]
+        )
+
+    def test_upsert_updates_by_external_id(self):
+        self._post([self._row(external_id="a")], mode="upsert")
+        result = self._post([self._row(external_id="a", title="Swift VXi")], mode="upsert")
+        self.assertEqual(result["results"][0]["status"], "updated")
+        self.assertEqual(Listing.objects.get().title, "Swift VXi")
+
+
+class CategoryCacheTests(TestCase):
+    def setUp(self):
+        Category.objects.create(name="Cars", slug="cars")
+
+    def test_a_write_changes_the_etag_and_the_payload(self):
+        first = self.client.get("/api/v1/category")
+        Category.objects.create(name="Bikes", slug="bikes")
+        second = self.client.get("/api/v1/category")
+        self.assertNotEqual(first["ETag"], second["ETag"])
+        self.assertEqual({c["slug"] for c in second.json()}, {"cars", "bikes"})
+
+    def test_a_version_bump_from_another_process_invalidates_this_one(self):
+        etag = self.client.get("/api/v1/category")["ETag"]
+        # another worker's write: the rows and the version change, this
+        # process's signal handlers never run
+        Category.objects.filter(slug="cars").update(name="Automobiles")
+        CacheVersion.objects.filter(name=category_cache.VERSION_NAME).update(version=F("version") + 1)
+        response = self.client.get("/api/v1/category", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["name"], "Automobiles")
+
+    def test_unchanged_categories_answer_304(self):
+        etag = self.client.get("/api/v1/category/tree")["ETag"]
+        response = self.client.get("/api/v1/category/tree", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+class FavoriteTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("buyer")
+        self.listing = make_listing(Category.objects.create(name="Cars", slug="cars"))
+
+    def _add(self, token_user_id, **body):
+        return self.client.post(
+            "/api/v1/favorite/add", {"listing_id": self.listing.id, **body},
+            content_type="application/json", **bearer(token_user_id),
+        )
+
+    def test_the_user_comes_from_the_token(self):
+        other = User.objects.create_user("someone-else")
+        response = self._add(self.user.id, user_id=other.id)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(Favorite.objects.get().user_id, self.user.id)
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.favorite_count, 1)
+
+    def test_requires_a_valid_token(self):
+        response = self.client.post(
+            "/api/v1/favorite/add", {"listing_id": self.listing.id}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 401)
+        response = self.client.post(
+            "/api/v1/favorite/add", {"listing_id": self.listing.id},
+            content_type="application/json", HTTP_AUTHORIZATION="Bearer not-a-jwt",
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_duplicate_is_a_conflict(self):
+        self.assertEqual(self._add(self.user.id).status_code, 200)
+        self.assertEqual(self._add(self.user.id).status_code, 409)
+
+    def test_unknown_user_is_not_reported_as_a_duplicate(self):
+        self.assertEqual(self._add(self.user.id + 1000).status_code, 404)
+        self.assertFalse(Favorite.objects.exists())
+
+    def test_a_favorite_changes_the_listing_etag(self):
+        url = f"/api/v1/listing/{self.listing.id}"
+        etag = self.client.get(url)["ETag"]
+        self._add(self.user.id)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["favorite_count"], 1)
+
+        etag = response["ETag"]
+        self.client.delete(f"/api/v1/favorite/{Favorite.objects.get().id}", **bearer(self.user.id))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["favorite_count"], 0)
+
+    def test_only_the_owner_can_delete(self):
+        self._add(self.user.id)
+        favorite = Favorite.objects.get()
+        other = User.objects.create_user("someone-else")
+        self.client.delete(f"/api/v1/favorite/{favorite.id}", **bearer(other.id))
+        self.assertTrue(Favorite.objects.exists())
+        self.client.delete(f"/api/v1/favorite/{favorite.id}", **bearer(self.user.id))
+        self.assertFalse(Favorite.objects.exists())
+
+
+class ReviewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("buyer")
+        self.listing = make_listing(Category.objects.create(name="Cars", slug="cars"))
+
+    def _post(self, user_id, rating=4):
+        return self.client.post(
+            f"/api/v1/listing/{self.listing.id}/reviews",
+            {"user_id": user_id, "rating": rating}, content_type="application/json",
+        )
+
+    def test_review_updates_the_aggregate(self):
+        self.assertEqual(self._post(self.user.id).status_code, 200)
+        self.listing.refresh_from_db()
+        self.assertEqual((self.listing.rating_sum, self.listing.rating_count), (4, 1))
+
+    def test_a_review_changes_the_listing_etag(self):
+        url = f"/api/v1/listing/{self.listing.id}"
+        etag = self.client.get(url)["ETag"]
+        review_id = self._post(self.user.id, rating=5).json()["id"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["rating_avg"], 5.0)
+
+        etag = response["ETag"]
+        self.client.delete(f"/api/v1/review/{review_id}")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["rating_count"], 0)
+
+    def test_unknown_reviewer_is_a_404(self):
+        self.assertEqual(self._post(self.user.id + 1000).status_code, 404)
+        self.assertFalse(Review.objects.exists())
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.rating_count, 0)
+
+
+class ChangeFeedTests(TransactionTestCase):
+    # TestCase's wrapping transaction would hold back the snapshot xmin
+
+    def _open_transaction(self, listing_id, recorded, release):
+        try:
+            with transaction.atomic():
+                record_change(listing_id, ListingChange.LISTING_UPDATED)
+                recorded.set()
+                release.wait(5)
+        finally:
+            connection.close()
+
+    def test_a_late_commit_is_not_skipped(self):
+        head = read_changes(None, 100)[1]
+        recorded, release = threading.Event(), threading.Event()
+        slow = threading.Thread(target=self._open_transaction, args=(1, recorded, release))
+        slow.start()
+        try:
+            recorded.wait(5)
+            # inserted after the slow one, committed before it
+            record_change(2, ListingChange.LISTING_UPDATED)
+            events, since = read_changes(head, 100)
+            self.assertEqual(events, [])
+            self.assertEqual(since, head)
+        finally:
+            release.set()
+            slow.join()
+        events, since = read_changes(since, 100)
+        self.assertEqual([event.listing_id for event in events], [1, 2])
+        self.assertEqual(read_changes(since, 100), ([], since))
+
+    def test_a_page_does_not_split_a_transaction(self):
+        head = read_changes(None, 100)[1]
+        with transaction.atomic():
+            for listing_id in (1, 2, 3):
+                record_change(listing_id, ListingChange.LISTING_UPDATED)
+        record_change(4, ListingChange.LISTING_UPDATED)
+
+        events, since = read_changes(head, 2)
+        self.assertEqual([event.listing_id for event in events], [1, 2, 3])
+        events, since = read_changes(since, 2)
+        self.assertEqual([event.listing_id for event in events], [4])
+
+    def test_kinds_filter(self):
+        head = read_changes(None, 100)[1]
+        record_change(1, ListingChange.FAVORITE_ADDED, user_id=1)
+        events, since = read_changes(head, 100, ["listing", "image"])
+        self.assertEqual(events, [])
+        # the skipped favorite is behind the cursor now, not rescanned
+        self.assertGreater(since, head)
+        self.assertFalse(ListingChange.objects.filter(txid__gt=since).exists())
+        record_change(1, ListingChange.IMAGE_ADDED, image_id=1)
+        events, since = read_changes(since, 100, ["listing", "image"])
+        self.assertEqual([event.kind for event in events], [ListingChange.IMAGE_ADDED])
+
+
+class ArchiveTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name="Cars", slug="cars")
+        self.buyer = User.objects.create_user("buyer")
+        self.listing = make_listing(self.category, is_active=False)
+        self._age(self.listing, days=60)
+
+    def _age(self, listing, days):
+        past = datetime.now(timezone.utc) - timedelta(days=days)
+        Listing.objects.filter(id=listing.id).update(created_at=past, updated_at=past)
+
+    def _archive(self, *args):
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("archive_listings", *args, stdout=io.StringIO())
+
+    def _upload(self, color):
+        response = self.client.post(f"/api/v1/listing/{self.listing.id}/image/upload", {"image": png(color)})
+        self.assertEqual(response.status_code, 200, response.content)
+        return ListingImage.objects.get(id=response.json()["id"])
+
+    def test_only_inactive_listings_are_archived_by_default(self):
+        old_but_active = make_listing(self.category)
+        self._age(old_but_active, days=400)
+        self._archive()
+        self.assertEqual(list(ListingArchive.objects.values_list("id", flat=True)), [self.listing.id])
+        self.assertTrue(Listing.objects.filter(id=old_but_active.id).exists())
+
+        self._archive("--expire-days", "365")
+        self.assertTrue(ListingArchive.objects.filter(id=old_but_active.id).exists())
+
+    def test_restore_brings_back_images_reviews_and_favorites(self):
+        image = self._upload("red")
+        review = Review.objects.create(listing=self.listing, reviewer_user=self.buyer, rating=4, comment="ok")
+        favorite = Favorite.objects.create(listing=self.listing, user=self.buyer)
+        Listing.objects.filter(id=self.listing.id).update(rating_sum=4, rating_count=1, favorite_count=1)
+        self._age(self.listing, days=60)
+        created_at = Listing.objects.get(id=self.listing.id).created_at
+
+        self._archive()
+        self.assertFalse(Review.objects.exists())
+        self.assertEqual(ImageBlob.objects.get().ref_count, 1)
+        self.assertTrue(default_storage.exists(image.image.name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("restore_listings", str(self.listing.id), stdout=io.StringIO())
+        self.assertFalse(ListingArchive.objects.exists())
+        listing = Listing.objects.get(id=self.listing.id)
+        self.assertEqual((listing.rating_count, listing.rating_avg, listing.favorite_count), (1, 4.0, 1))
+        self.assertEqual(listing.created_at, created_at)
+        self.assertEqual(Review.objects.get().id, review.id)
+        self.assertEqual(Favorite.objects.get().created_at, favorite.created_at)
+        self.assertEqual(ListingImage.objects.get().image.name, image.image.name)
+        self.assertEqual(ImageBlob.objects.get().ref_count, 1)
+        self.assertTrue(default_storage.exists(image.image.name))
+
+    def test_archived_listing_can_be_restored_updated_and_deleted_over_http(self):
+        self._archive()
+        url = f"/api/v1/listing/{self.listing.id}"
+        update = self.client.put(url, {"title": "Back"}, content_type="application/json")
+        self.assertEqual(update.status_code, 409)
+
+        self.assertEqual(self.client.post(f"{url}/restore").status_code, 200)
+        update = self.client.put(url, {"title": "Back"}, content_type="application/json")
+        self.assertEqual(update.status_code, 200, update.content)
+        self.assertEqual(self.client.post(f"{url}/restore").status_code, 404)
+
+    def test_deleting_or_purging_an_archive_releases_its_images(self):
+        image = self._upload("red")
+        self._age(self.listing, days=60)
+        self._archive()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f"/api/v1/listing/{self.listing.id}")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(ListingArchive.objects.exists())
+        self.assertFalse(ImageBlob.objects.exists())
+        self.assertFalse(default_storage.exists(image.image.name))
+
+    def test_purge_releases_images(self):
+        image = self._upload("red")
+        self._age(self.listing, days=60)
+        self._archive()
+        ListingArchive.objects.update(archived_at=datetime.now(timezone.utc) - timedelta(days=100))
+
+        self._archive("--purge-days", "90")
+        self.assertFalse(ListingArchive.objects.exists())
+        self.assertFalse(ImageBlob.objects.exists())
+        self.assertFalse(default_storage.exists(image.image.name))
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_satisfiable_ranges(self):
+        cases = {
+            "bytes=0-9": (0, 9),
+            "bytes=90-": (90, 99),
+            "bytes=95-200": (95, 99),
+            "bytes=-10": (90, 99),
+            "bytes=-200": (0, 99),
+            "BYTES=5-5": (5, 5),
+        }
+        for header, expected in cases.items():
+            with self.subTest(header=header):
+                self.assertEqual(media.parse_range(header, 100), expected)
+
+    def test_ignored_headers(self):
+        for header in ("bytes=10-5", "bytes=0-1,5-6", "items=0-9", "bytes=-", "bytes=a-b"):
+            with self.subTest(header=header):
+                self.assertIsNone(media.parse_range(header, 100))
+
+    def test_unsatisfiable_ranges(self):
+        for header in ("bytes=100-", "bytes=150-160", "bytes=-0"):
+            with self.subTest(header=header):
+                with self.assertRaises(ValueError):
+                    media.parse_range(header, 100)
+
+
+@override_settings(MEDIA_ACCEL="")
+class ServeMediaRangeTests(TempMediaMixin, SimpleTestCase):
+    data = bytes(range(100))
+
+    def setUp(self):
+        default_storage.save("docs/file.bin", io.BytesIO(self.data))
+        self.url = "/media/docs/file.bin"
+
+    def tearDown(self):
+        default_storage.delete("docs/file.bin")
+
+    def _body(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_full_file_advertises_ranges(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(self._body(response), self.data)
+
+    def test_single_range(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 10-19/100")
+        self.assertEqual(response["Content-Length"], "10")
+        self.assertEqual(self._body(response), self.data[10:20])
+
+    def test_suffix_range(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=-5")
+        self.assertEqual(response["Content-Range"], "bytes 95-99/100")
+        self.assertEqual(self._body(response), self.data[95:])
+
+    def test_unsatisfiable_range_is_416(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=200-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */100")
+
+    def test_multiple_ranges_get_the_whole_file(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-1,5-6")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._body(response), self.data)
+
+    def test_if_range(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        # the client's copy is stale: send the whole new file
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._body(response), self.data)
+
+    def test_current_copy_is_304(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag, HTTP_RANGE="bytes=0-9")
+        self.assertEqual(response.status_code, 304)
@@ -4,6 +4,7 @@ import mysql.connector as connector
 import sql_connect
 import numpy as np
 import re
+import sys
 
 def slugify(value: str) -> str:
     """Simple slug generator from a name."""
@@ -101,6 +102,33 @@ def insert_cities(places, state_code, conn):
                 except Exception as e:
                     print(f"Skipped city '{city_name}' due to error: {e}")
 
+def update_locality_coordinates(file, conn):
+    """
+    Set latitude/longitude on existing localities from a CSV with
+    state, district, city, locality, latitude, longitude columns (names).
+    """
+    df = pd.read_csv(file)
+    updated = 0
+    with conn.cursor() as cursor:
+        for row in df.itertuples(index=False):
+            cursor.execute(
+                """
+                UPDATE locality l
+                JOIN city c ON c.code = l.city_code
+                JOIN district d ON d.code = c.district_code
+                JOIN states s ON s.code = d.state_code
+                SET l.latitude = %s, l.longitude = %s
+                WHERE s.slug = %s AND d.slug = %s AND c.slug = %s AND l.slug = %s
+                """,
+                (
+                    float(row.latitude), float(row.longitude),
+                    slugify(row.state), slugify(row.district), slugify(row.city), slugify(row.locality),
+                ),
+            )
+            updated += cursor.rowcount
+        conn.commit()
+    print(f"Set coordinates on {updated} localities")
+
 # remove or keep insert_localities commented out, it is broken and unused
 # def insert_localities(...): ...
 
@@ -124,6 +152,11 @@ def get_region_info(file):
     return district, places
 
 if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "coordinates":
+        with sql_connect.connect_sql() as conn:
+            update_locality_coordinates(sys.argv[2], conn)
+        sys.exit()
+
     states = []
     files = [
         f
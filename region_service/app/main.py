@@ -95,6 +95,8 @@ def init_db():
             name VARCHAR(255) NOT NULL,
             slug VARCHAR(255) NOT NULL,
             city_code INT NOT NULL,
+            latitude DOUBLE NULL,
+            longitude DOUBLE NULL,
             CONSTRAINT fk_locality_city
                 FOREIGN KEY (city_code) REFERENCES city(code)
                 ON DELETE CASCADE,
@@ -106,6 +108,16 @@ def init_db():
         """
     )
 
+    # databases created before localities had coordinates
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = 'locality' AND column_name = 'latitude'
+        """
+    )
+    if cursor.fetchone()[0] == 0:
+        cursor.execute("ALTER TABLE locality ADD COLUMN latitude DOUBLE NULL, ADD COLUMN longitude DOUBLE NULL")
+
     conn.commit()
     cursor.close()
     conn.close()
@@ -113,6 +125,65 @@ def init_db():
 
 
 
+# ---------------------------
+# Conditional GET
+# ---------------------------
+# The region tree only changes when add_data.py loads a new dataset (or
+# locality coordinates), so one
+# version covers every endpoint. It is re-read at most every
+# DATASET_VERSION_TTL seconds.
+DATASET_VERSION_TTL = int(os.getenv("DATASET_VERSION_TTL", "30"))
+_dataset_version = {"value": None, "checked_at": 0.0}
+
+
+def dataset_version():
+    now = time.monotonic()
+    if _dataset_version["value"] is None or now - _dataset_version["checked_at"] > DATASET_VERSION_TTL:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                """
+                SELECT
+                    (SELECT COUNT(*) FROM states), (SELECT MAX(code) FROM states),
+                    (SELECT COUNT(*) FROM district), (SELECT MAX(code) FROM district),
+                    (SELECT COUNT(*) FROM city), (SELECT MAX(code) FROM city),
+                    (SELECT COUNT(*) FROM locality), (SELECT MAX(code) FROM locality),
+                    -- coordinate loads change no counts
+                    (SELECT COUNT(latitude) FROM locality),
+                    (SELECT ROUND(SUM(latitude + longitude) * 1000000) FROM locality)
+                """
+            )
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+            conn.close()
+        _dataset_version["value"] = "region-" + "-".join(str(value or 0) for value in row)
+        _dataset_version["checked_at"] = now
+    return _dataset_version["value"]
+
+
+@app.before_request
+def short_circuit_not_modified():
+    # answer a current If-None-Match before the view queries or serializes anything
+    if request.method == "GET" and request.if_none_match:
+        etag = dataset_version()
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+    return None
+
+
+@app.after_request
+def add_dataset_etag(response):
+    if request.method == "GET" and response.status_code == 200:
+        response.set_etag(dataset_version())
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
 @app.route("/states", methods=["GET"])
 def get_states():
     slug = request.args.get("slug")
@@ -182,12 +253,12 @@ def get_localities(state_code, district_code, city_code):
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute(
-        "SELECT code, name, slug FROM locality WHERE city_code = %s",
+        "SELECT code, name, slug, latitude, longitude FROM locality WHERE city_code = %s",
         (city_code,),
     )
     localities = [
-        {"code": code, "name": name, "slug": slug}
-        for code, name, slug in cursor.fetchall()
+        {"code": code, "name": name, "slug": slug, "latitude": lat, "longitude": lng}
+        for code, name, slug, lat, lng in cursor.fetchall()
     ]
     cursor.close()
     conn.close()
@@ -202,18 +273,69 @@ def get_locality(state_code, district_code, city_code, locality_code):
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute(
-        "SELECT code, name, slug FROM locality WHERE code = %s AND city_code = %s",
+        "SELECT code, name, slug, latitude, longitude FROM locality WHERE code = %s AND city_code = %s",
         (locality_code, city_code),
     )
     row = cursor.fetchone()
     cursor.close()
     conn.close()
     if row:
-        return jsonify({"code": row[0], "name": row[1], "slug": row[2]})
+        return jsonify({
+            "code": row[0], "name": row[1], "slug": row[2],
+            "latitude": row[3], "longitude": row[4],
+        })
     else:
         return jsonify({"error": "Locality not found"}), 404
 
 
+@app.route("/localities", methods=["GET"])
+def find_localities():
+    """
+    Localities by slug, narrowed by optional `state`, `district` and `city`
+    slugs, with their full slug path and coordinates. Used to resolve a
+    locality name into a point for radius search.
+    """
+    slug = request.args.get("slug")
+    if not slug:
+        return jsonify({"error": "slug is required"}), 400
+
+    where = ["l.slug = %s"]
+    params = [slug]
+    for arg, column in (("state", "s.slug"), ("district", "d.slug"), ("city", "c.slug")):
+        if request.args.get(arg):
+            where.append(f"{column} = %s")
+            params.append(request.args[arg])
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"""
+            SELECT l.code, l.name, s.slug, d.slug, c.slug, l.slug, l.latitude, l.longitude
+            FROM locality l
+            JOIN city c ON c.code = l.city_code
+            JOIN district d ON d.code = c.district_code
+            JOIN states s ON s.code = d.state_code
+            WHERE {" AND ".join(where)}
+            """,
+            params,
+        )
+        localities = [
+            {
+                "code": code,
+                "name": name,
+                "location": f"{state}/{district}/{city}/{locality}",
+                "latitude": lat,
+                "longitude": lng,
+            }
+            for code, name, state, district, city, locality, lat, lng in cursor.fetchall()
+        ]
+        return jsonify(localities)
+    finally:
+        cursor.close()
+        conn.close()
+
+
 if __name__ == "__main__":
     wait_for_db()
     init_db()